@@ -0,0 +1,569 @@
+"""
+Serveur local imitant l'API data-fair de l'ADEME (dpe03existant, dpe02neuf)
+Usage: python ademe_stub.py [--port 8765] [--rows 30000] [--latency-ms 20] [--throttle 0.02]
+       python ademe_stub.py --record --fixtures data/ademe_fixtures --record-codes 69001,69002
+
+Sert /lines (qs, select, page/size, fenêtre de 10 000 lignes, total, tri et
+curseur after/next), /values_agg (agrégations imbriquées, intervalle
+mensuel) et /schema, à partir de données synthétiques reproductibles ou de
+fixtures enregistrées depuis data.ademe.fr (--record). Latence et réponses
+429 injectables : DataRefresher se teste et se mesure (benchmark_refresh.py)
+sans solliciter l'API réelle.
+
+Pilotage : GET /_stub/stats (requêtes reçues), POST /_stub/update (DPE
+ajoutés ou rectifiés), POST /_stub/reset (compteurs).
+"""
+
+import argparse
+import asyncio
+import bisect
+import functools
+import json
+import os
+import random
+import re
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, timedelta
+from email.utils import formatdate
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from utils.data_refresher import AdemeTransport, DataRefresher
+
+DATASETS = {
+    "dpe03existant": DataRefresher.COLUMNS_EXISTANTS,
+    "dpe02neuf": DataRefresher.COLUMNS_NEUFS,
+}
+MAX_RESULT_WINDOW = 10000
+MAX_PAGE_SIZE = 10000
+
+# Types des colonnes synthétiques (d'après leur nom ; chaîne par défaut)
+BOOLEAN_COLUMNS = {"ventilation_posterieure_2012", "appartement_non_visite"}
+INTEGER_PREFIXES = ("_i", "_rand", "nombre_", "annee_", "numero_etage", "numero_voie", "code_region")
+NUMBER_PREFIXES = ("conso_", "cout_", "emission_", "deperditions_", "besoin_", "apport_", "surface_",
+                   "production_", "ubat_", "hauteur_", "score_", "coordonnee_", "volume_")
+ETIQUETTES = "ABCDDDEEEFG"
+FILL_CYCLE = 997
+
+# Champs des lignes synthétiques (les autres colonnes sont complétées à la lecture)
+SYNTHETIC_FIELDS = {"_i", "numero_dpe", "code_postal_ban", "code_departement_ban", "date_reception_dpe",
+                    "date_etablissement_dpe", "date_derniere_modification_dpe", "etiquette_dpe", "etiquette_ges"}
+
+CLAUSE = re.compile(r"^(NOT )?([\w.]+):(.+)$")
+
+def column_type(column: str) -> str:
+    """Type data-fair (integer, number, boolean, string) d'une colonne synthétique"""
+    if column in BOOLEAN_COLUMNS:
+        return "boolean"
+    if column.startswith(INTEGER_PREFIXES):
+        return "integer"
+    if column.startswith(NUMBER_PREFIXES):
+        return "number"
+    return "string"
+
+def synthetic_schema(columns: List[str]) -> List[dict]:
+    """Schéma au format de /schema (key, type, format)"""
+    return [
+        {"key": col, "type": column_type(col), **({"format": "date"} if col.startswith("date_") else {})}
+        for col in columns
+    ]
+
+def synthetic_codes(n_codes: int) -> List[str]:
+    """Codes postaux du Rhône (arrondissements de Lyon d'abord)"""
+    codes = [f"6900{i}" for i in range(1, 10)] + [f"69{i:03d}" for i in range(100, 1000, 10)]
+    return codes[:n_codes]
+
+def synthetic_rows(dataset: str, n_rows: int, codes: List[str], seed: int = 0) -> List[dict]:
+    """
+    DPE synthétiques : champs servant aux filtres et aux identifiants
+
+    Les codes postaux suivent une loi de Zipf (avec 20 codes, le premier
+    dépasse la fenêtre de 10 000 lignes dès 40 000 DPE) ; 1 % des DPE n'ont pas
+    d'étiquette. Les autres colonnes sont complétées à la lecture (AdemeStub.encode).
+    """
+    rng = random.Random(f"{seed}-{dataset}")
+    weights = [1 / (rank + 1) for rank in range(len(codes))]
+    marker = "N" if dataset == "dpe02neuf" else "E"
+    first_day = date(2021, 7, 1)
+    span = (date(2025, 12, 31) - first_day).days
+
+    rows = []
+    for i, cp in enumerate(rng.choices(codes, weights=weights, k=n_rows)):
+        received = first_day + timedelta(days=rng.randrange(span))
+        row = {
+            "_i": i,
+            "numero_dpe": f"{received:%y}69{marker}{i:07d}",
+            "code_postal_ban": cp,
+            "code_departement_ban": cp[:2],
+            "date_reception_dpe": received.isoformat(),
+            "date_etablissement_dpe": received.isoformat(),
+            "date_derniere_modification_dpe": received.isoformat(),
+        }
+        if rng.random() > 0.01:
+            row["etiquette_dpe"] = rng.choice(ETIQUETTES)
+            row["etiquette_ges"] = rng.choice(ETIQUETTES)
+        rows.append(row)
+    return rows
+
+def load_fixtures(directory: str) -> Tuple[Dict[str, List[dict]], Dict[str, List[dict]]]:
+    """
+    Fixtures enregistrées : <dataset>.jsonl (une ligne JSON par DPE) et
+    <dataset>.schema.json facultatif
+
+    Returns:
+        ({dataset: lignes triées par _i}, {dataset: schéma})
+    """
+    rows, schemas = {}, {}
+    for dataset in DATASETS:
+        path = os.path.join(directory, f"{dataset}.jsonl")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        for i, row in enumerate(lines):
+            row.setdefault("_i", i)
+        rows[dataset] = sorted(lines, key=lambda row: row["_i"])
+
+        schema_path = os.path.join(directory, f"{dataset}.schema.json")
+        if os.path.exists(schema_path):
+            with open(schema_path, "r", encoding="utf-8") as f:
+                schemas[dataset] = json.load(f)
+    return rows, schemas
+
+def record_fixtures(directory: str, codes: List[str], max_rows: int):
+    """Enregistrer depuis data.ademe.fr les DPE de `codes` (au plus max_rows par dataset et code postal)"""
+    transport = AdemeTransport(max_connections=1)
+    urls = {"dpe03existant": DataRefresher.BASE_URL_EXISTANTS, "dpe02neuf": DataRefresher.BASE_URL_NEUFS}
+    os.makedirs(directory, exist_ok=True)
+
+    for dataset, api_url in urls.items():
+        schema = transport.get_json(api_url.rsplit("/lines", 1)[0] + "/schema", None)
+        if isinstance(schema, list):
+            with open(os.path.join(directory, f"{dataset}.schema.json"), "w", encoding="utf-8") as f:
+                json.dump(schema, f, ensure_ascii=False, indent=2)
+
+        count = 0
+        with open(os.path.join(directory, f"{dataset}.jsonl"), "w", encoding="utf-8") as f:
+            for cp in codes:
+                params = {"size": 1000, "sort": "_i", "qs": f"code_postal_ban:{cp}",
+                          "select": ",".join(DATASETS[dataset])}
+                url, rows = api_url, 0
+                while url and rows < max_rows:
+                    data = transport.get_json(url, params)
+                    if not data or not data.get("results"):
+                        break
+                    for row in data["results"][:max_rows - rows]:
+                        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                        rows += 1
+                    url, params = data.get("next"), None
+                count += rows
+        print(f"💾 {dataset}: {count} DPE enregistrés")
+
+def parse_qs(qs: str) -> List[tuple]:
+    """Clauses (négation, champ, opérateur, valeur) d'un filtre `qs` (clauses reliées par AND)"""
+    clauses = []
+    for part in (qs or "").split(" AND "):
+        match = CLAUSE.match(part.strip())
+        if not match:
+            continue
+        negate, field, value = match.groups()
+        if value == "*":
+            clauses.append((bool(negate), field, "exists", None))
+        elif value.startswith("[") and " TO " in value:
+            low, high = value[1:-1].split(" TO ", 1)
+            clauses.append((bool(negate), field, "range", (low.strip(), high.strip())))
+        elif value.startswith("("):
+            clauses.append((bool(negate), field, "in", {v.strip().strip('"') for v in value[1:-1].split(" OR ")}))
+        else:
+            clauses.append((bool(negate), field, "eq", value.strip('"')))
+    return clauses
+
+def _compare(value, bound: str) -> int:
+    """-1, 0 ou 1 : comparaison numérique si possible, sinon textuelle (dates ISO)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            number = float(bound)
+            return (value > number) - (value < number)
+        except ValueError:
+            pass
+    text = str(value)
+    return (text > bound) - (text < bound)
+
+def matches(row: dict, clauses: List[tuple]) -> bool:
+    for negate, field, op, arg in clauses:
+        value = row.get(field)
+        if value is None:
+            ok = False
+        elif op == "exists":
+            ok = True
+        elif op == "eq":
+            ok = str(value) == arg
+        elif op == "in":
+            ok = str(value) in arg
+        else:
+            low, high = arg
+            ok = (low == "*" or _compare(value, low) >= 0) and (high == "*" or _compare(value, high) <= 0)
+        if ok == negate:
+            return False
+    return True
+
+class AdemeStub:
+    """
+    Données et comportement du serveur : filtres, pages, curseurs,
+    agrégations, latence et 429 injectés, compteurs
+    """
+
+    def __init__(self, rows: Dict[str, List[dict]], schemas: Optional[Dict[str, List[dict]]] = None,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, throttle: float = 0.0,
+                 max_rate: float = 0.0, retry_after: float = 1.0, retry_after_date: bool = False,
+                 cursor: bool = True, aggregations: bool = True, fill: bool = True, seed: int = 0):
+        """
+        Args:
+            rows: Lignes par dataset (triées par _i)
+            schemas: Schémas enregistrés (à défaut, déduits des noms de colonnes)
+            latency_ms, jitter_ms: Latence ajoutée à chaque requête de données (ms)
+            throttle: Part des requêtes de données refusées (429)
+            max_rate: Débit accepté (requêtes/s, 0 = illimité), 429 au-delà
+            retry_after: Valeur de l'en-tête Retry-After des 429 (s)
+            retry_after_date: Retry-After en date HTTP (maintenant + retry_after)
+                au lieu d'un nombre de secondes
+            cursor: Liens `next` par curseur (after) quand la requête est triée ;
+                sinon liens par numéro de page (repli du client)
+            aggregations: values_agg disponible (sinon 404)
+            fill: Calculer les colonnes absentes des lignes (données synthétiques)
+        """
+        self.rows = rows
+        self.schemas = schemas or {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle = throttle
+        self.max_rate = max_rate
+        self.retry_after = retry_after
+        self.retry_after_date = retry_after_date
+        self.cursor = cursor
+        self.aggregations = aggregations
+        self.fill = fill
+        self.rng = random.Random(seed)
+
+        self._by_code = {dataset: self._index(dataset) for dataset in rows}
+        self._matches: "OrderedDict[tuple, Tuple[List[dict], List[int]]]" = OrderedDict()
+        self._window: List[float] = []
+        self._fills: Dict[tuple, List[str]] = {}
+        self.reset_stats()
+
+    def _index(self, dataset: str) -> Dict[str, List[dict]]:
+        index: Dict[str, List[dict]] = {}
+        for row in self.rows[dataset]:
+            index.setdefault(str(row.get("code_postal_ban")), []).append(row)
+        return index
+
+    def reset_stats(self):
+        self.stats = {"lines": 0, "values_agg": 0, "schema": 0, "throttled": 0, "rows_served": 0}
+
+    def codes(self) -> List[str]:
+        """Codes postaux présents, tous datasets confondus"""
+        return sorted({cp for index in self._by_code.values() for cp in index})
+
+    def columns(self, dataset: str) -> List[str]:
+        if dataset in self.schemas:
+            return [field["key"] for field in self.schemas[dataset]]
+        return DATASETS[dataset]
+
+    def schema(self, dataset: str) -> List[dict]:
+        return self.schemas.get(dataset) or synthetic_schema(DATASETS[dataset])
+
+    async def admit(self) -> Optional[JSONResponse]:
+        """Latence injectée, puis 429 (aléatoire ou débit dépassé) le cas échéant"""
+        delay = self.latency_ms + self.rng.uniform(0, self.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        now = time.monotonic()
+        self._window = [t for t in self._window if now - t < 1.0]
+        over_rate = self.max_rate and len(self._window) >= self.max_rate
+        if over_rate or self.rng.random() < self.throttle:
+            self.stats["throttled"] += 1
+            retry_after = f"{self.retry_after:g}"
+            if self.retry_after_date:
+                retry_after = formatdate(time.time() + self.retry_after, usegmt=True)
+            return JSONResponse({"error": "Too Many Requests"}, status_code=429,
+                                headers={"Retry-After": retry_after})
+        self._window.append(now)
+        return None
+
+    def select(self, dataset: str, qs: str) -> Tuple[List[dict], List[int]]:
+        """Lignes correspondant à `qs` et leurs _i (résultat gardé pour les pages suivantes)"""
+        key = (dataset, qs)
+        if key in self._matches:
+            self._matches.move_to_end(key)
+            return self._matches[key]
+
+        clauses = parse_qs(qs)
+        candidates = self.rows[dataset]
+        for negate, field, op, arg in clauses:
+            if field == "code_postal_ban" and not negate and op in ("eq", "in"):
+                codes = [arg] if op == "eq" else sorted(arg)
+                candidates = sorted((row for cp in codes for row in self._by_code[dataset].get(cp, [])),
+                                    key=lambda row: row["_i"])
+                break
+
+        selected = [row for row in candidates if matches(row, clauses)]
+        self._matches[key] = (selected, [row["_i"] for row in selected])
+        if len(self._matches) > 256:
+            self._matches.popitem(last=False)
+        return self._matches[key]
+
+    def encode(self, rows: List[dict], columns: List[str]) -> str:
+        """
+        Lignes restreintes à `columns`, en tableau JSON sans valeurs nulles
+        (comme data-fair) ; les colonnes absentes des données synthétiques
+        sont complétées par un fragment JSON précalculé (FILL_CYCLE variantes)
+        """
+        wanted = set(columns)
+        fragments = self._fragments(columns) if self.fill else None
+        parts = []
+        for row in rows:
+            own = json.dumps({k: v for k, v in row.items() if k in wanted and v is not None})
+            fragment = fragments[row["_i"] % FILL_CYCLE] if fragments else ""
+            if fragment:
+                own = f"{own[:-1]}, {fragment}}}" if own != "{}" else f"{{{fragment}}}"
+            parts.append(own)
+        return f"[{', '.join(parts)}]"
+
+    def _fragments(self, columns: List[str]) -> List[str]:
+        key = tuple(columns)
+        if key not in self._fills:
+            filled = [col for col in columns if col not in SYNTHETIC_FIELDS]
+            self._fills[key] = [
+                json.dumps({col: _column_values(col)[k] for col in filled
+                            if _column_values(col)[k] is not None})[1:-1]
+                for k in range(FILL_CYCLE)
+            ]
+        return self._fills[key]
+
+    def update(self, dataset: str, modified: int, added: int, day: str) -> dict:
+        """
+        Rectifier `modified` DPE (étiquette et date de modification) et en
+        ajouter `added` (copies de DPE existants, reçus et modifiés le `day`)
+        """
+        rows = self.rows[dataset]
+        for row in self.rng.sample(rows, min(modified, len(rows))):
+            row["etiquette_dpe"] = self.rng.choice([e for e in "ABCDEFG" if e != row.get("etiquette_dpe")])
+            row["date_derniere_modification_dpe"] = day
+
+        next_i = rows[-1]["_i"] + 1 if rows else 0
+        for n in range(added):
+            row = dict(self.rng.choice(rows)) if rows else {"code_postal_ban": "69001", "code_departement_ban": "69"}
+            row.update({"_i": next_i + n, "numero_dpe": f"{day[2:4]}69A{next_i + n:07d}",
+                        "date_reception_dpe": day, "date_etablissement_dpe": day,
+                        "date_derniere_modification_dpe": day})
+            rows.append(row)
+            self._by_code[dataset].setdefault(str(row.get("code_postal_ban")), []).append(row)
+
+        self._matches.clear()
+        return {"dataset": dataset, "modified": min(modified, len(rows)), "added": added, "total": len(rows)}
+
+    def lines(self, dataset: str, request: Request) -> Response:
+        params = request.query_params
+        size = min(int(params.get("size", 12)), MAX_PAGE_SIZE)
+        selected, keys = self.select(dataset, params.get("qs", ""))
+        columns = [c for c in params["select"].split(",") if c] if params.get("select") else self.columns(dataset)
+
+        sort = params.get("sort")
+        if self.cursor and sort and "page" not in params:
+            if sort.lstrip("-") != "_i":
+                return JSONResponse({"error": f"tri par curseur non supporté sur {sort}"}, status_code=400)
+            start = bisect.bisect_right(keys, int(params["after"])) if "after" in params else 0
+            chunk = selected[start:start + size]
+            next_url = None
+            if start + size < len(selected):
+                next_url = str(request.url.replace(query=urlencode({**params, "after": str(chunk[-1]["_i"])})))
+        else:
+            page = int(params.get("page", 1))
+            if page * size > MAX_RESULT_WINDOW:
+                return JSONResponse(
+                    {"error": f"page * size ne peut dépasser {MAX_RESULT_WINDOW}"}, status_code=400
+                )
+            chunk = selected[(page - 1) * size:page * size]
+            next_url = None
+            if page * size < len(selected):
+                next_url = str(request.url.replace(query=urlencode({**params, "page": str(page + 1)})))
+
+        self.stats["rows_served"] += len(chunk)
+        # Corps assemblé à partir des lignes déjà encodées (l'encodage d'une page
+        # de 1000 DPE par FastAPI coûterait plus que la requête elle-même)
+        body = f'{{"total": {len(selected)}, "results": {self.encode(chunk, columns)}'
+        if next_url:
+            body += f', "next": {json.dumps(next_url)}'
+        return Response(body + "}", media_type="application/json")
+
+    def values_agg(self, dataset: str, request: Request) -> JSONResponse:
+        params = request.query_params
+        selected, _ = self.select(dataset, params.get("qs", ""))
+        fields = params["field"].split(";")
+        sizes = [int(s) for s in params.get("agg_size", "20").split(";")]
+        sizes += [sizes[-1]] * (len(fields) - len(sizes))
+        interval = params.get("interval")
+
+        def bucket_value(row: dict, field: str):
+            value = row.get(field)
+            if value is not None and interval == "month" and field.startswith("date_"):
+                return f"{str(value)[:7]}-01T00:00:00.000Z"
+            return value
+
+        def aggregate(rows: List[dict], level: int) -> Tuple[list, int]:
+            groups: Dict[object, List[dict]] = {}
+            for row in rows:
+                value = bucket_value(row, fields[level])
+                if value is not None:
+                    groups.setdefault(value, []).append(row)
+            if interval and fields[level].startswith("date_"):
+                ordered = sorted(groups.items(), key=lambda item: str(item[0]))
+            else:
+                ordered = sorted(groups.items(), key=lambda item: -len(item[1]))
+            buckets = []
+            for value, group in ordered[:sizes[level]]:
+                bucket = {"value": value, "total": len(group), "results": []}
+                if level + 1 < len(fields):
+                    bucket["aggs"], bucket["total_other"] = aggregate(group, level + 1)
+                buckets.append(bucket)
+            other = sum(len(group) for _, group in ordered[sizes[level]:])
+            return buckets, other
+
+        aggs, other = aggregate(selected, 0)
+        return JSONResponse({"total": len(selected), "total_values": len(aggs), "total_other": other, "aggs": aggs})
+
+@functools.lru_cache(maxsize=None)
+def _column_values(column: str) -> List[object]:
+    """Valeurs synthétiques d'une colonne (cycle de FILL_CYCLE valeurs, 10 % nulles)"""
+    rng = random.Random(zlib.crc32(column.encode()))
+    kind = column_type(column)
+    values = []
+    for _ in range(FILL_CYCLE):
+        if column.startswith("date_"):
+            value = (date(2021, 7, 1) + timedelta(days=rng.randrange(1600))).isoformat()
+        elif kind == "number":
+            value = round(rng.uniform(0, 10000), 2)
+        elif kind == "integer":
+            value = rng.randrange(1900, 2025) if column == "annee_construction" else rng.randrange(200)
+        elif kind == "boolean":
+            value = rng.random() < 0.5
+        else:
+            value = f"{column.split('_')[0]} {rng.randrange(97)}"
+        values.append(None if rng.random() < 0.1 else value)
+    return values
+
+def create_app(stub: AdemeStub) -> FastAPI:
+    """Application ASGI servant les routes data-fair de `stub`"""
+    app = FastAPI(title="ADEME data-fair (stub)")
+    prefix = "/data-fair/api/v1/datasets/{dataset}"
+
+    def unknown(dataset: str) -> Optional[JSONResponse]:
+        if dataset not in stub.rows:
+            return JSONResponse({"error": f"dataset {dataset} inconnu"}, status_code=404)
+        return None
+
+    @app.get(prefix + "/lines")
+    async def lines(dataset: str, request: Request):
+        stub.stats["lines"] += 1
+        refused = unknown(dataset) or await stub.admit()
+        return refused or stub.lines(dataset, request)
+
+    @app.get(prefix + "/values_agg")
+    async def values_agg(dataset: str, request: Request):
+        stub.stats["values_agg"] += 1
+        if not stub.aggregations:
+            return JSONResponse({"error": "agrégations indisponibles"}, status_code=404)
+        refused = unknown(dataset) or await stub.admit()
+        return refused or stub.values_agg(dataset, request)
+
+    @app.get(prefix + "/schema")
+    async def schema(dataset: str):
+        stub.stats["schema"] += 1
+        return unknown(dataset) or stub.schema(dataset)
+
+    @app.get("/_stub/stats")
+    async def stats():
+        return {
+            **stub.stats,
+            "rows": {dataset: len(rows) for dataset, rows in stub.rows.items()},
+            "codes": stub.codes(),
+        }
+
+    @app.post("/_stub/reset")
+    async def reset():
+        stub.reset_stats()
+        return stub.stats
+
+    @app.post("/_stub/update")
+    async def update(dataset: str, modified: int = 0, added: int = 0, day: Optional[str] = None):
+        return unknown(dataset) or stub.update(dataset, modified, added, day or date.today().isoformat())
+
+    return app
+
+def build_stub(args: argparse.Namespace) -> AdemeStub:
+    """Serveur décrit par les options de la ligne de commande"""
+    if args.fixtures:
+        rows, schemas = load_fixtures(args.fixtures)
+        if not rows:
+            raise SystemExit(f"Aucune fixture (<dataset>.jsonl) dans {args.fixtures}")
+    else:
+        codes = synthetic_codes(args.codes)
+        rows = {
+            "dpe03existant": synthetic_rows("dpe03existant", args.rows, codes, args.seed),
+            "dpe02neuf": synthetic_rows("dpe02neuf", int(args.rows * args.neufs_ratio), codes, args.seed),
+        }
+        schemas = {}
+
+    return AdemeStub(rows, schemas, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                     throttle=args.throttle, max_rate=args.max_rate, retry_after=args.retry_after,
+                     retry_after_date=args.retry_after_date, cursor=not args.no_cursor, aggregations=not args.no_agg,
+                     fill=not args.fixtures, seed=args.seed)
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Options du serveur (partagées avec benchmark_refresh.py)"""
+    parser.add_argument("--rows", type=int, default=30000, help="DPE existants synthétiques")
+    parser.add_argument("--neufs-ratio", type=float, default=0.2, help="DPE neufs / DPE existants")
+    parser.add_argument("--codes", type=int, default=20, help="Codes postaux synthétiques")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des données et des injections")
+    parser.add_argument("--fixtures", help="Répertoire de fixtures enregistrées (au lieu des données synthétiques)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence ajoutée par requête (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Gigue aléatoire ajoutée à la latence (ms)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Part des requêtes refusées par un 429")
+    parser.add_argument("--max-rate", type=float, default=0.0, help="Débit accepté (requêtes/s, 0 = illimité)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After des 429 (s)")
+    parser.add_argument("--retry-after-date", action="store_true", help="Retry-After en date HTTP plutôt qu'en secondes")
+    parser.add_argument("--no-cursor", action="store_true", help="Pas de pagination par curseur (after)")
+    parser.add_argument("--no-agg", action="store_true", help="Pas d'agrégations (values_agg en 404)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record", action="store_true",
+                        help="Enregistrer des fixtures depuis data.ademe.fr dans --fixtures, puis quitter")
+    parser.add_argument("--record-codes", default="69001", help="Codes postaux à enregistrer (séparés par des virgules)")
+    parser.add_argument("--record-limit", type=int, default=5000, help="DPE enregistrés par dataset et code postal")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.fixtures:
+            parser.error("--record nécessite --fixtures")
+        record_fixtures(args.fixtures, args.record_codes.split(","), args.record_limit)
+        return
+
+    import uvicorn
+
+    stub = build_stub(args)
+    print(f"🧪 ADEME stub sur http://{args.host}:{args.port} : "
+          + ", ".join(f"{dataset} {len(rows)} DPE" for dataset, rows in stub.rows.items()))
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
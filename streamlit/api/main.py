@@ -1,24 +1,59 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import time
+
+# Début du démarrage (journal des phases, voir log_startup_phases)
+STARTUP_BEGIN = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import joblib
-import pandas as pd
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, NamedTuple, Tuple, TYPE_CHECKING
+from contextlib import asynccontextmanager
+import asyncio
+import itertools
 import os
 import sys
+import threading
 from datetime import datetime
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# NumPy, pandas, pyarrow et ModelTrainer ne sont importés qu'au chargement des
+# modèles (thread de fond) ou à la première requête qui en a besoin : le
+# serveur accepte les connexions sans les attendre
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from utils.model_trainer import ModelTrainer
+
 # Ajouter le chemin parent pour importer les utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.model_trainer import ModelTrainer
-from utils.data_refresher import DataRefresher
+from utils.request_coalescer import RequestCoalescer
+from utils.inference_executor import InferenceExecutor, ExecutorSaturated
+from utils.prediction_cache import PredictionCache
+from utils.job_manager import Job, JobManager
+from utils.metrics import MetricsRegistry, sample_lines, BATCH_SIZE_BUCKETS, JOB_DURATION_BUCKETS
+from utils.media_types import ARROW_STREAM, PARQUET, TABLE_CONTENT_TYPES, STREAM_CONTENT_TYPES, STREAM_MEDIA_TYPES
 
+# Durée (s) de chaque phase du démarrage
+startup_phases: Dict[str, float] = {"imports": time.perf_counter() - STARTUP_BEGIN}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Le serveur accepte les connexions pendant que les modèles se chargent en arrière-plan"""
+    startup_phases["server"] = time.perf_counter() - STARTUP_BEGIN - sum(startup_phases.values())
+    threading.Thread(target=load_models_at_startup, name="model-loader", daemon=True).start()
+    yield
 
 # Initialiser FastAPI UNE SEULE FOIS
 app = FastAPI(
     title="GreenTech Solutions - API DPE",
     description="API pour prédictions énergétiques et gestion des modèles ML",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuration CORS UNE SEULE FOIS
@@ -41,25 +76,76 @@ def read_root():
         "docs": "/docs",
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "predict": "/predict",
             "predict_batch": "/predict/batch",
-            "metrics": "/models/metrics",
+            "predict_stream": "/predict/stream",
+            "model_metrics": "/models/metrics",
             "refresh_data": "/data/refresh",
-            "retrain": "/models/retrain"
+            "refresh_status": "/data/refresh/status",
+            "retrain": "/models/retrain",
+            "versions": "/models/versions",
+            "activate": "/models/activate/{version}",
+            "rollback": "/models/rollback",
+            "jobs": "/jobs/{job_id}",
+            "prometheus_metrics": "/metrics"
         }
     }
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Sonde de disponibilité : 200 une fois les modèles chargés et préchauffés, 503 avant
+    
+    /health répond dès que le serveur écoute ; /ready indique quand il peut prédire.
+    """
+    models = model_set
+    content = {
+        "ready": models is not None,
+        "model_version": models.version if models is not None else None,
+        "startup_seconds": {phase: round(duration, 3) for phase, duration in startup_phases.items()},
+        "error": startup_error
+    }
+    
+    return JSONResponse(status_code=200 if models is not None else 503, content=content)
+
 @app.get("/health")
 def health_check():
-    """Vérifier l'état de l'API"""
-    models_loaded = classifier is not None and regressor is not None
+    """Vérifier l'état de l'API (et la mémoire du worker qui répond)"""
+    models_loaded = model_set is not None
     
     return {
         "status": "healthy" if models_loaded else "degraded",
         "models_loaded": models_loaded,
+        "model_version": model_set.version if models_loaded else None,
+        "engine": INFERENCE_ENGINE,
+        "worker": worker_memory(),
+        "cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "inference": inference.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
+def worker_memory() -> Dict[str, Any]:
+    """
+    Mémoire du processus worker courant (Mo)
+    
+    rss compte aussi les pages partagées (modèles en mmap) ; pss les répartit
+    entre les processus qui les partagent, uss ne compte que les pages privées.
+    """
+    info = {"pid": os.getpid()}
+    
+    if psutil is not None:
+        mem = psutil.Process().memory_full_info()
+        for field in ("rss", "shared", "uss", "pss"):
+            if hasattr(mem, field):
+                info[f"{field}_mb"] = round(getattr(mem, field) / 2**20, 1)
+    else:
+        import resource
+        # ru_maxrss est en Ko sous Linux : pic de RSS, pas la valeur courante
+        info["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    
+    return info
+
 
 
 # === SCHEMAS PYDANTIC ===
@@ -118,6 +204,7 @@ class RefreshDataResponse(BaseModel):
     """Réponse du rafraîchissement des données"""
     status: str
     message: str
+    job_id: Optional[str] = None
     new_records: Optional[int] = None
     total_records: Optional[int] = None
 
@@ -125,129 +212,673 @@ class RetrainResponse(BaseModel):
     """Réponse du réentraînement"""
     status: str
     message: str
+    job_id: Optional[str] = None
     metrics: Optional[Dict[str, Any]] = None
 
 # === VARIABLES GLOBALES ===
 
-trainer = ModelTrainer()
-refresher = DataRefresher()
+# Nombre maximal de logements acceptés par /predict/batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+# Taille des blocs envoyés aux modèles (borne la mémoire de predict_proba)
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "2048"))
+# Nombre de lignes lues puis prédites à la fois par /predict/stream
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "5000"))
 
-# Charger les modèles au démarrage
-try:
-    classifier, regressor = trainer.load_models()
-except Exception as e:
-    print(f" Modèles non chargés au démarrage: {e}")
-    classifier, regressor = None, None
+# Pool dédié à l'inférence : threads et places en file (au-delà : HTTP 429)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+
+# Regroupement des requêtes /predict concurrentes (désactivé par défaut)
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "false").lower() == "true"
+COALESCE_MAX_WAIT_MS = float(os.getenv("COALESCE_MAX_WAIT_MS", "5"))
+COALESCE_MAX_BATCH = int(os.getenv("COALESCE_MAX_BATCH", "32"))
+
+# Moteur d'inférence : "sklearn" (par défaut), "compiled" ou "mmap" (tableaux plats)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn")
+
+# Intervalle (s) de vérification de la version active du registre (0 = désactivé)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+
+# Version servie quand le registre est vide (anciens models/*.pkl)
+LEGACY_VERSION = "legacy"
+
+# Cache des prédictions : LRU par worker (0 = désactivé) + base SQLite partagée optionnelle
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_DB = os.getenv("PREDICTION_CACHE_DB", "")
+PREDICTION_CACHE_DB_MAX = int(os.getenv("PREDICTION_CACHE_DB_MAX", "1000000"))
+
+# Enregistrements des tâches longues (rafraîchissement, réentraînement)
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")
+
+class ModelSet(NamedTuple):
+    """Paire de modèles d'une même version : une prédiction n'utilise qu'une paire"""
+    version: str
+    classifier: Any
+    regressor: Any
+
+# === MÉTRIQUES OPÉRATIONNELLES (/metrics, par worker) ===
+
+ops_metrics = MetricsRegistry()
+
+REQUEST_LATENCY = ops_metrics.histogram(
+    "api_request_duration_seconds",
+    "Durée des requêtes HTTP jusqu'à l'envoi des en-têtes",
+    ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = ops_metrics.gauge("api_requests_in_flight", "Requêtes HTTP en cours de traitement")
+INFERENCE_TIME = ops_metrics.histogram(
+    "model_inference_seconds", "Durée d'un appel aux modèles", ("model",)
+)
+INFERENCE_BATCH_ROWS = ops_metrics.histogram(
+    "model_inference_batch_rows", "Nombre de lignes par appel aux modèles", buckets=BATCH_SIZE_BUCKETS
+)
+JOB_DURATION = ops_metrics.histogram(
+    "job_duration_seconds", "Durée des tâches longues", ("type", "status"), buckets=JOB_DURATION_BUCKETS
+)
+JOB_ROWS = ops_metrics.counter("job_rows_total", "Lignes traitées par les tâches longues terminées", ("type",))
+
+def record_job_metrics(record: Dict[str, Any]):
+    """Enregistrer la durée et le volume d'une tâche terminée"""
+    JOB_DURATION.observe(record.get("duration_seconds") or 0.0, type=record["type"], status=record["status"])
+    rows = (record.get("result") or {}).get("rows")
+    if rows:
+        JOB_ROWS.inc(rows, type=record["type"])
+
+def collect_cache_metrics() -> List[str]:
+    """Compteurs du cache de prédictions, lus au moment de l'export"""
+    if prediction_cache is None:
+        return []
+    
+    stats = prediction_cache.stats()
+    return (
+        sample_lines("prediction_cache_lookups_total", "Recherches dans le cache de prédictions", "counter", [
+            ({"result": "memory_hit"}, stats["hits"]),
+            ({"result": "disk_hit"}, stats["disk_hits"]),
+            ({"result": "miss"}, stats["misses"]),
+        ])
+        + sample_lines("prediction_cache_evictions_total", "Évictions du cache de prédictions", "counter", [
+            ({"tier": "memory"}, stats["evictions"]),
+            ({"tier": "disk"}, stats["disk_evictions"]),
+        ])
+        + sample_lines("prediction_cache_entries", "Entrées du LRU", "gauge", [({}, stats["entries"])])
+        + sample_lines("prediction_cache_hit_ratio", "Part des recherches servies par le cache", "gauge",
+                       [({}, stats["hit_rate"])])
+    )
+
+def collect_inference_metrics() -> List[str]:
+    """Occupation du pool d'inférence, lue au moment de l'export"""
+    stats = inference.stats()
+    return (
+        sample_lines("inference_pending", "Tâches d'inférence en cours ou en file", "gauge", [({}, stats["pending"])])
+        + sample_lines("inference_rejected_total", "Requêtes refusées (429) faute de place dans le pool", "counter",
+                       [({}, stats["rejected"])])
+    )
+
+ops_metrics.register_collector(collect_cache_metrics)
+ops_metrics.register_collector(collect_inference_metrics)
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    """Mesurer la latence et le nombre de requêtes en cours"""
+    start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+    status = 500
+    
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_operational_metrics():
+    """
+    Métriques opérationnelles au format Prometheus (latences, inférence, cache, tâches)
+    """
+    return PlainTextResponse(ops_metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+_trainer = None
+_trainer_lock = threading.Lock()
+_refresher = None
+
+def get_trainer() -> "ModelTrainer":
+    """
+    ModelTrainer créé à la première utilisation (en général par le chargement
+    des modèles en arrière-plan) : son import charge pandas, NumPy et joblib
+    """
+    global _trainer
+    
+    if _trainer is None:
+        with _trainer_lock:
+            if _trainer is None:
+                from utils.model_trainer import ModelTrainer
+                _trainer = ModelTrainer()
+    return _trainer
+
+def get_refresher():
+    """
+    DataRefresher créé à la première utilisation : sa construction lit le
+    fichier des codes postaux et n'est utile qu'aux tâches de rafraîchissement
+    """
+    global _refresher
+    
+    if _refresher is None:
+        from utils.data_refresher import DataRefresher
+        _refresher = DataRefresher()
+    return _refresher
+jobs = JobManager(JOBS_DIR, on_finish=record_job_metrics)
+inference = InferenceExecutor(max_workers=INFERENCE_WORKERS, max_queue=INFERENCE_QUEUE_SIZE)
+
+def too_busy(retry_after: int, detail: str = "Serveur saturé, réessayez plus tard.") -> HTTPException:
+    """Réponse 429 avec l'en-tête Retry-After"""
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    db_path=PREDICTION_CACHE_DB or None,
+    disk_max_entries=PREDICTION_CACHE_DB_MAX
+) if PREDICTION_CACHE_SIZE > 0 else None
+
+def warm_up(models: ModelSet):
+    """
+    Prédiction factice sur l'exemple de DPEFeatures : la première vraie
+    requête ne paie pas les initialisations paresseuses (imports, caches)
+    """
+    example = DPEFeatures(**DPEFeatures.Config.schema_extra["example"])
+    predict_arrays(build_feature_frame([example]), models)
+
+def load_model_set(version: Optional[str] = None, phases: Optional[Dict[str, float]] = None) -> ModelSet:
+    """
+    Charger une version (par défaut la version active du registre) et la préchauffer
+    
+    phases (optionnel) reçoit la durée du chargement et du préchauffage.
+    """
+    start = time.perf_counter()
+    trainer = get_trainer()
+    if version is None:
+        version = trainer.registry.get_active_version()
+    
+    classifier, regressor = trainer.load_models(engine=INFERENCE_ENGINE, version=version)
+    models = ModelSet(version or LEGACY_VERSION, classifier, regressor)
+    loaded = time.perf_counter()
+    
+    warm_up(models)
+    
+    if phases is not None:
+        phases["models"] = loaded - start
+        phases["warmup"] = time.perf_counter() - loaded
+    return models
+
+# Modèles servis : None tant que le chargement de démarrage n'est pas terminé (voir /ready)
+model_set = None
+startup_error = None
+
+_reload_lock = threading.Lock()
+
+def reload_models_if_changed() -> bool:
+    """
+    Charger la version active du registre si ce n'est pas celle servie
+    
+    Le remplacement de model_set est atomique : une requête en cours garde
+    la paire qu'elle a lue, les suivantes utilisent la nouvelle.
+    """
+    global model_set
+    
+    with _reload_lock:
+        active = get_trainer().registry.get_active_version()
+        if active is None or (model_set is not None and model_set.version == active):
+            return False
+        
+        model_set = load_model_set(active)
+        if prediction_cache is not None:
+            prediction_cache.invalidate(active)
+    
+    print(f" Modèles version {active} chargés")
+    return True
+
+def watch_active_version():
+    """Surveiller le pointeur de version active (thread de fond, un par worker)"""
+    while True:
+        time.sleep(MODEL_RELOAD_INTERVAL)
+        try:
+            reload_models_if_changed()
+        except Exception as e:
+            print(f" Rechargement des modèles impossible: {e}")
+
+def log_startup_phases():
+    """Journaliser la durée de chaque phase du démarrage (suivi des régressions)"""
+    phases = " | ".join(f"{phase}: {duration:.2f} s" for phase, duration in startup_phases.items())
+    print(f" Démarrage du worker {os.getpid()} — {phases} | total: {sum(startup_phases.values()):.2f} s")
+
+def load_models_at_startup():
+    """Charger et préchauffer les modèles (thread de fond lancé au démarrage du serveur)"""
+    global model_set, startup_error
+    
+    try:
+        with _reload_lock:
+            if model_set is None:
+                model_set = load_model_set(phases=startup_phases)
+    except Exception as e:
+        startup_error = str(e)
+        print(f" Modèles non chargés au démarrage: {e}")
+    
+    log_startup_phases()
+    
+    if MODEL_RELOAD_INTERVAL > 0:
+        threading.Thread(target=watch_active_version, name="model-watcher", daemon=True).start()
 
 # === ENDPOINTS ===
 
-@app.get("/")
-def root():
-    """Endpoint racine"""
-    return {
-        "message": "GreenTech Solutions - API DPE",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "endpoints": {
-            "health": "/health",
-            "predict": "/predict",
-            "predict_batch": "/predict/batch",
-            "metrics": "/models/metrics",
-            "refresh_data": "/data/refresh",
-            "retrain": "/models/retrain"
-        }
+# === INFÉRENCE VECTORISÉE ===
+
+def build_feature_frame(features_list: List[DPEFeatures]) -> "pd.DataFrame":
+    """
+    Construire la matrice de features encodée pour une liste de logements
+    (colonnes dans l'ordre de ModelTrainer.FEATURES)
+    """
+    import pandas as pd
+    trainer = get_trainer()
+    columns = {
+        col: [getattr(features, col) for features in features_list]
+        for col in trainer.FEATURES
     }
+    df_input = pd.DataFrame(columns, columns=trainer.FEATURES)
+    
+    return trainer.encode_features(df_input)
 
-@app.get("/health")
-def health_check():
-    """Vérifier l'état de l'API"""
-    models_loaded = classifier is not None and regressor is not None
+def predict_arrays(df_input: "pd.DataFrame", models: ModelSet) -> Tuple["np.ndarray", "np.ndarray", Optional["np.ndarray"]]:
+    """
+    Prédire un bloc de lignes encodées : un seul predict_proba (étiquette = argmax)
+    et un seul predict du régresseur
     
-    return {
-        "status": "healthy" if models_loaded else "degraded",
-        "models_loaded": models_loaded,
-        "timestamp": datetime.now().isoformat()
-    }
+    Returns:
+        (étiquettes, coûts, probabilités ou None si le classifieur n'en fournit pas)
+    """
+    import numpy as np
+    clf, reg = models.classifier, models.regressor
+    
+    start = time.perf_counter()
+    if hasattr(clf, 'predict_proba'):
+        proba = clf.predict_proba(df_input)
+        labels = clf.classes_.take(np.argmax(proba, axis=1))
+    else:
+        proba = None
+        labels = clf.predict(df_input)
+    
+    middle = time.perf_counter()
+    couts = reg.predict(df_input)
+    end = time.perf_counter()
+    
+    INFERENCE_TIME.observe(middle - start, model="classifier")
+    INFERENCE_TIME.observe(end - middle, model="regressor")
+    INFERENCE_BATCH_ROWS.observe(len(df_input))
+    
+    return labels, couts, proba
+
+def cached_results(df_input: "pd.DataFrame", models: ModelSet) -> Tuple[List[str], List[Optional[tuple]]]:
+    """
+    Clés de cache et résultats déjà connus (None si absent) pour chaque ligne
+    
+    Un résultat est un tuple (étiquette, coût, probabilités ou None).
+    """
+    if prediction_cache is None:
+        return [], [None] * len(df_input)
+    
+    keys = prediction_cache.make_keys(models.version, df_input.to_numpy(dtype='float64'))
+    return keys, prediction_cache.get_many(keys)
+
+def to_responses(results: List[tuple], classes: List[str]) -> List[PredictionResponse]:
+    """Construire les PredictionResponse à partir des tuples de résultats"""
+    timestamp = datetime.now().isoformat()
+    
+    return [
+        PredictionResponse(
+            etiquette_dpe=label,
+            cout_total_5_usages=cout,
+            probabilities=dict(zip(classes, probas)) if probas is not None else None,
+            timestamp=timestamp
+        )
+        for label, cout, probas in results
+    ]
+
+def run_inference(df_input: "pd.DataFrame", models: ModelSet) -> List[PredictionResponse]:
+    """
+    Prédire l'étiquette et le coût pour toutes les lignes de df_input
+    
+    Les lignes déjà en cache ne sont pas recalculées ; les autres sont
+    traitées par blocs de BATCH_CHUNK_SIZE (voir predict_arrays).
+    """
+    keys, results = cached_results(df_input, models)
+    return complete_inference(df_input, models, keys, results)
+
+def complete_inference(df_input: "pd.DataFrame", models: ModelSet, keys: List[str],
+                       results: List[Optional[tuple]]) -> List[PredictionResponse]:
+    """
+    Prédire les lignes absentes du cache (résultat None) et les y enregistrer
+    
+    keys et results viennent d'une consultation déjà faite (cached_results) :
+    le cache n'est pas consulté une seconde fois.
+    """
+    classes = [str(c) for c in models.classifier.classes_]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        df_missing = df_input.iloc[missing] if len(missing) < len(df_input) else df_input
+        
+        for start in range(0, len(missing), BATCH_CHUNK_SIZE):
+            chunk = df_missing.iloc[start:start + BATCH_CHUNK_SIZE]
+            labels, couts, proba = predict_arrays(chunk, models)
+            probabilities = proba.tolist() if proba is not None else [None] * len(chunk)
+            
+            for i, label, cout, probas in zip(missing[start:start + BATCH_CHUNK_SIZE],
+                                              labels.tolist(), couts.tolist(), probabilities):
+                results[i] = (str(label), cout, probas)
+        
+        if prediction_cache is not None:
+            prediction_cache.put_many(models.version, {keys[i]: results[i] for i in missing})
+    
+    return to_responses(results, classes)
+
+def prepare_request(features: DPEFeatures, models: ModelSet) -> Tuple["pd.DataFrame", List[str], List[Optional[tuple]]]:
+    """
+    Features encodées, clé de cache et résultat en cache d'un logement
+    (exécuté dans le pool d'inférence : la consultation SQLite peut bloquer)
+    """
+    df_input = build_feature_frame([features])
+    keys, results = cached_results(df_input, models)
+    return df_input, keys, results
+
+def predict_coalesced_batch(items: List[Tuple[tuple, ModelSet]]) -> List[PredictionResponse]:
+    """
+    Inférence d'un lot regroupé par le coalescer
+    
+    Chaque élément porte les features encodées et la clé de cache calculées
+    par prepare_request (le cache a déjà été consulté, sans succès), et la
+    paire de modèles figée à l'arrivée de la requête : un lot ne mêle qu'une
+    version (group_key), celle de la clé de cache et de la réponse, même si
+    les modèles sont remplacés ou déchargés entre-temps.
+    """
+    import pandas as pd
+    models = items[0][1]
+    df_input = pd.concat([frame for (frame, _), _ in items], ignore_index=True)
+    keys = [key for (_, row_keys), _ in items for key in row_keys]
+    return complete_inference(df_input, models, keys, [None] * len(items))
+
+coalescer = RequestCoalescer(
+    predict_coalesced_batch,
+    max_wait_ms=COALESCE_MAX_WAIT_MS,
+    max_batch=COALESCE_MAX_BATCH,
+    group_key=lambda item: item[1].version
+) if COALESCE_ENABLED else None
+
+def predict_one(features: DPEFeatures, models: ModelSet) -> PredictionResponse:
+    """Inférence d'un logement (exécutée dans le pool d'inférence)"""
+    return run_inference(build_feature_frame([features]), models)[0]
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict(features: DPEFeatures):
+async def predict(features: DPEFeatures):
     """
     Prédire l'étiquette DPE et le coût total pour un logement
-    """
-    global classifier, regressor
     
-    if classifier is None or regressor is None:
+    L'inférence s'exécute dans le pool dédié (ou le coalescer) ; si sa file
+    est pleine, la requête est refusée avec 429 et Retry-After.
+    """
+    # Figer la paire de modèles pour toute la requête
+    models = model_set
+    if models is None:
         raise HTTPException(status_code=503, detail="Modèles non chargés. Veuillez entraîner les modèles d'abord.")
     
+    if coalescer is not None and coalescer.queue_depth() >= INFERENCE_QUEUE_SIZE:
+        raise too_busy(1)
+    
     try:
-        # Préparer les données
-        input_dict = features.dict()
-        df_input = pd.DataFrame([input_dict])
+        if coalescer is not None:
+            # Encodage et consultation du cache hors de la boucle d'événements ;
+            # un résultat en cache n'attend pas la fenêtre de regroupement
+            df_input, keys, results = await inference.run(prepare_request, features, models)
+            if results[0] is not None:
+                return to_responses(results, [str(c) for c in models.classifier.classes_])[0]
+            return await asyncio.wrap_future(coalescer.submit_future(((df_input, keys), models)))
         
-        # Encoder les variables catégorielles
-        type_batiment_map = {'maison': 0, 'appartement': 1, 'immeuble': 2}
-        energie_map = {
-            'Electricite': 0, 'Gaz_naturel': 1, 'Fioul domestique': 2,
-            'Reseau_de_chauffage_urbain': 3, 'Autres': 4
-        }
-        
-        df_input['type_batiment'] = df_input['type_batiment'].map(type_batiment_map).fillna(1)
-        df_input['type_energie_recodee'] = df_input['type_energie_recodee'].map(energie_map).fillna(0)
-        
-        # Prédictions
-        etiquette_pred = classifier.predict(df_input)[0]
-        cout_pred = float(regressor.predict(df_input)[0])
-        
-        # Probabilités si disponible
-        probabilities = None
-        if hasattr(classifier, 'predict_proba'):
-            proba = classifier.predict_proba(df_input)[0]
-            classes = classifier.classes_
-            probabilities = {str(c): float(p) for c, p in zip(classes, proba)}
-        
-        return PredictionResponse(
-            etiquette_dpe=etiquette_pred,
-            cout_total_5_usages=cout_pred,
-            probabilities=probabilities,
-            timestamp=datetime.now().isoformat()
-        )
+        return await inference.run(predict_one, features, models)
     
+    except ExecutorSaturated as e:
+        raise too_busy(e.retry_after)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction: {str(e)}")
 
-@app.post("/predict/batch", response_model=BatchPredictionResponse)
-def predict_batch(request: BatchPredictionRequest):
+CATEGORICAL_FEATURES = ['type_batiment', 'type_energie_recodee']
+
+# Format des corps de /predict/batch : JSON (par défaut), Arrow IPC ou Parquet
+BATCH_CONTENT_TYPES = {"application/json": "json", **TABLE_CONTENT_TYPES}
+
+def decode_batch_table(table) -> "pd.DataFrame":
+    """Décoder une table Arrow / Parquet en matrice de features encodée"""
+    from utils import arrow_io
+    trainer = get_trainer()
+    return arrow_io.table_to_features(
+        table, trainer.FEATURES,
+        categorical_maps={
+            'type_batiment': trainer.TYPE_BATIMENT_MAP,
+            'type_energie_recodee': trainer.ENERGIE_MAP
+        },
+        categorical_defaults={
+            'type_batiment': trainer.TYPE_BATIMENT_DEFAULT,
+            'type_energie_recodee': trainer.ENERGIE_DEFAULT
+        }
+    )
+
+def score_batch_request(build_frame, payload, models: ModelSet, output_format: str):
+    """Décoder puis prédire un lot de /predict/batch (une seule tâche du pool d'inférence)"""
+    return score_batch(build_frame(payload), models, output_format)
+
+def score_batch(df_input: "pd.DataFrame", models: ModelSet, output_format: str):
     """
-    Prédictions multiples pour plusieurs logements
+    Prédire un lot encodé et construire la réponse de /predict/batch
+    
+    En sortie arrow/parquet, les résultats restent en tableaux NumPy jusqu'à
+    la sérialisation (pas d'objet PredictionResponse par ligne).
     """
-    global classifier, regressor
+    if output_format == "json":
+        predictions = run_inference(df_input, models)
+        return BatchPredictionResponse(predictions=predictions, total=len(predictions))
+    
+    import numpy as np
+    from utils import arrow_io
+    chunks = [
+        predict_arrays(df_input.iloc[start:start + BATCH_CHUNK_SIZE], models)
+        for start in range(0, len(df_input), BATCH_CHUNK_SIZE)
+    ] or [predict_arrays(df_input, models)]
+    labels, couts, proba = zip(*chunks)
     
-    if classifier is None or regressor is None:
+    result = arrow_io.predictions_to_table(
+        np.concatenate(labels),
+        np.concatenate(couts),
+        np.concatenate(proba) if proba[0] is not None else None,
+        [str(c) for c in models.classifier.classes_]
+    )
+    return Response(
+        content=arrow_io.write_table(result, output_format),
+        media_type=arrow_io.MEDIA_TYPES[output_format]
+    )
+
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"$ref": "#/components/schemas/BatchPredictionRequest"}},
+                ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+                PARQUET: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+)
+async def predict_batch(request: Request, output: Optional[str] = None):
+    """
+    Prédictions multiples pour plusieurs logements
+    
+    Corps accepté : JSON ({"data": [...]}), Arrow IPC stream
+    (application/vnd.apache.arrow.stream) ou Parquet (application/vnd.apache.parquet)
+    avec une colonne par feature de ModelTrainer.FEATURES. La réponse est au
+    format de l'entrée, ou `output=json|arrow|parquet`.
+    
+    Toutes les lignes sont encodées en une seule matrice et prédites par blocs
+    (voir BATCH_CHUNK_SIZE). Au-delà de MAX_BATCH_SIZE lignes, la requête est refusée.
+    """
+    models = model_set
+    if models is None:
         raise HTTPException(status_code=503, detail="Modèles non chargés.")
     
-    try:
-        predictions = []
-        
-        for features in request.data:
-            # Utiliser l'endpoint de prédiction individuelle
-            pred = predict(features)
-            predictions.append(pred)
-        
-        return BatchPredictionResponse(
-            predictions=predictions,
-            total=len(predictions)
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    input_format = BATCH_CONTENT_TYPES.get(content_type)
+    if input_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type non supporté: {content_type} (attendu: {', '.join(BATCH_CONTENT_TYPES)})"
+        )
+    
+    output_format = output or input_format
+    if output_format not in BATCH_CONTENT_TYPES.values():
+        raise HTTPException(status_code=400, detail=f"Format de sortie inconnu: {output_format}")
+    
+    from utils import arrow_io
+    if {input_format, output_format} != {"json"} and not arrow_io.is_available():
+        raise HTTPException(status_code=415, detail="pyarrow n'est pas installé sur le serveur")
+    
+    body = await request.body()
+    
+    if input_format == "json":
+        try:
+            batch = BatchPredictionRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        n_rows = len(batch.data)
+    else:
+        try:
+            table = arrow_io.read_table(body, input_format)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Corps {input_format} illisible: {str(e)}")
+        n_rows = table.num_rows
+    
+    if n_rows > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop de logements dans la requête ({n_rows} > {MAX_BATCH_SIZE}). Découpez le lot."
         )
     
+    if input_format == "json":
+        build_frame, payload = build_feature_frame, batch.data
+    else:
+        build_frame, payload = decode_batch_table, table
+    
+    try:
+        return await inference.run(score_batch_request, build_frame, payload, models, output_format)
+    
+    except ExecutorSaturated as e:
+        raise too_busy(e.retry_after)
+    except ValueError as e:
+        # Schéma Arrow / Parquet invalide (voir arrow_io.table_to_features)
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors des prédictions: {str(e)}")
 
+def score_stream_chunk(chunk: "pd.DataFrame", models: ModelSet, output_format: str, header: bool) -> bytes:
+    """Encoder, prédire et sérialiser un bloc de /predict/stream"""
+    from utils.bulk_scoring import format_predictions
+    trainer = get_trainer()
+    valid = chunk[trainer.FEATURES].notna().all(axis=1).to_numpy()
+    
+    labels = couts = proba = None
+    if valid.any():
+        df_input = trainer.encode_features(chunk.loc[valid, trainer.FEATURES])
+        labels, couts, proba = predict_arrays(df_input, models)
+    
+    classes = [str(c) for c in models.classifier.classes_] if hasattr(models.classifier, 'classes_') else None
+    
+    return format_predictions(
+        output_format, chunk.index.to_numpy(), valid,
+        labels, couts, proba, classes, header=header
+    )
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request, output: Optional[str] = None):
+    """
+    Scoring en masse d'un fichier CSV ou NDJSON envoyé en flux
+    
+    Le corps (Content-Type text/csv ou application/x-ndjson) doit contenir les
+    colonnes de ModelTrainer.FEATURES. Il est lu et prédit par blocs de
+    STREAM_CHUNK_SIZE lignes, et les résultats sont renvoyés en flux (même
+    format que l'entrée, ou `output=csv|ndjson`) pendant la lecture de l'envoi.
+    Une ligne invalide produit une ligne de résultat avec le champ `error`.
+    """
+    models = model_set
+    if models is None:
+        raise HTTPException(status_code=503, detail="Modèles non chargés.")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    input_format = STREAM_CONTENT_TYPES.get(content_type)
+    if input_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type non supporté: {content_type or 'absent'} (attendu: {', '.join(STREAM_CONTENT_TYPES)})"
+        )
+    
+    output_format = output or input_format
+    if output_format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Format de sortie inconnu: {output_format}")
+    
+    from utils.bulk_scoring import ChunkedTableReader
+    reader = ChunkedTableReader(
+        request.stream(), input_format, STREAM_CHUNK_SIZE,
+        columns=get_trainer().FEATURES, categorical_columns=CATEGORICAL_FEATURES
+    )
+    
+    # Une fois le statut 200 envoyé, un 429 n'est plus possible : refuser maintenant
+    if inference.is_saturated():
+        raise too_busy(inference.retry_after())
+    
+    # Vérifier le schéma avant d'envoyer le statut 200
+    try:
+        await reader.start()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def generate():
+        header = True
+        async for chunk in reader.chunks():
+            # Pool plein : attendre une place (la lecture de l'envoi est suspendue d'autant)
+            yield await inference.run_when_free(score_stream_chunk, chunk, models, output_format, header)
+            header = False
+    
+    return StreamingResponse(generate(), media_type=STREAM_MEDIA_TYPES[output_format])
+
+@app.get("/predict/coalescer")
+def get_coalescer_stats():
+    """
+    Statistiques du regroupement des requêtes /predict (profondeur de file, tailles de lot)
+    """
+    if coalescer is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **coalescer.stats()}
+
 @app.get("/models/metrics", response_model=ModelMetrics)
 def get_model_metrics():
     """
     Récupérer les métriques de performance des modèles
     """
     try:
-        metrics = trainer.load_metrics()
+        metrics = get_trainer().load_metrics()
         
         if not metrics:
             raise HTTPException(status_code=404, detail="Aucune métrique disponible. Veuillez entraîner les modèles d'abord.")
@@ -259,108 +890,255 @@ def get_model_metrics():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des métriques: {str(e)}")
 
+# === TÂCHES LONGUES ===
+
+# Nombre d'appels à progress_callback dans ModelTrainer.train_all_models(save_models=True)
+TRAINING_STEPS = 6
+
+def run_refresh_job(job: Job, full_reload: bool) -> Dict[str, Any]:
+    """Rafraîchir les données (tâche de fond) ; l'avancement suit les codes postaux"""
+    refresher = get_refresher()
+    # Avancement (codes postaux terminés / prévus) par dataset, récupérés en parallèle
+    datasets = ["existants", "neufs"]
+    done = {}
+    
+    def on_progress(current, total, code_postal, source):
+        done[source] = current / total
+        job.progress(f"DPE {source} : {code_postal}", sum(done.values()), len(datasets))
+    
+    if full_reload:
+        # Fusion et écriture par code postal, directement dans une nouvelle génération
+        stats = refresher.refresh_all_data(progress_callback=on_progress, backup=True)
+        total_records = stats['total_count']
+    else:
+        new_df, stats = refresher.refresh_new_data(progress_callback=on_progress)
+        if stats['total_count'] == 0:
+            return {"new_records": 0, "message": "Aucun nouveau DPE trouvé. Les données sont à jour."}
+        # Upsert sur numero_dpe : seules les partitions (codes postaux) concernées sont écrites
+        job.progress("Sauvegarde des données")
+        total_records = refresher.upsert_new_data(new_df)['total']
+    
+    refresher.save_metadata(
+        datetime.now().strftime("%Y-%m-%d"),
+        total_records,
+        stats['existants_count'],
+        stats['neufs_count']
+    )
+    
+    return {
+        "new_records": stats['total_count'],
+        "rows": stats['total_count'],
+        "total_records": total_records,
+        "existants_count": stats['existants_count'],
+        "neufs_count": stats['neufs_count'],
+        "fetch_seconds": stats['fetch_seconds'],
+        "retries": stats['retries'],
+        "throttled": stats['throttled']
+    }
+
+def run_retrain_job(job: Job) -> Dict[str, Any]:
+    """Réentraîner les modèles (tâche de fond) ; une nouvelle version est publiée et activée"""
+    steps = itertools.count(1)
+    
+    def on_progress(message):
+        step = next(steps)
+        # La dernière étape suit la publication de la version : trop tard pour annuler
+        job.progress(message, step, TRAINING_STEPS, cancellable=step < TRAINING_STEPS)
+    
+    metrics = get_trainer().train_all_models(save_models=True, progress_callback=on_progress)
+    
+    # Recharger les modèles (les autres workers suivent via watch_active_version)
+    reload_models_if_changed()
+    
+    print(f" Réentraînement terminé (version {metrics['version']}): Classification Accuracy={metrics['classification']['accuracy']:.3f}, Regression R²={metrics['regression']['r2_score']:.3f}")
+    
+    return {
+        "version": metrics['version'],
+        "rows": metrics['classification']['train_samples'] + metrics['classification']['test_samples'],
+        "accuracy": metrics['classification']['accuracy'],
+        "r2_score": metrics['regression']['r2_score']
+    }
+
+def submit_job(job_type: str, target, params: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+    """Lancer une tâche (ou récupérer celle du même type déjà en cours)"""
+    record, created = jobs.submit(job_type, target, params)
+    if record is None:
+        raise HTTPException(status_code=409, detail=f"Une tâche {job_type} est en cours de démarrage")
+    return record, created
+
 @app.post("/data/refresh", response_model=RefreshDataResponse)
-def refresh_data(background_tasks: BackgroundTasks, full_reload: bool = False):
+def refresh_data(full_reload: bool = False):
     """
-    Rafraîchir les données depuis l'API ADEME
+    Rafraîchir les données depuis l'API ADEME (tâche de fond, suivie via /jobs/{job_id})
     
     Parameters:
     - full_reload: Si True, recharge toutes les données. Sinon, uniquement les nouveaux DPE.
+    
+    Un seul rafraîchissement s'exécute à la fois : une nouvelle demande renvoie
+    la tâche en cours.
     """
-    try:
-        if full_reload:
-            # Mode rechargement complet (tâche de fond recommandée)
-            background_tasks.add_task(perform_full_reload)
-            return RefreshDataResponse(
-                status="started",
-                message="Rechargement complet lancé en arrière-plan. Cela peut prendre plusieurs minutes."
-            )
-        else:
-            # Mode incrémental
-            new_df, new_count = refresher.refresh_new_data()
-            
-            if new_count == 0:
-                return RefreshDataResponse(
-                    status="success",
-                    message="Aucun nouveau DPE trouvé. Les données sont à jour.",
-                    new_records=0
-                )
-            
-            # Fusionner avec les données existantes
-            merged_df = refresher.merge_with_existing(new_df)
-            refresher.save_refreshed_data(merged_df, backup=True)
-            
-            return RefreshDataResponse(
-                status="success",
-                message=f"{new_count} nouveaux DPE récupérés et fusionnés.",
-                new_records=new_count,
-                total_records=len(merged_df)
-            )
+    record, created = submit_job(
+        "refresh", lambda job: run_refresh_job(job, full_reload),
+        params={"full_reload": full_reload}
+    )
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors du rafraîchissement: {str(e)}")
+    if not created:
+        return RefreshDataResponse(
+            status="already_running",
+            message="Un rafraîchissement est déjà en cours.",
+            job_id=record['id']
+        )
+    
+    mode = "complet" if full_reload else "incrémental"
+    return RefreshDataResponse(
+        status="started",
+        message=f"Rafraîchissement {mode} lancé en arrière-plan. Suivez l'avancement via /jobs/{record['id']}.",
+        job_id=record['id']
+    )
 
-def perform_full_reload():
-    """Effectuer un rechargement complet (tâche de fond)"""
-    all_results = []
-    for cp in refresher.codes_postaux:
-        results = refresher.fetch_data_smart(cp)
-        all_results.extend(results)
+@app.get("/data/refresh/status")
+def refresh_status():
+    """
+    État du rafraîchissement : tâche en cours et point de reprise
     
-    if all_results:
-        df_complete = pd.DataFrame(all_results)
-        refresher.save_refreshed_data(df_complete, backup=True)
-        refresher.save_metadata(datetime.now().strftime("%Y-%m-%d"), len(df_complete))
+    Un point de reprise "running" sans tâche en cours signale un
+    rafraîchissement interrompu : le prochain /data/refresh du même mode
+    reprend à partir des unités déjà récupérées.
+    """
+    return {
+        "job": jobs.active("refresh"),
+        "checkpoint": get_refresher().checkpoint_status()
+    }
 
 @app.post("/models/retrain", response_model=RetrainResponse)
-def retrain_models(background_tasks: BackgroundTasks):
+def retrain_models():
     """
-    Réentraîner les modèles de classification et régression
+    Réentraîner les modèles de classification et régression (tâche de fond, suivie via /jobs/{job_id})
+    
+    Un seul réentraînement s'exécute à la fois : une nouvelle demande renvoie
+    la tâche en cours.
     """
-    global classifier, regressor
+    record, created = submit_job("retrain", run_retrain_job)
     
-    try:
-        # Lancer le réentraînement en arrière-plan
-        background_tasks.add_task(perform_retraining)
-        
+    if not created:
         return RetrainResponse(
-            status="started",
-            message="Réentraînement lancé en arrière-plan. Consultez /models/metrics pour voir les résultats."
+            status="already_running",
+            message="Un réentraînement est déjà en cours.",
+            job_id=record['id']
         )
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors du réentraînement: {str(e)}")
+    return RetrainResponse(
+        status="started",
+        message=f"Réentraînement lancé en arrière-plan. Suivez l'avancement via /jobs/{record['id']}.",
+        job_id=record['id']
+    )
 
-def perform_retraining():
-    """Effectuer le réentraînement (tâche de fond)"""
-    global classifier, regressor
+@app.get("/jobs")
+def list_jobs(job_type: Optional[str] = None):
+    """
+    Lister les tâches (plus récente en premier), éventuellement d'un seul type (refresh, retrain)
+    """
+    return {"jobs": jobs.list(job_type)}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    État d'une tâche : status, stage, percent, result ou error
+    """
+    record = jobs.get(job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Tâche inconnue: {job_id}")
     
+    return record
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Annuler une tâche (prise en compte à la prochaine étape)
+    """
     try:
-        metrics = trainer.train_all_models(save_models=True)
-        
-        # Recharger les modèles
-        classifier, regressor = trainer.load_models()
+        return jobs.cancel(job_id)
+    
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/models/versions")
+def list_model_versions():
+    """
+    Versions enregistrées dans le registre, version active et historique des activations
+    """
+    registry = get_trainer().registry
+    
+    return {
+        "active": registry.get_active_version(),
+        "loaded": model_set.version if model_set is not None else None,
+        "versions": registry.list_versions(),
+        "history": registry.get_history()
+    }
+
+@app.post("/models/activate/{version}")
+def activate_model_version(version: str):
+    """
+    Activer une version du registre (tous les workers la chargent sous MODEL_RELOAD_INTERVAL secondes)
+    """
+    global model_set
+    
+    registry = get_trainer().registry
+    if not registry.exists(version):
+        raise HTTPException(status_code=404, detail=f"Version inconnue: {version}")
+    
+    try:
+        # Charger avant d'activer : une version illisible n'est jamais activée
+        new_set = load_model_set(version)
         
-        print(f" Réentraînement terminé: Classification Accuracy={metrics['classification']['accuracy']:.3f}, Regression R²={metrics['regression']['r2_score']:.3f}")
+        with _reload_lock:
+            registry.activate(version)
+            model_set = new_set
+            if prediction_cache is not None:
+                prediction_cache.invalidate(version)
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'activation: {str(e)}")
     
+    return {"status": "success", "active": version}
+
+@app.post("/models/rollback")
+def rollback_model_version():
+    """
+    Réactiver la version active précédente
+    """
+    try:
+        version = get_trainer().registry.rollback()
+        reload_models_if_changed()
+    
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        print(f" Erreur lors du réentraînement: {e}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors du retour arrière: {str(e)}")
+    
+    return {"status": "success", "active": version}
 
 @app.get("/models/info")
 def get_models_info():
     """
     Informations sur les modèles chargés
     """
-    global classifier, regressor
+    models = model_set
     
-    if classifier is None or regressor is None:
+    if models is None:
         return {
             "loaded": False,
             "message": "Aucun modèle chargé"
         }
     
+    classifier, regressor = models.classifier, models.regressor
+    
     return {
         "loaded": True,
+        "version": models.version,
+        "engine": INFERENCE_ENGINE,
         "classifier": {
             "type": type(classifier).__name__,
             "n_features": classifier.n_features_in_ if hasattr(classifier, 'n_features_in_') else None,
@@ -370,9 +1148,12 @@ def get_models_info():
             "type": type(regressor).__name__,
             "n_features": regressor.n_features_in_ if hasattr(regressor, 'n_features_in_') else None
         },
-        "features": trainer.FEATURES
+        "features": get_trainer().FEATURES
     }
 
+# Fin de l'initialisation du module (routes, pools, cache)
+startup_phases["app"] = time.perf_counter() - STARTUP_BEGIN - startup_phases["imports"]
+
 # === LANCEMENT DE L'API ===
 
 if __name__ == "__main__":
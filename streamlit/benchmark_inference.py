@@ -0,0 +1,74 @@
+"""
+Comparaison de latence : scikit-learn vs moteur d'inférence compilé
+Usage: python benchmark_inference.py [--repeat 5]
+
+Utilise les modèles de models/ (classification_model.pkl, regression_model.pkl)
+et les données de data/ si elles existent, sinon des données synthétiques.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import make_dataset
+from utils.dpe_store import dataset_exists, load_dataset
+from utils.model_trainer import ModelTrainer
+
+BATCH_SIZES = [1, 100, 10_000]
+
+def load_features(trainer: ModelTrainer, n_rows: int) -> pd.DataFrame:
+    """Charger n_rows lignes de features encodées"""
+    if dataset_exists(trainer.DATA_FILE):
+        df = load_dataset(trainer.DATA_FILE, columns=trainer.FEATURES).dropna()
+    else:
+        df = make_dataset(n=n_rows)
+
+    df = df.sample(n=n_rows, replace=len(df) < n_rows, random_state=0)
+    return trainer.encode_features(df[trainer.FEATURES]).reset_index(drop=True)
+
+def best_time(func, repeat: int) -> float:
+    """Meilleur temps d'exécution (secondes) sur `repeat` essais"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="Nombre d'essais par mesure")
+    args = parser.parse_args()
+
+    trainer = ModelTrainer()
+    classifier, regressor = trainer.load_models(engine="sklearn")
+    compiled_classifier, compiled_regressor = trainer.load_models(engine="compiled")
+
+    # Parité bit à bit avec la forêt exécutée séquentiellement
+    if hasattr(classifier, 'n_jobs'):
+        classifier.n_jobs = 1
+
+    X_all = load_features(trainer, max(BATCH_SIZES))
+
+    print(f"{'lot':>8} | {'modèle':<14} | {'sklearn (ms)':>13} | {'compilé (ms)':>13} | {'gain':>6} | parité")
+    print("-" * 78)
+
+    for batch_size in BATCH_SIZES:
+        X = X_all.iloc[:batch_size]
+
+        pairs = [
+            ("classifieur", lambda: classifier.predict_proba(X), lambda: compiled_classifier.predict_proba(X)),
+            ("régresseur", lambda: regressor.predict(X), lambda: compiled_regressor.predict(X)),
+        ]
+
+        for name, reference, compiled in pairs:
+            same = np.array_equal(reference(), compiled())
+            t_ref = best_time(reference, args.repeat) * 1000
+            t_comp = best_time(compiled, args.repeat) * 1000
+            print(f"{batch_size:>8} | {name:<14} | {t_ref:>13.2f} | {t_comp:>13.2f} | "
+                  f"{t_ref / t_comp:>5.1f}x | {'✅' if same else '❌'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Temps de chargement : CSV historique (pd.read_csv) vs jeu Parquet typé (load_dataset)
+Usage: python benchmark_load.py [--data data/donnees_ademe_finales_nettoyees_69_final_pret.csv] [--rows 200000] [--repeat 3]
+
+Le CSV (--data, sinon le fichier de données s'il existe, sinon des données
+synthétiques de --rows lignes) est importé dans un jeu partitionné
+temporaire. Pour chaque lecture : meilleur temps, mémoire du DataFrame
+(deep) et lignes ; puis taille sur disque des deux formats.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from synthetic_data import make_dataset
+from utils.dpe_store import DpeStore, FILE_EXTENSION, load_dataset, store_dir
+from utils.model_trainer import ModelTrainer
+
+def synthetic_csv(path: str, n_rows: int):
+    """CSV synthétique : features et cibles de ModelTrainer, identifiants, adresses, dates"""
+    rng = np.random.default_rng(0)
+    df = make_dataset(n=n_rows)
+    codes = np.array([f"690{i:02d}" for i in range(1, 10)] + [f"69{i}" for i in range(100, 400, 10)])
+    df.insert(0, 'numero_dpe', [f"2469E{i:08d}" for i in range(n_rows)])
+    df['code_postal_ban'] = rng.choice(codes, n_rows)
+    df['nom_commune_ban'] = "Commune " + df['code_postal_ban']
+    df['adresse_ban'] = [f"{i % 200 + 1} rue {i % 5000}" for i in range(n_rows)]
+    df['etiquette_ges'] = rng.choice(list("ABCDEFG"), n_rows)
+    df['emission_ges_5_usages'] = rng.uniform(100, 10000, n_rows)
+    df['date_etablissement_dpe'] = pd.Timestamp("2021-07-01") + pd.to_timedelta(rng.integers(0, 1500, n_rows), unit="D")
+    df['source_dpe'] = rng.choice(['existant', 'neuf'], n_rows, p=[0.8, 0.2])
+    df.to_csv(path, index=False)
+
+def disk_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def measure(func, repeat: int) -> dict:
+    """Meilleur temps sur `repeat` essais, mémoire du dernier DataFrame"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = func()
+        timings.append(time.perf_counter() - start)
+    return {"seconds": min(timings), "memory_mb": df.memory_usage(deep=True).sum() / 1e6, "rows": len(df)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="CSV à mesurer (défaut : fichier de données, sinon synthétique)")
+    parser.add_argument("--rows", type=int, default=200000, help="Lignes synthétiques")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre d'essais par mesure")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory(prefix="benchmark_load_")
+    data_file = os.path.join(workdir.name, "donnees.csv")
+    source = args.data or (ModelTrainer.DATA_FILE if os.path.exists(ModelTrainer.DATA_FILE) else None)
+    if source:
+        os.symlink(os.path.abspath(source), data_file)
+    else:
+        synthetic_csv(data_file, args.rows)
+
+    store = DpeStore(store_dir(data_file))
+    started = time.perf_counter()
+    store.import_csv(data_file)
+    print(f"📦 Import {'Parquet' if FILE_EXTENSION == '.parquet' else 'CSV (pyarrow absent)'} : "
+          f"{time.perf_counter() - started:.1f} s, {len(store.current().partitions())} partitions")
+
+    # Code postal le plus fréquent : lecture d'une seule partition
+    code = pd.read_csv(data_file, usecols=['code_postal_ban'], dtype=str)['code_postal_ban'].mode()[0]
+    code = code.split(".")[0]
+    reads = [
+        ("CSV read_csv", lambda: pd.read_csv(data_file, low_memory=False)),
+        ("toutes colonnes", lambda: load_dataset(data_file)),
+        ("colonnes modèles", lambda: load_dataset(data_file, columns=ModelTrainer.TRAINING_COLUMNS)),
+        (f"code postal {code}", lambda: load_dataset(data_file, filters=[('code_postal_ban', '==', code)])),
+    ]
+
+    print(f"{'lecture':<20} | {'lignes':>8} | {'durée (s)':>9} | {'mémoire (Mo)':>12} | {'gain':>6}")
+    print("-" * 68)
+    reference = None
+    for name, read in reads:
+        r = measure(read, args.repeat)
+        reference = reference or r["seconds"]
+        print(f"{name:<20} | {r['rows']:>8} | {r['seconds']:>9.2f} | {r['memory_mb']:>12.1f} | "
+              f"{reference / r['seconds']:>5.1f}x")
+
+    print(f"\n💾 Disque : CSV {disk_size(data_file) / 1e6:.1f} Mo, "
+          f"jeu partitionné {disk_size(store.current().directory) / 1e6:.1f} Mo")
+    workdir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Mesure d'un rafraîchissement ADEME (complet puis incrémental) contre le serveur local
+Usage: python benchmark_refresh.py [--rows 30000] [--concurrency 8] [--latency-ms 20]
+
+Démarre ademe_stub.py dans un sous-processus et y dirige DataRefresher
+(métadonnées, données, plan et point de reprise dans un répertoire
+temporaire). Entre les deux modes, le serveur rectifie et ajoute des DPE
+(--modified, --added). Pour chaque mode : DPE récupérés, durée, requêtes
+reçues par le serveur, 429 et mémoire maximale (RSS) du processus.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from ademe_stub import add_arguments
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DATASETS = ["dpe03existant", "dpe02neuf"]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_stub(args: argparse.Namespace, port: int) -> subprocess.Popen:
+    """Lancer ademe_stub.py avec les options du serveur et attendre qu'il réponde"""
+    options = {
+        "--rows": args.rows, "--neufs-ratio": args.neufs_ratio, "--codes": args.codes, "--seed": args.seed,
+        "--fixtures": args.fixtures and os.path.abspath(args.fixtures), "--latency-ms": args.latency_ms, "--jitter-ms": args.jitter_ms,
+        "--throttle": args.throttle, "--max-rate": args.max_rate, "--retry-after": args.retry_after,
+    }
+    command = [sys.executable, "ademe_stub.py", "--port", str(port)]
+    command += [str(part) for option, value in options.items() if value is not None for part in (option, value)]
+    flags = (("--retry-after-date", args.retry_after_date), ("--no-cursor", args.no_cursor), ("--no-agg", args.no_agg))
+    command += [flag for flag, enabled in flags if enabled]
+
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("Le serveur ADEME local s'est arrêté au démarrage")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/_stub/stats", timeout=1).raise_for_status()
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Le serveur ADEME local ne répond pas")
+
+class PeakMemory:
+    """RSS maximal (Mo) pendant le bloc, relevé toutes les 10 ms (psutil) ou via getrusage"""
+
+    def __enter__(self):
+        self.start = self._rss()
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, self._rss())
+
+    @staticmethod
+    def _rss() -> float:
+        if psutil is not None:
+            return psutil.Process().memory_info().rss / 1e6
+        # Linux : maximum depuis le démarrage du processus, en ko
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def server_stats(base_url: str) -> dict:
+    """Requêtes reçues et 429 renvoyés par le serveur depuis son démarrage"""
+    stats = requests.get(f"{base_url}/_stub/stats", timeout=10).json()
+    return {"requests": stats["lines"] + stats["values_agg"] + stats["schema"], "throttled": stats["throttled"]}
+
+def run_mode(name: str, refresh, base_url: str, verbose: bool) -> dict:
+    """Exécuter un rafraîchissement (récupération, fusion, enregistrement) et le mesurer"""
+    before = server_stats(base_url)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with PeakMemory() as memory, output:
+        started = time.perf_counter()
+        stats = refresh()
+        elapsed = time.perf_counter() - started
+
+    after = server_stats(base_url)
+    return {
+        "mode": name,
+        "rows": stats["total_count"],
+        "seconds": elapsed,
+        "requests": after["requests"] - before["requests"],
+        "throttled": after["throttled"] - before["throttled"],
+        "peak_mb": memory.peak,
+        "delta_mb": memory.peak - memory.start,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="Requêtes simultanées (ADEME_CONCURRENCY)")
+    parser.add_argument("--rate-limit", type=float, default=100.0, help="Débit maximal du client (ADEME_RATE_LIMIT)")
+    parser.add_argument("--pagination", choices=["cursor", "pages"], default="cursor", help="ADEME_PAGINATION")
+    parser.add_argument("--no-planner", action="store_true", help="ADEME_PLANNER=0")
+    parser.add_argument("--modified", type=int, default=500, help="DPE rectifiés par dataset avant l'incrémental")
+    parser.add_argument("--added", type=int, default=200, help="DPE ajoutés par dataset avant l'incrémental")
+    parser.add_argument("--discover", action="store_true",
+                        help="Découvrir les codes postaux par agrégation (sinon fichier des codes du serveur)")
+    parser.add_argument("--verbose", action="store_true", help="Afficher les journaux de DataRefresher")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    workdir = tempfile.TemporaryDirectory(prefix="benchmark_refresh_")
+    stub = start_stub(args, port)
+    try:
+        os.environ.update({
+            "ADEME_CONCURRENCY": str(args.concurrency),
+            "ADEME_RATE_LIMIT": str(args.rate_limit),
+            "ADEME_PAGINATION": args.pagination,
+            "ADEME_PLANNER": "0" if args.no_planner else "1",
+            "ADEME_CHECKPOINT_DIR": os.path.join(workdir.name, "refresh_checkpoint"),
+        })
+        from utils.data_refresher import DataRefresher
+
+        codes_file = os.path.join(workdir.name, "adresses-69.csv")
+        if not args.discover:
+            codes = requests.get(f"{base_url}/_stub/stats", timeout=10).json()["codes"]
+            with open(codes_file, "w") as f:
+                f.write("code_postal\n" + "\n".join(codes) + "\n")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            refresher = DataRefresher(codes_postaux_file=codes_file)
+        datasets_url = f"{base_url}/data-fair/api/v1/datasets"
+        refresher.BASE_URL_EXISTANTS = f"{datasets_url}/dpe03existant/lines"
+        refresher.BASE_URL_NEUFS = f"{datasets_url}/dpe02neuf/lines"
+        refresher.METADATA_FILE = os.path.join(workdir.name, "metadata.json")
+        refresher.DATA_FILE = os.path.join(workdir.name, "donnees.csv")
+        refresher.PLAN_FILE = os.path.join(workdir.name, "refresh_plan.json")
+
+        def full() -> dict:
+            return refresher.refresh_all_data(backup=False)
+
+        def incremental() -> dict:
+            df, stats = refresher.refresh_new_data()
+            if len(df):
+                refresher.upsert_new_data(df)
+            return stats
+
+        results = [run_mode("complet", full, base_url, args.verbose)]
+        for dataset in DATASETS:
+            requests.post(f"{base_url}/_stub/update", timeout=30,
+                          params={"dataset": dataset, "modified": args.modified, "added": args.added})
+        results.append(run_mode("incrémental", incremental, base_url, args.verbose))
+        # Compactage éventuel lancé par l'upsert : hors mesure, avant suppression du répertoire
+        refresher.dataset_store().wait_compaction()
+    finally:
+        stub.terminate()
+        stub.wait()
+        workdir.cleanup()
+
+    print(f"concurrence {args.concurrency}, pagination {args.pagination}, "
+          f"planificateur {'non' if args.no_planner else 'oui'}, latence {args.latency_ms:g} ms, "
+          f"429 {args.throttle:.0%}")
+    print(f"{'mode':<12} | {'DPE':>8} | {'durée (s)':>9} | {'requêtes':>8} | {'429':>5} | "
+          f"{'RSS max (Mo)':>12} | {'+RSS (Mo)':>9}")
+    print("-" * 82)
+    for r in results:
+        print(f"{r['mode']:<12} | {r['rows']:>8} | {r['seconds']:>9.2f} | {r['requests']:>8} | "
+              f"{r['throttled']:>5} | {r['peak_mb']:>12.1f} | {r['delta_mb']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,7 @@ def plot_conso_distribution(df):
 
 def plot_emission_by_type(df):
     fig, ax = plt.subplots()
-    df.groupby("type_batiment")["emission_ges_5_usages"].mean().plot(kind="bar", ax=ax)
+    df.groupby("type_batiment", observed=True)["emission_ges_5_usages"].mean().plot(kind="bar", ax=ax)
     ax.set_ylabel("Émissions moyennes (kgCO₂/m²)")
     ax.set_title("Émissions moyennes par type de bâtiment")
     return fig
@@ -0,0 +1,65 @@
+"""
+Migration du jeu de données DPE vers Parquet typé (à exécuter une fois)
+Usage: python migrate_to_parquet.py [--data data/donnees_ademe_finales_nettoyees_69_final_pret.csv] [--remove-csv]
+
+- Sans jeu partitionné : le CSV est importé (partitions Parquet typées selon
+  utils.dpe_schema, compressées en zstd)
+- Avec un jeu partitionné en CSV (versions précédentes) : les partitions
+  ayant des fichiers CSV sont compactées en bases Parquet, publiées comme
+  une nouvelle génération (l'ancienne reste une sauvegarde)
+
+Le nombre de DPE est vérifié avant et après. --remove-csv supprime ensuite
+le CSV historique, qui n'est plus lu.
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from utils.dpe_schema import KEY
+from utils.dpe_store import DpeStore, FILE_EXTENSION, load_dataset, store_dir
+
+DATA_FILE = "data/donnees_ademe_finales_nettoyees_69_final_pret.csv"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_FILE, help="CSV historique du jeu de données")
+    parser.add_argument("--remove-csv", action="store_true", help="Supprimer le CSV historique après vérification")
+    args = parser.parse_args()
+
+    if FILE_EXTENSION != ".parquet":
+        sys.exit("❌ pyarrow n'est pas installé : pip install -r requirements.txt")
+
+    store = DpeStore(store_dir(args.data))
+    if store.exists():
+        generation = store.current()
+        expected = generation.count()
+        partitions = generation.legacy_partitions()
+        if not partitions:
+            print(f"✅ {store.directory} est déjà en Parquet ({expected:,} DPE)")
+        else:
+            print(f"🗜️ Conversion de {len(partitions)} partitions CSV en Parquet")
+            store.compact(partitions)
+    elif os.path.exists(args.data):
+        expected = pd.read_csv(args.data, usecols=[KEY], dtype=str)[KEY].nunique()
+        print(f"📦 Import de {args.data} ({expected:,} DPE) dans {store.directory}")
+        store.import_csv(args.data)
+    else:
+        sys.exit(f"❌ Données introuvables : {args.data}")
+
+    generation = store.current()
+    remaining = generation.legacy_partitions()
+    loaded = len(load_dataset(args.data, columns=[KEY]))
+    if loaded != expected or remaining:
+        sys.exit(f"❌ Vérification échouée : {loaded:,} DPE lus pour {expected:,} attendus, "
+                 f"{len(remaining)} partitions encore en CSV")
+    print(f"✅ {loaded:,} DPE en Parquet ({os.path.basename(generation.directory)})")
+
+    if args.remove_csv and os.path.exists(args.data):
+        os.remove(args.data)
+        print(f"🗑️ {args.data} supprimé")
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,21 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from pages.about import footer
+from utils.dpe_store import load_dataset
 import matplotlib.pyplot as plt
 
+# Colonnes affichées par la page (seules lues dans le jeu Parquet)
+COLUMNS = [
+    'type_batiment', 'type_energie_recodee', 'etiquette_dpe', 'code_postal_ban',
+    'cout_total_5_usages', 'conso_5_usages_par_m2_ef', 'conso_5_usages_ef', 'emission_ges_5_usages',
+    'conso_ecs_ef', 'conso_auxiliaires_ef', 'conso_refroidissement_ef', 'surface_habitable_logement',
+    'latitude', 'longitude',
+]
+
 # --- Charger les données ---
 @st.cache_data
 def load_data(path):
-    return pd.read_csv(path)
+    return load_dataset(path, columns=COLUMNS)
 
 
 # --- Page principale ---
@@ -59,7 +68,7 @@ def show():
             col1, col2 = st.columns(2)
 
             with col1:
-                energie_cout = df.groupby('type_energie_recodee')['cout_total_5_usages'].mean().sort_values(ascending=False).head(10)
+                energie_cout = df.groupby('type_energie_recodee', observed=True)['cout_total_5_usages'].mean().sort_values(ascending=False).head(10)
                 fig_cout = go.Figure([
                     go.Bar(
                         x=energie_cout.values,
@@ -86,7 +95,7 @@ def show():
                 st.plotly_chart(fig_box, use_container_width=True)
 
             st.markdown("#### Statistiques par étiquette DPE")
-            stats_etiquette = df.groupby('etiquette_dpe').agg({
+            stats_etiquette = df.groupby('etiquette_dpe', observed=True).agg({
                 'cout_total_5_usages': ['mean', 'min', 'max'],
                 'type_batiment': 'count'
             }).round(0)
@@ -99,7 +108,7 @@ def show():
             col1, col2 = st.columns(2)
 
             with col1:
-                type_conso = df.groupby('type_batiment')['conso_5_usages_par_m2_ef'].mean().sort_values(ascending=False)
+                type_conso = df.groupby('type_batiment', observed=True)['conso_5_usages_par_m2_ef'].mean().sort_values(ascending=False)
                 fig_type = px.bar(
                     x=type_conso.index,
                     y=type_conso.values,
@@ -149,7 +158,7 @@ def show():
             col1, col2 = st.columns(2)
 
             with col1:
-                ges_energie = df.groupby('type_energie_recodee')['emission_ges_5_usages'].mean().sort_values(ascending=False).head(10)
+                ges_energie = df.groupby('type_energie_recodee', observed=True)['emission_ges_5_usages'].mean().sort_values(ascending=False).head(10)
                 fig_ges = px.bar(
                     x=ges_energie.index, y=ges_energie.values,
                     labels={'x': "Type d'énergie", 'y': 'Émissions (kg CO₂)'},
@@ -170,7 +179,7 @@ def show():
                 fig_scatter_ges.update_layout(title="Relation Consommation / Émissions GES", height=400)
                 st.plotly_chart(fig_scatter_ges, use_container_width=True)
 
-            ges_etiquette = df.groupby('etiquette_dpe')['emission_ges_5_usages'].mean().sort_index()
+            ges_etiquette = df.groupby('etiquette_dpe', observed=True)['emission_ges_5_usages'].mean().sort_index()
             fig_ges_etiq = go.Figure([go.Bar(
                 x=ges_etiquette.index, y=ges_etiquette.values,
                 marker=dict(color=['#00A550', '#52B153', '#C3D545', '#FFF033', '#F39200', '#ED2124', '#CC0033']),
@@ -233,7 +242,7 @@ def show():
             with col2:
                 st.markdown("<h4 font-size:16px;'> Top 10 codes postaux — consommation moyenne</h4>", unsafe_allow_html=True)
                 cp_conso = (
-                    df.groupby('code_postal_ban')['conso_5_usages_par_m2_ef']
+                    df.groupby('code_postal_ban', observed=True)['conso_5_usages_par_m2_ef']
                     .mean()
                     .sort_values(ascending=False)
                     .head(10)
@@ -258,7 +267,7 @@ def show():
 
         col1, col2, col3 = st.columns(3)
         with col1:
-            energie_la_plus_chere = df.groupby('type_energie_recodee')['cout_total_5_usages'].mean().idxmax()
+            energie_la_plus_chere = df.groupby('type_energie_recodee', observed=True)['cout_total_5_usages'].mean().idxmax()
             st.info(f" **Énergie la plus coûteuse** : {energie_la_plus_chere}")
         with col2:
             etiquette_la_plus_commune = df['etiquette_dpe'].mode()[0]
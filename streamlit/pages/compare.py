@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from utils.dpe_store import load_dataset
 
 def show():
     st.title("⚖️ Comparer les logements")
     st.markdown("### Comparaison détaillée côte à côte")
 
     try:
-        df = pd.read_csv("data/donnees_ademe_finales_nettoyees_69_final_pret.csv")
+        df = load_dataset(
+            "data/donnees_ademe_finales_nettoyees_69_final_pret.csv",
+            columns=['type_batiment', 'etiquette_dpe', 'etiquette_ges', 'code_postal_ban', 'type_energie_recodee',
+                     'surface_habitable_logement', 'cout_total_5_usages', 'conso_5_usages_par_m2_ef',
+                     'conso_5_usages_ef', 'emission_ges_5_usages']
+        )
         
         # Créer un identifiant unique pour chaque logement
         df['id_logement'] = df.apply(
@@ -10,15 +10,11 @@ from io import BytesIO
 import os
 
 @st.cache_resource
-def load_models():
-    import joblib, os
-    if not os.path.exists("models/classification_model.pkl") or not os.path.exists("models/regression_model.pkl"):
-        return None, None
-
+def load_models(version=None):
+    from utils.model_trainer import ModelTrainer
     try:
-        model_classification = joblib.load("models/classification_model.pkl")
-        model_regression = joblib.load("models/regression_model.pkl")
-        return model_classification, model_regression
+        # INFERENCE_ENGINE=compiled : moteur à tableaux plats (voir utils.compiled_models)
+        return ModelTrainer().load_models(engine=os.getenv("INFERENCE_ENGINE", "sklearn"), version=version)
     except Exception as e:
         return None, None
 
@@ -53,8 +49,9 @@ def show():
     st.title(" Prédiction de Performance Énergétique")
     st.markdown("### Estimez l'étiquette DPE et le coût énergétique d'un logement")
     
-    # Charger les modèles
-    model_classif, model_regress = load_models()
+    # Charger les modèles (la version active sert de clé de cache)
+    from utils.model_registry import ModelRegistry
+    model_classif, model_regress = load_models(ModelRegistry().get_active_version())
     
     if model_classif is None or model_regress is None:
         st.info(" Placez vos modèles dans le dossier `models/` avec les noms :\n- `classification_model.pkl`\n- `regression_model.pkl`")
@@ -9,6 +9,7 @@ import plotly.express as px
 # Ajouter le chemin parent pour importer utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.data_refresher import DataRefresher
+from utils.dpe_store import dataset_exists, load_dataset
 
 def show():
     st.title(" Rafraîchissement des Données")
@@ -58,17 +59,18 @@ def show():
     
     last_update = refresher.get_last_update_date()
     
+    # Une seule lecture, limitée à la colonne source_dpe
+    df = load_dataset(refresher.DATA_FILE, columns=['source_dpe']) if dataset_exists(refresher.DATA_FILE) else None
+    
     with col1:
-        if os.path.exists(refresher.DATA_FILE):
-            df = pd.read_csv(refresher.DATA_FILE)
+        if df is not None:
             st.metric(" Total DPE", f"{len(df):,}")
         else:
             st.metric(" Total DPE", "0")
     
     with col2:
         # Afficher le nombre de DPE existants si la colonne source_dpe existe
-        if os.path.exists(refresher.DATA_FILE):
-            df = pd.read_csv(refresher.DATA_FILE)
+        if df is not None:
             if 'source_dpe' in df.columns:
                 existants = len(df[df['source_dpe'] == 'existant'])
                 st.metric(" DPE Existants", f"{existants:,}")
@@ -79,8 +81,7 @@ def show():
     
     with col3:
         # Afficher le nombre de DPE neufs si la colonne source_dpe existe
-        if os.path.exists(refresher.DATA_FILE):
-            df = pd.read_csv(refresher.DATA_FILE)
+        if df is not None:
             if 'source_dpe' in df.columns:
                 neufs = len(df[df['source_dpe'] == 'neuf'])
                 st.metric(" DPE Neufs", f"{neufs:,}")
@@ -95,6 +96,15 @@ def show():
         else:
             st.metric(" Dernière màj", "Jamais")
     
+    # Rafraîchissement en cours ou interrompu (plantage, redéploiement, session fermée)
+    checkpoint = refresher.checkpoint_status()
+    if checkpoint['status'] != 'none':
+        st.info(
+            f" Rafraîchissement non terminé ({checkpoint['updated_at'][:16].replace('T', ' ')}) : "
+            f"{checkpoint['units_done']} unités, {checkpoint['rows_saved']:,} DPE déjà récupérés. "
+            "Relancer le même mode reprend à partir de ce point."
+        )
+    
     st.markdown("---")
     
     # Options de rafraîchissement
@@ -113,7 +123,7 @@ def show():
         create_backup = st.checkbox(
             "Créer une sauvegarde",
             value=True,
-            help="Créer une sauvegarde des données actuelles avant la mise à jour"
+            help="Conserver les données actuelles comme sauvegarde (liens en dur : seuls les fichiers modifiés occupent de la place)"
         )
     
     st.markdown("---")
@@ -149,16 +159,13 @@ def show():
                 else:
                     status_text.info(f" Fusion de {stats['total_count']} nouveaux DPE avec les données existantes...")
                     
-                    # Fusionner avec les données existantes
-                    merged_df = refresher.merge_with_existing(new_df)
-                    
-                    # Sauvegarder
-                    refresher.save_refreshed_data(merged_df, backup=create_backup)
+                    # Upsert sur numero_dpe : seules les partitions concernées sont écrites
+                    upsert = refresher.upsert_new_data(new_df, backup=create_backup)
                     
                     # Mettre à jour les métadonnées
                     refresher.save_metadata(
                         datetime.now().strftime("%Y-%m-%d"),
-                        len(merged_df),
+                        upsert['total'],
                         stats['existants_count'],
                         stats['neufs_count']
                     )
@@ -185,7 +192,7 @@ def show():
                                 delta=f"+{stats['neufs_count']}")
                     
                     with col4:
-                        st.metric(" Total après màj", f"{len(merged_df):,}")
+                        st.metric(" Total après màj", f"{upsert['total']:,}")
                     
                     # Graphique de répartition
                     if 'source_dpe' in new_df.columns:
@@ -236,31 +243,28 @@ def show():
                 # Mode complet : recharger toutes les données
                 status_text.warning(" Mode rechargement complet activé. Cela peut prendre plusieurs minutes...")
                 
-                def update_progress(current, total, code_postal):
+                def update_progress(current, total, code_postal, source):
                     progress = current / total
                     progress_bar.progress(progress)
-                    status_text.info(f" Téléchargement complet... {code_postal} ({current}/{total})")
-                
-                # Utiliser la logique de fetch_data_smart pour tout recharger
-                all_results = []
-                total_codes = len(refresher.codes_postaux)
+                    status_text.info(f" Téléchargement complet DPE {source}...")
+                    detail_text.caption(f"Code postal : {code_postal} ({current}/{total})")
                 
-                for idx, cp in enumerate(refresher.codes_postaux):
-                    update_progress(idx + 1, total_codes, cp)
-                    results = refresher.fetch_data_smart(cp)
-                    all_results.extend(results)
+                # Récupération puis écriture code postal par code postal dans une nouvelle génération
+                stats = refresher.refresh_all_data(progress_callback=update_progress, backup=create_backup)
                 
-                if not all_results:
+                if stats['total_count'] == 0:
                     status_text.error(" Aucune donnée récupérée")
                 else:
-                    status_text.info(" Sauvegarde des données...")
-                    
-                    df_complete = pd.DataFrame(all_results)
-                    refresher.save_refreshed_data(df_complete, backup=create_backup)
-                    refresher.save_metadata(datetime.now().strftime("%Y-%m-%d"), len(df_complete))
+                    refresher.save_metadata(
+                        datetime.now().strftime("%Y-%m-%d"),
+                        stats['total_count'],
+                        stats['existants_count'],
+                        stats['neufs_count']
+                    )
                     
                     progress_bar.progress(1.0)
-                    status_text.success(f" Rechargement complet terminé ! {len(df_complete):,} DPE récupérés.")
+                    status_text.success(f" Rechargement complet terminé ! {stats['total_count']:,} DPE récupérés.")
+                    detail_text.empty()
                     
                     st.balloons()
         
@@ -289,8 +293,12 @@ def show():
         - En cas de doublon, la version la plus récente est conservée
         
         **Sauvegarde** :
-        - Une sauvegarde horodatée est créée avant chaque mise à jour si l'option est activée
-        - Format : `donnees_ademe_finales_nettoyees_69_final_pret.csv.backup_YYYYMMDD_HHMMSS`
+        - Les données sont rangées par code postal (`donnees_ademe_finales_nettoyees_69_final_pret_store/`)
+        - Une mise à jour incrémentale n'écrit que les codes postaux concernés (un fichier delta chacun)
+        - Les codes postaux accumulant trop de deltas sont compactés en arrière-plan, sans bloquer la lecture
+        - Chaque rafraîchissement écrit une nouvelle génération (`gen-NNNNNN/`), publiée d'un coup : les pages lisent l'ancienne jusqu'à la fin de l'écriture
+        - Si l'option est activée, la génération remplacée est conservée comme sauvegarde
+        - Rétention : `DPE_BACKUP_KEEP` sauvegardes au plus, pendant `DPE_BACKUP_MAX_AGE_DAYS` jours
         """)
     
     with st.expander(" Configuration des codes postaux"):
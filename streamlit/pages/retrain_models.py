@@ -9,6 +9,7 @@ from datetime import datetime
 # Ajouter le chemin parent pour importer utils
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.model_trainer import ModelTrainer
+from utils.dpe_store import dataset_exists, load_dataset
 
 def show():
     st.title(" Réentraînement des Modèles")
@@ -18,7 +19,7 @@ def show():
     trainer = ModelTrainer()
     
     # Vérifier si les données existent
-    if not os.path.exists(trainer.DATA_FILE):
+    if not dataset_exists(trainer.DATA_FILE):
         st.error(" Fichier de données introuvable. Veuillez d'abord charger ou rafraîchir les données.")
         st.info(f" Fichier attendu : {trainer.DATA_FILE}")
         return
@@ -138,7 +139,7 @@ def show():
     # Aperçu des données
     st.markdown("####  Aperçu des données d'entraînement")
     
-    df_preview = pd.read_csv(trainer.DATA_FILE)
+    df_preview = load_dataset(trainer.DATA_FILE, columns=trainer.TRAINING_COLUMNS)
     
     col1, col2, col3 = st.columns(3)
     
@@ -211,7 +212,7 @@ def show():
             update_status(" Chargement des données...")
             progress_bar.progress(0.1)
             
-            df = pd.read_csv(trainer.DATA_FILE)
+            df = load_dataset(trainer.DATA_FILE, columns=trainer.TRAINING_COLUMNS)
             
             # Préparer les données
             update_status(" Préparation des données...")
@@ -249,14 +250,15 @@ def show():
             # Sauvegarder les modèles
             update_status(" Sauvegarde des modèles...")
             
-            trainer.save_models(classifier, regressor)
-            trainer.save_metrics({
-                'classification': classif_metrics,
-                'regression': regress_metrics
-            })
+            # Nouvelle version du registre, activée immédiatement (l'API la charge sans redémarrer)
+            version = trainer.publish_models(
+                classifier, regressor,
+                {'classification': classif_metrics, 'regression': regress_metrics},
+                data_path=trainer.DATA_FILE
+            )
             
             progress_bar.progress(1.0)
-            status_text.success(" Entraînement terminé avec succès !")
+            status_text.success(f" Entraînement terminé avec succès ! Version active : {version}")
             
             st.balloons()
             
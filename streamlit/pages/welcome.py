@@ -5,6 +5,7 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
 from pages.about import footer
+from utils.dpe_store import load_dataset
 
 def show():
     # Bandeau principal avec image de fond
@@ -58,7 +59,11 @@ def show():
 
     # KPIs principaux
     try:
-        df = pd.read_csv("data/donnees_ademe_finales_nettoyees_69_final_pret.csv")
+        df = load_dataset(
+            "data/donnees_ademe_finales_nettoyees_69_final_pret.csv",
+            columns=['conso_5_usages_par_m2_ef', 'cout_total_5_usages', 'emission_ges_5_usages',
+                     'etiquette_dpe', 'type_energie_recodee']
+        )
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -127,7 +132,7 @@ def show():
         with col2:
             st.markdown("###  Consommation par type d'énergie")
             
-            energie_stats = df.groupby('type_energie_recodee').agg({
+            energie_stats = df.groupby('type_energie_recodee', observed=True).agg({
                 'conso_5_usages_par_m2_ef': 'mean',
                 'cout_total_5_usages': 'mean'
             }).reset_index()
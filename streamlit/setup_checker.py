@@ -87,7 +87,8 @@ REQUIRED_PACKAGES = [
     'uvicorn',
     'pydantic',
     'requests',
-    'joblib'
+    'joblib',
+    'pyarrow'
 ]
 
 def check_file_exists(filepath):
@@ -161,7 +162,10 @@ def check_data_files():
     data_file = "data/donnees_ademe_finales_nettoyees_69_final_pret.csv"
     codes_postaux_file = "data/adresses-69.csv"
     
-    if check_file_exists(data_file):
+    store_dir = "data/donnees_ademe_finales_nettoyees_69_final_pret_store"
+    if check_file_exists(os.path.join(store_dir, "CURRENT")) or check_file_exists(os.path.join(store_dir, "index.db")):
+        print_success(f"  Données DPE trouvées: {store_dir} (partitions par code postal)")
+    elif check_file_exists(data_file):
         print_success(f"  Données DPE trouvées: {data_file}")
         # Vérifier la taille
         size_mb = os.path.getsize(data_file) / (1024 * 1024)
@@ -0,0 +1,42 @@
+"""
+Données synthétiques pour les tests et les benchmarks
+Usage: from synthetic_data import make_dataset, make_features
+
+Jeu reproductible avec les features et les cibles de ModelTrainer : la
+classe DPE suit la consommation par m² et le coût la consommation totale,
+au bruit près, pour que les modèles entraînés dessus aient des sorties
+réalistes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.model_trainer import ModelTrainer
+
+def make_dataset(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    """Jeu de données synthétique avec les features de ModelTrainer"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'conso_auxiliaires_ef': rng.uniform(0, 2000, n),
+        'cout_eclairage': rng.uniform(20, 200, n),
+        'conso_5_usages_par_m2_ef': rng.uniform(50, 500, n),
+        'conso_5_usages_ef': rng.uniform(1000, 60000, n),
+        'surface_habitable_logement': rng.uniform(15, 250, n),
+        'cout_ecs': rng.uniform(50, 800, n),
+        'type_batiment': rng.choice(['maison', 'appartement', 'immeuble'], n),
+        'conso_ecs_ef': rng.uniform(0, 5000, n),
+        'conso_refroidissement_ef': rng.choice([0.0, 0.0, 150.0], n),
+        'type_energie_recodee': rng.choice(list(ModelTrainer.ENERGIE_MAP), n),
+    })
+    noise = rng.normal(0, 40, n)
+    df['etiquette_dpe'] = pd.cut(
+        df['conso_5_usages_par_m2_ef'] + noise,
+        [-np.inf, 100, 150, 200, 250, 330, 420, np.inf],
+        labels=list("ABCDEFG")
+    ).astype(str)
+    df['cout_total_5_usages'] = df['conso_5_usages_ef'] * 0.15 + noise
+    return df
+
+def make_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Features encodées comme à l'entraînement"""
+    return ModelTrainer().encode_features(df[ModelTrainer.FEATURES])
@@ -0,0 +1,270 @@
+"""
+Tests de la couche HTTP ADEME (AdemeTransport, TokenBucket) contre ademe_stub.py
+Usage: python test_ademe_transport.py  (ou pytest test_ademe_transport.py)
+
+Le serveur local tourne dans un thread : 429 avec Retry-After (secondes
+ou date HTTP), nouvelles tentatives épuisées, débit adaptatif (AIMD) et
+compteurs ; repli sur la pagination par numéro de page sans curseur et
+découverte des codes postaux avec son cache.
+"""
+
+import asyncio
+import contextlib
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from ademe_stub import AdemeStub, create_app, synthetic_codes, synthetic_rows
+from test_data_refresher import make_refresher
+from utils.data_refresher import AdemeAPIError, AdemeTransport, DataRefresher, TokenBucket
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextlib.contextmanager
+def running_stub(rows: int = 3000, codes: int = 3, **options):
+    """Serveur ademe_stub dans un thread ; renvoie (stub, URL de base)"""
+    import uvicorn
+
+    names = synthetic_codes(codes)
+    stub = AdemeStub({
+        "dpe03existant": synthetic_rows("dpe03existant", rows, names),
+        "dpe02neuf": synthetic_rows("dpe02neuf", rows // 5, names),
+    }, **options)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(stub), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "serveur local jamais démarré"
+        time.sleep(0.01)
+    try:
+        yield stub, f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+def lines_url(base_url: str, dataset: str = "dpe03existant") -> str:
+    return f"{base_url}/data-fair/api/v1/datasets/{dataset}/lines"
+
+def stub_refresher(directory: str, base_url: str, max_concurrency: int = 1) -> DataRefresher:
+    """DataRefresher isolé dans `directory`, pointé sur le serveur local"""
+    refresher = make_refresher(directory)
+    refresher.BASE_URL_EXISTANTS = lines_url(base_url, "dpe03existant")
+    refresher.BASE_URL_NEUFS = lines_url(base_url, "dpe02neuf")
+    refresher.max_concurrency = max_concurrency
+    return refresher
+
+PARAMS = {"qs": "code_postal_ban:69001", "size": 1}
+
+def test_token_bucket():
+    """Rafale, attente entre jetons, pause et division du débit sur 429, remontée progressive"""
+    print_section("🪣 TokenBucket")
+    bucket = TokenBucket(10, burst=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert 0.08 <= bucket.reserve() <= 0.1
+
+    bucket.throttled(pause=0.5)
+    assert bucket.rate == 5
+    assert bucket.reserve() >= 0.45, "pause du Retry-After ignorée"
+    for _ in range(10):
+        bucket.throttled()
+    assert bucket.rate == bucket.min_rate == 0.5
+
+    bucket.succeeded()
+    assert bucket.rate == 1.0  # + 5 % du débit maximal par succès
+    for _ in range(30):
+        bucket.succeeded()
+    assert bucket.rate == bucket.max_rate == 10
+    print("✅ Débit divisé par deux jusqu'au plancher, remonté jusqu'au maximum")
+
+def test_retry_after():
+    """429 avec Retry-After en secondes puis en date HTTP : attente respectée, puis succès"""
+    print_section("⏳ 429 et Retry-After")
+    # Au plus 1 requête par seconde : la deuxième requête est refusée
+    for retry_after, as_date in ((1.0, False), (3.0, True)):
+        with running_stub(max_rate=1, retry_after=retry_after, retry_after_date=as_date) as (stub, base_url):
+            transport = AdemeTransport(rate_limit=50, max_retries=3)
+            assert transport.get_json(lines_url(base_url), PARAMS)["total"] > 0
+
+            started = time.perf_counter()
+            data = transport.get_json(lines_url(base_url), PARAMS)
+            elapsed = time.perf_counter() - started
+
+            assert len(data["results"]) == 1
+            # Date HTTP à la seconde près : attente d'au moins retry_after - 1 s
+            assert elapsed >= retry_after - (1.0 if as_date else 0.05), elapsed
+            stats = transport.stats()
+            assert stats["requests"] == 3 and stats["throttled"] == 1 and stats["retries"] == 1, stats
+            assert stats["failures"] == 0 and stub.stats["throttled"] == 1
+            assert stats["rate_limit"] == 27.5, "débit non divisé par deux puis remonté"
+            print(f"✅ Retry-After {'date HTTP' if as_date else 'secondes'} : {elapsed:.2f} s d'attente")
+
+def test_retries_exhausted():
+    """Nouvelles tentatives épuisées : AdemeAPIError et compteurs, en bloquant comme en asynchrone"""
+    print_section("🛑 Tentatives épuisées")
+    with running_stub(throttle=1.0, retry_after=0) as (stub, base_url):
+        transport = AdemeTransport(rate_limit=50, max_retries=2)
+        try:
+            transport.get_json(lines_url(base_url), PARAMS)
+        except AdemeAPIError as e:
+            assert "3 tentatives (HTTP 429)" in str(e), str(e)
+        else:
+            raise AssertionError("AdemeAPIError attendue")
+        stats = transport.stats()
+        assert (stats["requests"], stats["throttled"], stats["retries"], stats["failures"]) == (3, 3, 2, 1), stats
+        assert stats["rate_limit"] == 6.25 and stub.stats["throttled"] == 3
+
+        async def fetch():
+            async with transport.async_client() as client:
+                return await transport.aget_json(client, lines_url(base_url), PARAMS)
+
+        transport.reset_stats()
+        try:
+            asyncio.run(fetch())
+        except AdemeAPIError:
+            pass
+        else:
+            raise AssertionError("AdemeAPIError attendue (aget_json)")
+        assert transport.stats()["throttled"] == 3 and transport.stats()["failures"] == 1
+
+        # Réponse 4xx hors 429 : pas de nouvelle tentative
+        stub.throttle = 0.0
+        transport.reset_stats()
+        assert transport.get_json(lines_url(base_url, "inconnu"), PARAMS) is None
+        assert transport.stats()["requests"] == 1 and transport.stats()["retries"] == 0
+
+    transport = AdemeTransport(max_retries=1, backoff_base=0.01, connect_timeout=1)
+    try:
+        transport.get_json(lines_url(f"http://127.0.0.1:{free_port()}"), PARAMS)
+    except AdemeAPIError as e:
+        assert "ConnectionError" in str(e), str(e)
+    else:
+        raise AssertionError("AdemeAPIError attendue (serveur injoignable)")
+    stats = transport.stats()
+    assert (stats["network_errors"], stats["retries"], stats["failures"]) == (2, 1, 1), stats
+    print("✅ 429 répétés, 404 et erreurs réseau comptés")
+
+def test_rate_recovery():
+    """Un 429 divise le débit par deux ; chaque succès le remonte de 5 % du maximum"""
+    print_section("📈 Débit adaptatif")
+    with running_stub(throttle=1.0, retry_after=0) as (stub, base_url):
+        transport = AdemeTransport(rate_limit=40, max_retries=0)
+        try:
+            transport.get_json(lines_url(base_url), PARAMS)
+        except AdemeAPIError:
+            pass
+        assert transport.stats()["rate_limit"] == 20
+
+        stub.throttle = 0.0
+        rates = []
+        for _ in range(12):
+            transport.get_json(lines_url(base_url), PARAMS)
+            rates.append(transport.stats()["rate_limit"])
+        assert rates[:5] == [22, 24, 26, 28, 30], rates
+        assert rates[-1] == 40, "débit maximal dépassé ou jamais retrouvé"
+    print("✅ 40 -> 20 -> 40 requêtes/s")
+
+def test_pagination_fallback():
+    """
+    Sans curseur (--no-cursor), repli sur les pages (fetch_data_smart) : mêmes
+    DPE, support mémorisé par URL pour ne plus tenter le curseur
+    """
+    print_section("📑 Repli sans curseur")
+    for max_concurrency in (1, 4):
+        with running_stub(cursor=False) as (stub, base_url), tempfile.TemporaryDirectory() as directory:
+            refresher = stub_refresher(directory, base_url, max_concurrency)
+            refresher.use_planner = False
+            refresher.codes_postaux = ["69001", "69002"]
+            fetched = []
+            original = refresher.fetch_data_smart
+            refresher.fetch_data_smart = lambda cp, *args, **kwargs: fetched.append(cp) or original(cp, *args, **kwargs)
+
+            table = refresher.fetch_pages(["existants"])["existants"].to_table(columns=["numero_dpe", "code_postal_ban"])
+            counts = Counter(row["code_postal_ban"] for row in stub.rows["dpe03existant"])
+            assert counts["69001"] > refresher.PAGE_SIZE, "une seule page : curseur jamais mis à l'épreuve"
+            assert dict(Counter(table.column("code_postal_ban").to_pylist())) == {
+                cp: counts[cp] for cp in refresher.codes_postaux
+            }
+            assert len(set(table.column("numero_dpe").to_pylist())) == table.num_rows, "DPE en double"
+            assert refresher._cursor_support[refresher.BASE_URL_EXISTANTS] is False
+            if max_concurrency == 1:
+                assert fetched == ["69001", "69002"], fetched
+            print(f"✅ {'Séquentiel' if max_concurrency == 1 else 'Asynchrone'} : {table.num_rows} DPE par pages")
+
+def test_discover_codes_postaux():
+    """Codes postaux découverts par agrégation, gardés codes_ttl secondes dans les métadonnées"""
+    print_section("🔍 Découverte des codes postaux")
+    with running_stub(codes=5) as (stub, base_url), tempfile.TemporaryDirectory() as directory:
+        refresher = stub_refresher(directory, base_url)
+        assert refresher.codes_postaux == stub.codes()
+        assert stub.stats["values_agg"] == 2  # un dataset après l'autre
+
+        # Nouvelle instance : codes repris des métadonnées, sans requête
+        cached = stub_refresher(directory, base_url)
+        assert cached.codes_postaux == stub.codes() and stub.stats["values_agg"] == 2
+
+        # API sans agrégations : le cache suffit tant qu'il est valide
+        stub.aggregations = False
+        assert stub_refresher(directory, base_url).codes_postaux == stub.codes()
+
+        # Cache expiré et API sans agrégations : codes synthétiques par défaut
+        expired = stub_refresher(directory, base_url)
+        expired.codes_ttl = 0
+        assert expired.codes_postaux == [f"69{i:03d}" for i in range(1, 300)]
+
+        # Autre département : cache ignoré, nouvelle découverte
+        stub.aggregations = True
+        other = stub_refresher(directory, base_url)
+        other.departement = "01"
+        assert other.codes_postaux == [f"69{i:03d}" for i in range(1, 300)], "aucun DPE dans l'Ain"
+        assert stub_refresher(directory, base_url).codes_postaux == stub.codes()
+        assert stub.stats["values_agg"] == 7
+        with open(os.path.join(directory, "metadata.json")) as f:
+            assert '"codes_postaux_discovery"' in f.read()
+    print("✅ Découverte, cache, expiration et repli")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("TokenBucket", test_token_bucket),
+        ("429 et Retry-After", test_retry_after),
+        ("Tentatives épuisées", test_retries_exhausted),
+        ("Débit adaptatif", test_rate_recovery),
+        ("Repli sans curseur", test_pagination_fallback),
+        ("Découverte des codes postaux", test_discover_codes_postaux),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
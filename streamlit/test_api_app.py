@@ -0,0 +1,314 @@
+"""
+Tests de l'application FastAPI en processus (fastapi.testclient, sans serveur)
+Usage: python test_api_app.py  (ou pytest test_api_app.py)
+
+L'API est importée dans un répertoire temporaire (registre, tâches et cache
+SQLite isolés) avec deux versions de modèles entraînées sur des données
+synthétiques. Voir test_api.py pour les tests contre un serveur lancé.
+"""
+
+import importlib
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+
+from fastapi.testclient import TestClient
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from synthetic_data import make_dataset, make_features
+from utils.model_registry import ModelRegistry
+
+FEATURES = {
+    "conso_auxiliaires_ef": 500.0,
+    "cout_eclairage": 80.0,
+    "conso_5_usages_par_m2_ef": 200.0,
+    "conso_5_usages_ef": 20000.0,
+    "surface_habitable_logement": 100.0,
+    "cout_ecs": 300.0,
+    "type_batiment": "maison",
+    "conso_ecs_ef": 2000.0,
+    "conso_refroidissement_ef": 0.0,
+    "type_energie_recodee": "Electricite"
+}
+
+# Ligne d'échantillon Prometheus : nom{étiquettes} valeur
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+_api = None
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def register_version(registry: ModelRegistry, cost_factor: float) -> str:
+    """Version de petits modèles ; cost_factor distingue les coûts prédits d'une version à l'autre"""
+    df = make_dataset(n=500)
+    X = make_features(df)
+    classifier = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, df['etiquette_dpe'])
+    regressor = DecisionTreeRegressor(max_depth=4, random_state=0).fit(X, df['cout_total_5_usages'] * cost_factor)
+    return registry.register(classifier, regressor, {'classification': {}, 'regression': {}})
+
+def get_api():
+    """
+    Importer api.main une seule fois, dans un répertoire temporaire
+
+    Les chemins relatifs de l'API (registre, jobs) sont résolus à l'import
+    et à la création du ModelTrainer : le registre est ensuite remplacé par
+    un chemin absolu.
+    """
+    global _api
+    if _api is not None:
+        return _api
+
+    workdir = tempfile.mkdtemp(prefix="test_api_app_")
+    os.environ.update({
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+        "PREDICTION_CACHE_DB": os.path.join(workdir, "cache", "predictions.db"),
+        "MODEL_RELOAD_INTERVAL": "0",
+        "INFERENCE_ENGINE": "sklearn",
+    })
+    cwd = os.getcwd()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(workdir)
+    try:
+        api = importlib.import_module("api.main")
+        trainer = api.get_trainer()
+    finally:
+        os.chdir(cwd)
+
+    trainer.registry = ModelRegistry(os.path.join(workdir, "models", "registry"))
+    api.versions = [register_version(trainer.registry, factor) for factor in (1.0, 2.0)]
+    trainer.registry.activate(api.versions[0])
+    api.model_set = api.load_model_set()
+    api.client = TestClient(api.app)
+    _api = api
+    return api
+
+def cached_versions(api) -> list:
+    with sqlite3.connect(api.PREDICTION_CACHE_DB) as conn:
+        return sorted(version for (version,) in conn.execute("SELECT DISTINCT version FROM predictions"))
+
+def test_activation_invalidates_cache():
+    """Activer une version vide le cache : aucun résultat de l'ancienne version n'est resservi"""
+    print_section("🔄 Invalidation du cache à l'activation")
+    api = get_api()
+    first, second = api.versions
+    api.client.post(f"/models/activate/{first}")
+    cache = api.prediction_cache
+
+    before = api.client.post("/predict", json=FEATURES).json()
+    hits = cache.stats()["hits"]
+    assert api.client.post("/predict", json=FEATURES).json()["cout_total_5_usages"] == before["cout_total_5_usages"]
+    assert cache.stats()["hits"] == hits + 1
+    assert cached_versions(api) == [first]
+
+    response = api.client.post(f"/models/activate/{second}")
+    assert response.status_code == 200, response.text
+    assert cache.stats()["entries"] == 0
+    assert cached_versions(api) == []
+
+    misses = cache.stats()["misses"]
+    after = api.client.post("/predict", json=FEATURES).json()
+    assert cache.stats()["misses"] == misses + 1
+    assert after["cout_total_5_usages"] == 2 * before["cout_total_5_usages"]
+
+    # Activation par un autre worker : détectée au rechargement
+    api.get_trainer().registry.activate(first)
+    assert api.reload_models_if_changed()
+    assert cache.stats()["entries"] == 0 and cached_versions(api) == []
+    assert api.client.post("/predict", json=FEATURES).json()["cout_total_5_usages"] == before["cout_total_5_usages"]
+    print("✅ Cache vidé à chaque changement de version")
+
+def parse_metrics(text: str) -> dict:
+    """
+    Familles d'une exposition Prometheus : {nom: {"type", "samples": [(nom, étiquettes, valeur)]}}
+
+    Vérifie au passage qu'une famille n'est déclarée qu'une fois, avant ses échantillons.
+    """
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            current = line.split(" ", 3)[2]
+            assert current not in families, f"famille déclarée deux fois : {current}"
+            families[current] = {"type": None, "samples": []}
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ", 3)
+            assert name == current and families[name]["type"] is None, line
+            families[name]["type"] = kind
+        elif line:
+            match = SAMPLE.match(line)
+            assert match, f"ligne invalide : {line!r}"
+            name, labels, value = match.groups()
+            suffixes = ("_bucket", "_sum", "_count") if families[current]["type"] == "histogram" else ("",)
+            assert any(name == current + suffix for suffix in suffixes), f"{name} hors de la famille {current}"
+            families[current]["samples"].append((name, labels or "", float(value)))
+    return families
+
+def test_metrics_format():
+    """/metrics respecte le format d'exposition Prometheus ; la racine liste chaque route une fois"""
+    print_section("📈 Format de /metrics")
+    api = get_api()
+    endpoints = api.client.get("/").json()["endpoints"]
+    assert endpoints["model_metrics"] == "/models/metrics" and endpoints["prometheus_metrics"] == "/metrics"
+    assert len(set(endpoints.values())) == len(endpoints)
+
+    assert api.client.post("/predict", json=FEATURES).status_code == 200
+    response = api.client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    families = parse_metrics(response.text)
+
+    for name in ("api_request_duration_seconds", "model_inference_seconds", "prediction_cache_evictions_total"):
+        assert name in families, name
+    assert all(family["type"] in ("counter", "gauge", "histogram") for family in families.values())
+
+    # Histogrammes : seaux cumulatifs, +Inf égal au nombre d'observations
+    for name, family in families.items():
+        if family["type"] != "histogram":
+            continue
+        series = {}
+        for sample, labels, value in family["samples"]:
+            key = re.sub(r',?le="[^"]*"', "", labels).replace("{,", "{").replace("{}", "")
+            series.setdefault(key, {}).setdefault(sample[len(name):], []).append((labels, value))
+        for key, parts in series.items():
+            buckets = [value for _, value in parts["_bucket"]]
+            assert buckets == sorted(buckets), (name, key)
+            assert parts["_bucket"][-1][0].endswith('le="+Inf"}'), (name, key)
+            assert buckets[-1] == parts["_count"][0][1], (name, key)
+
+    routes = [labels for sample, labels, _ in families["api_request_duration_seconds"]["samples"]]
+    assert any('route="/predict"' in labels for labels in routes)
+    tiers = {labels for _, labels, _ in families["prediction_cache_evictions_total"]["samples"]}
+    assert tiers == {'{tier="memory"}', '{tier="disk"}'}, tiers
+    print(f"✅ {len(families)} familles valides")
+
+def test_saturated_pool_returns_429():
+    """Pool d'inférence ou file du coalescer pleins : 429 et Retry-After, sans attendre"""
+    print_section("🚦 Saturation : 429")
+    from test_inference_executor import occupy
+
+    api = get_api()
+    inference, coalescer, queue_size = api.inference, api.coalescer, api.INFERENCE_QUEUE_SIZE
+    api.inference = api.InferenceExecutor(max_workers=1, max_queue=0)
+    release = occupy(api.inference, 1)
+    try:
+        responses = [
+            api.client.post("/predict", json=FEATURES),
+            api.client.post("/predict/batch", json={"data": [FEATURES]}),
+            api.client.post("/predict/stream", content=b"", headers={"Content-Type": "text/csv"}),
+        ]
+        for response in responses:
+            assert response.status_code == 429, (response.status_code, response.text)
+            assert int(response.headers["Retry-After"]) >= 1
+        assert api.inference.stats()["rejected"] == 2
+
+        # Coalescer : refus dès que sa file atteint INFERENCE_QUEUE_SIZE
+        release.set()
+        api.coalescer = api.RequestCoalescer(lambda items: items)
+        api.INFERENCE_QUEUE_SIZE = 0
+        response = api.client.post("/predict", json=FEATURES)
+        assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+    finally:
+        release.set()
+        api.inference, api.coalescer, api.INFERENCE_QUEUE_SIZE = inference, coalescer, queue_size
+
+    assert api.client.post("/predict", json=FEATURES).status_code == 200
+    print("✅ /predict, /predict/batch et /predict/stream refusés avec Retry-After")
+
+def test_coalesced_predict():
+    """
+    Coalescer : cache consulté une seule fois par logement, hors de la boucle
+    d'événements ; un résultat en cache n'entre pas dans un lot
+    """
+    print_section("🧺 /predict regroupé")
+    from concurrent.futures import ThreadPoolExecutor
+
+    api = get_api()
+    api.client.post(f"/models/activate/{api.versions[0]}")
+    cache, coalescer = api.prediction_cache, api.coalescer
+    lookups = []
+    get_many = cache.get_many
+
+    def recording_get_many(keys):
+        lookups.append((len(keys), threading.current_thread().name))
+        return get_many(keys)
+
+    rows = [dict(FEATURES, surface_habitable_logement=300.0 + i) for i in range(6)]
+    expected = api.client.post("/predict/batch", json={"data": rows}).json()["predictions"]
+    cache.invalidate("")
+    api.coalescer = api.RequestCoalescer(api.predict_coalesced_batch, max_wait_ms=50, max_batch=8,
+                                         group_key=lambda item: item[1].version)
+    cache.get_many = recording_get_many
+    try:
+        misses = cache.stats()["misses"]
+        with ThreadPoolExecutor(len(rows)) as pool:
+            responses = list(pool.map(lambda row: api.client.post("/predict", json=row), rows))
+        assert all(response.status_code == 200 for response in responses), [r.text for r in responses]
+        assert [r.json()["cout_total_5_usages"] for r in responses] == [p["cout_total_5_usages"] for p in expected]
+        assert [r.json()["etiquette_dpe"] for r in responses] == [p["etiquette_dpe"] for p in expected]
+        assert cache.stats()["misses"] == misses + len(rows)
+        assert len(lookups) == len(rows), lookups
+        assert all(size == 1 and name.startswith("inference") for size, name in lookups), lookups
+        requests = api.coalescer.stats()["requests"]
+
+        assert api.client.post("/predict", json=rows[0]).json()["cout_total_5_usages"] == expected[0]["cout_total_5_usages"]
+        assert api.coalescer.stats()["requests"] == requests, "résultat en cache passé par le coalescer"
+    finally:
+        del cache.get_many
+        api.coalescer = coalescer
+    print("✅ Une consultation du cache par logement, dans le pool d'inférence")
+
+def test_import_is_light():
+    """Importer l'API ne charge ni NumPy, ni pandas, ni pyarrow, ni ModelTrainer (démarrage à froid)"""
+    print_section("🪶 Import de l'API")
+    heavy = ['numpy', 'pandas', 'pyarrow', 'sklearn', 'utils.model_trainer']
+    with tempfile.TemporaryDirectory() as workdir:
+        code = (
+            f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); "
+            f"import api.main; print([m for m in {heavy!r} if m in sys.modules])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=workdir, capture_output=True, text=True, timeout=60,
+            env={**os.environ, "JOBS_DIR": os.path.join(workdir, "jobs"), "PREDICTION_CACHE_DB": ""}
+        )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]", result.stdout
+    print("✅ Aucun module lourd importé")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Import léger", test_import_is_light),
+        ("Invalidation à l'activation", test_activation_invalidates_cache),
+        ("Format de /metrics", test_metrics_format),
+        ("Saturation", test_saturated_pool_returns_429),
+        ("/predict regroupé", test_coalesced_predict),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
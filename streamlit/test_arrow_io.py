@@ -0,0 +1,161 @@
+"""
+Tests du format d'échange Arrow / Parquet (utils/arrow_io.py et /predict/batch)
+Usage: python test_arrow_io.py  (ou pytest test_arrow_io.py)
+
+Décodage des colonnes en matrice float32, encodage des catégorielles,
+erreurs de schéma, et mêmes prédictions qu'en JSON.
+"""
+
+import numpy as np
+import pyarrow as pa
+
+from test_api_app import FEATURES, get_api
+from utils import arrow_io
+
+MAPS = {'type_batiment': {'maison': 1, 'appartement': 2}}
+DEFAULTS = {'type_batiment': 0}
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def expect_error(table: "pa.Table", message: str):
+    try:
+        arrow_io.table_to_features(table, ['surface', 'type_batiment'], MAPS, DEFAULTS)
+    except ValueError as e:
+        assert message in str(e), str(e)
+    else:
+        raise AssertionError(f"ValueError attendue ({message})")
+
+def test_round_trip():
+    """Écriture puis lecture en Arrow IPC et en Parquet"""
+    print_section("🔁 Aller-retour")
+    table = pa.table({'surface': [50.0, 80.0], 'type_batiment': ['maison', 'appartement']})
+    for fmt in ('arrow', 'parquet'):
+        assert arrow_io.read_table(arrow_io.write_table(table, fmt), fmt).equals(table), fmt
+    for call in (lambda: arrow_io.write_table(table, 'csv'), lambda: arrow_io.read_table(b'', 'csv')):
+        try:
+            call()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Format inconnu accepté")
+    print("✅ Arrow IPC et Parquet")
+
+def test_table_to_features():
+    """Matrice float32 dans l'ordre des features ; catégorielles inconnues ou nulles -> défaut"""
+    print_section("🧮 Décodage en features")
+    first = pa.table({
+        'type_batiment': pa.array(['maison', 'appartement', None]),
+        'surface': pa.array([50, 80, 120], type=pa.int32()),
+        'extra': [1, 2, 3],
+    })
+    second = pa.table({
+        'type_batiment': pa.array(['immeuble', 'maison']).dictionary_encode(),
+        'surface': pa.array([30, 40], type=pa.int32()),
+        'extra': [4, 5],
+    })
+    table = pa.concat_tables([first, second.cast(first.schema)])
+    assert table.column('surface').num_chunks == 2
+
+    df = arrow_io.table_to_features(table, ['surface', 'type_batiment'], MAPS, DEFAULTS)
+    assert list(df.columns) == ['surface', 'type_batiment']
+    assert df.to_numpy().dtype == np.float32
+    assert df['surface'].tolist() == [50, 80, 120, 30, 40]
+    assert df['type_batiment'].tolist() == [1, 2, 0, 0, 1]
+
+    encoded = arrow_io.table_to_features(second, ['surface', 'type_batiment'], MAPS, DEFAULTS)
+    assert encoded['type_batiment'].tolist() == [0, 1], "colonne dictionnaire"
+    print("✅ 5 lignes sur 2 morceaux, catégorielles encodées")
+
+def test_schema_errors():
+    """Colonne absente, de type inattendu ou avec des valeurs manquantes : ValueError (HTTP 422)"""
+    print_section("🚫 Schéma")
+    expect_error(pa.table({'surface': [1.0]}), "Colonnes manquantes: type_batiment")
+    expect_error(pa.table({'surface': ['50'], 'type_batiment': ['maison']}), "numérique attendu")
+    expect_error(pa.table({'surface': [1.0], 'type_batiment': [1]}), "chaîne attendue")
+    expect_error(pa.table({'surface': [1.0, None], 'type_batiment': ['maison', 'maison']}), "1 valeurs manquantes")
+    print("✅ Erreurs de schéma détectées")
+
+def test_predictions_to_table():
+    """Une colonne par résultat et par probabilité de classe"""
+    print_section("📤 Table des résultats")
+    table = arrow_io.predictions_to_table(
+        np.array(['B', 'D']), np.array([500, 1500], dtype=np.float32),
+        np.array([[0.9, 0.1], [0.2, 0.8]]), ['B', 'D']
+    )
+    assert table.column_names == ['etiquette_dpe', 'cout_total_5_usages', 'proba_B', 'proba_D']
+    assert table.schema.field('cout_total_5_usages').type == pa.float64()
+    assert table.column('proba_D').to_pylist() == [0.1, 0.8]
+    assert arrow_io.predictions_to_table(np.array(['B']), np.array([1.0]), None, None).num_columns == 2
+    print("✅ Colonnes et types")
+
+def test_batch_endpoint():
+    """/predict/batch en Arrow et Parquet : mêmes prédictions qu'en JSON"""
+    print_section("🌐 /predict/batch")
+    api = get_api()
+    rows = [dict(FEATURES, surface_habitable_logement=50.0 + 10 * i, type_batiment=kind)
+            for i, kind in enumerate(['maison', 'appartement', 'inconnu'])]
+    expected = api.client.post("/predict/batch", json={"data": rows}).json()["predictions"]
+    table = pa.Table.from_pylist(rows)
+
+    for fmt in ('arrow', 'parquet'):
+        response = api.client.post(
+            "/predict/batch", content=arrow_io.write_table(table, fmt),
+            headers={"Content-Type": arrow_io.MEDIA_TYPES[fmt]}
+        )
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"] == arrow_io.MEDIA_TYPES[fmt]
+        result = arrow_io.read_table(response.content, fmt)
+        assert result.column('etiquette_dpe').to_pylist() == [p['etiquette_dpe'] for p in expected]
+        assert np.allclose(result.column('cout_total_5_usages').to_pylist(),
+                           [p['cout_total_5_usages'] for p in expected])
+
+    response = api.client.post(
+        "/predict/batch?output=json", content=arrow_io.write_table(table, 'arrow'),
+        headers={"Content-Type": arrow_io.ARROW_STREAM}
+    )
+    assert [p['etiquette_dpe'] for p in response.json()["predictions"]] == [p['etiquette_dpe'] for p in expected]
+
+    response = api.client.post(
+        "/predict/batch", content=arrow_io.write_table(table.drop_columns(['cout_ecs']), 'arrow'),
+        headers={"Content-Type": arrow_io.ARROW_STREAM}
+    )
+    assert response.status_code == 422 and "cout_ecs" in response.text, response.text
+    assert api.client.post("/predict/batch", content=b"\x00\x01",
+                           headers={"Content-Type": arrow_io.PARQUET}).status_code == 400
+    print("✅ Arrow, Parquet et sortie JSON conformes ; schéma invalide refusé")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Aller-retour", test_round_trip),
+        ("Décodage en features", test_table_to_features),
+        ("Schéma", test_schema_errors),
+        ("Table des résultats", test_predictions_to_table),
+        ("/predict/batch", test_batch_endpoint),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Tests du scoring en masse (utils/bulk_scoring.py et /predict/stream)
+Usage: python test_bulk_scoring.py  (ou pytest test_bulk_scoring.py)
+
+Découpage d'un flux CSV / NDJSON reçu en morceaux arbitraires, lignes
+invalides signalées sans interrompre le flux, sérialisation des résultats.
+"""
+
+import asyncio
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from test_api_app import FEATURES, get_api
+from utils.bulk_scoring import INVALID_ROW_ERROR, ChunkedTableReader, format_predictions
+
+COLUMNS = ['surface_habitable_logement', 'conso_5_usages_ef', 'type_batiment']
+CATEGORICAL = ['type_batiment']
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+async def byte_stream(data: bytes, size: int):
+    """Corps de requête reçu par morceaux de `size` octets (coupés au milieu des lignes)"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+def read_chunks(data: bytes, fmt: str, chunk_rows: int, piece: int = 7) -> list:
+    """Blocs produits par ChunkedTableReader pour le corps `data`"""
+    async def collect():
+        reader = ChunkedTableReader(byte_stream(data, piece), fmt, chunk_rows, COLUMNS, CATEGORICAL)
+        await reader.start()
+        return [chunk async for chunk in reader.chunks()]
+    return asyncio.run(collect())
+
+def expect_error(data: bytes, fmt: str, message: str):
+    try:
+        read_chunks(data, fmt, 10)
+    except ValueError as e:
+        assert message in str(e), str(e)
+    else:
+        raise AssertionError(f"ValueError attendue ({message})")
+
+def test_csv_chunks():
+    """Blocs de chunk_rows lignes, numérotation continue, colonnes en trop ignorées"""
+    print_section("📄 CSV par blocs")
+    lines = ["\ufeffextra,surface_habitable_logement,conso_5_usages_ef,type_batiment"]
+    lines += [f"x,{50 + i},{1000 * i},{'maison' if i % 2 else '01'}" for i in range(8)]
+    lines[4] = "x,abc,3000,maison"  # surface invalide
+    data = "\r\n".join(lines).encode("utf-8")  # fins de ligne CRLF, pas de saut de ligne final
+
+    chunks = read_chunks(data, "csv", chunk_rows=3)
+    assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+    df = pd.concat(chunks)
+    assert list(df.columns) == COLUMNS
+    assert list(df.index) == list(range(8))
+    assert np.isnan(df.loc[3, 'surface_habitable_logement'])
+    assert df.loc[7, 'conso_5_usages_ef'] == 7000.0
+    assert df.loc[0, 'type_batiment'] == '01', "catégorielle lue comme chaîne"
+
+    for piece in (1, 3, 1000):
+        assert pd.concat(read_chunks(data, "csv", 3, piece)).equals(df)
+    print("✅ 8 lignes en blocs de 3, quel que soit le découpage du flux")
+
+def test_ndjson_chunks():
+    """Lignes vides ignorées ; ligne illisible conservée (vide) pour garder la numérotation"""
+    print_section("🧾 NDJSON par blocs")
+    rows = [{"surface_habitable_logement": 80 + i, "conso_5_usages_ef": 100.0 * i, "type_batiment": "maison"}
+            for i in range(5)]
+    lines = [json.dumps(row) for row in rows]
+    lines.insert(2, "")
+    lines[3] = "{pas du json"
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+
+    df = pd.concat(read_chunks(data, "ndjson", chunk_rows=2))
+    assert list(df.index) == list(range(5))
+    assert df.loc[2].isna().all()
+    assert df.loc[4, 'surface_habitable_logement'] == 84.0
+    print("✅ 5 lignes, ligne illisible signalée")
+
+def test_schema_errors():
+    """Colonnes manquantes et corps vide refusés avant tout envoi de résultat"""
+    print_section("🚫 Schéma")
+    expect_error(b"surface_habitable_logement,type_batiment\n80,maison\n", "csv", "conso_5_usages_ef")
+    expect_error(b'{"surface_habitable_logement": 80}\n', "ndjson", "Colonnes manquantes")
+    expect_error(b"[1, 2]\n", "ndjson", "Colonnes manquantes")
+    expect_error(b"\n\n", "csv", "vide")
+    expect_error(b"pas du json\n", "ndjson", "objet JSON")
+    print("✅ Erreurs de schéma détectées sur la première ligne")
+
+def test_format_predictions():
+    """Une sortie par ligne reçue, dans l'ordre, erreurs à la place des lignes invalides"""
+    print_section("📤 Sérialisation")
+    rows = np.array([10, 11, 12])
+    valid = np.array([True, False, True])
+    labels, couts = np.array(['B', 'D']), np.array([500.0, 1500.0])
+    proba = np.array([[0.9, 0.1], [0.2, 0.8]])
+
+    csv_out = pd.read_csv(io.BytesIO(format_predictions('csv', rows, valid, labels, couts, proba, ['B', 'D'], True)))
+    assert list(csv_out['row']) == [10, 11, 12]
+    assert list(csv_out['etiquette_dpe'].fillna('')) == ['B', '', 'D']
+    assert csv_out.loc[1, 'error'] == INVALID_ROW_ERROR and csv_out.loc[2, 'proba_D'] == 0.8
+    assert not format_predictions('csv', rows, valid, labels, couts, None, None, False).startswith(b'row,')
+
+    lines = [json.loads(line) for line in
+             format_predictions('ndjson', rows, valid, labels, couts, proba, ['B', 'D'], False).splitlines()]
+    assert lines[1] == {'row': 11, 'error': INVALID_ROW_ERROR}
+    assert lines[2] == {'row': 12, 'etiquette_dpe': 'D', 'cout_total_5_usages': 1500.0,
+                        'probabilities': {'B': 0.2, 'D': 0.8}}
+    assert format_predictions('ndjson', rows[:0], valid[:0], labels[:0], couts[:0], None, None, False) == b''
+    print("✅ CSV et NDJSON")
+
+def test_stream_endpoint():
+    """/predict/stream : mêmes prédictions que /predict/batch, ligne invalide signalée"""
+    print_section("🌊 /predict/stream")
+    api = get_api()
+    rows = [dict(FEATURES, surface_habitable_logement=50.0 + 10 * i) for i in range(5)]
+    expected = api.client.post("/predict/batch", json={"data": rows}).json()["predictions"]
+
+    body = "\n".join(json.dumps(row) for row in rows[:2]) + "\n{}\n" + "\n".join(json.dumps(row) for row in rows[2:])
+    response = api.client.post("/predict/stream", content=body.encode("utf-8"),
+                               headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200, response.text
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result['row'] for result in results] == list(range(6))
+    assert results[2]['error'] == INVALID_ROW_ERROR
+    scored = [result for result in results if 'error' not in result]
+    assert [result['etiquette_dpe'] for result in scored] == [p['etiquette_dpe'] for p in expected]
+    assert np.allclose([result['cout_total_5_usages'] for result in scored],
+                       [p['cout_total_5_usages'] for p in expected])
+
+    response = api.client.post("/predict/stream", content=b"a,b\n1,2\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400, response.status_code
+    print("✅ 5 prédictions conformes, 1 ligne invalide, schéma refusé en 400")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("CSV par blocs", test_csv_chunks),
+        ("NDJSON par blocs", test_ndjson_chunks),
+        ("Schéma", test_schema_errors),
+        ("Sérialisation", test_format_predictions),
+        ("/predict/stream", test_stream_endpoint),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
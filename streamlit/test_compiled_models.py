@@ -0,0 +1,131 @@
+"""
+Tests de parité du moteur d'inférence compilé (utils/compiled_models.py)
+Usage: python test_compiled_models.py  (ou pytest test_compiled_models.py)
+
+Les sorties du moteur compilé doivent être identiques bit à bit à celles de
+scikit-learn (forêt exécutée avec n_jobs=1).
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+from synthetic_data import make_dataset, make_features
+from utils.compiled_models import compile_model
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def test_random_forest_classifier_parity():
+    """predict_proba et predict identiques pour un RandomForestClassifier"""
+    print_section("🌲 Parité RandomForestClassifier")
+    df = make_dataset()
+    X = make_features(df)
+    model = RandomForestClassifier(n_estimators=25, random_state=0, n_jobs=1)
+    model.fit(X, df['etiquette_dpe'])
+    compiled = compile_model(model)
+
+    X_test = make_features(make_dataset(n=1000, seed=1))
+    assert np.array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+    assert np.array_equal(compiled.predict(X_test), model.predict(X_test))
+    assert list(compiled.classes_) == list(model.classes_)
+    print("✅ Sorties identiques")
+
+def test_decision_tree_regressor_parity():
+    """predict identique pour un DecisionTreeRegressor (paramètres de ModelTrainer)"""
+    print_section("🌳 Parité DecisionTreeRegressor")
+    df = make_dataset()
+    X = make_features(df)
+    model = DecisionTreeRegressor(max_depth=30, min_samples_split=20, min_samples_leaf=4, random_state=0)
+    model.fit(X, df['cout_total_5_usages'])
+    compiled = compile_model(model)
+
+    X_test = make_features(make_dataset(n=1000, seed=2))
+    assert np.array_equal(compiled.predict(X_test), model.predict(X_test))
+    print("✅ Sorties identiques")
+
+def test_other_tree_models_parity():
+    """DecisionTreeClassifier et RandomForestRegressor sont aussi supportés"""
+    print_section("🌿 Parité DecisionTreeClassifier / RandomForestRegressor")
+    df = make_dataset()
+    X = make_features(df)
+    X_test = make_features(make_dataset(n=500, seed=3))
+
+    tree = DecisionTreeClassifier(random_state=0).fit(X, df['etiquette_dpe'])
+    assert np.array_equal(compile_model(tree).predict_proba(X_test), tree.predict_proba(X_test))
+
+    forest = RandomForestRegressor(n_estimators=10, random_state=0, n_jobs=1)
+    forest.fit(X, df['cout_total_5_usages'])
+    assert np.array_equal(compile_model(forest).predict(X_test), forest.predict(X_test))
+    print("✅ Sorties identiques")
+
+def test_missing_values_and_single_row():
+    """Valeurs manquantes et prédictions unitaires"""
+    print_section("🕳️ Valeurs manquantes et ligne unique")
+    df = make_dataset()
+    X = make_features(df)
+    model = RandomForestClassifier(n_estimators=10, random_state=0, n_jobs=1)
+    model.fit(X, df['etiquette_dpe'])
+    compiled = compile_model(model)
+
+    X_test = make_features(make_dataset(n=300, seed=4)).astype(float)
+    X_test.iloc[::5, 0] = np.nan
+    assert np.array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+
+    for i in range(10):
+        row = X_test.iloc[[i]]
+        assert np.array_equal(compiled.predict_proba(row), model.predict_proba(row))
+    print("✅ Sorties identiques")
+
+def test_column_order_and_shape():
+    """Les colonnes d'un DataFrame sont réordonnées ; une mauvaise forme est refusée"""
+    print_section("🧱 Ordre des colonnes")
+    df = make_dataset(n=500)
+    X = make_features(df)
+    model = DecisionTreeRegressor(random_state=0).fit(X, df['cout_total_5_usages'])
+    compiled = compile_model(model)
+
+    shuffled = X[list(reversed(X.columns))]
+    assert np.array_equal(compiled.predict(shuffled), model.predict(X))
+
+    try:
+        compiled.predict(X.values[:, :5])
+    except ValueError:
+        print("✅ Forme invalide refusée")
+    else:
+        raise AssertionError("Une matrice à 5 colonnes aurait dû être refusée")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("RandomForestClassifier", test_random_forest_classifier_parity),
+        ("DecisionTreeRegressor", test_decision_tree_regressor_parity),
+        ("Autres modèles", test_other_tree_models_parity),
+        ("Valeurs manquantes", test_missing_values_and_single_row),
+        ("Ordre des colonnes", test_column_order_and_shape),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
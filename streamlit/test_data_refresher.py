@@ -0,0 +1,180 @@
+"""
+Tests du rafraîchissement des données (utils/data_refresher.py), sans appel à l'API ADEME
+Usage: python test_data_refresher.py  (ou pytest test_data_refresher.py)
+
+Les pages sont écrites directement dans le point de reprise (PageStore),
+comme après une récupération : fusion par code postal, écriture du
+rechargement complet dans une nouvelle génération et filigranes.
+"""
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from utils.data_refresher import DataRefresher
+
+TYPES = {
+    "numero_dpe": "string",
+    "code_postal_ban": "string",
+    "etiquette_dpe": "string",
+    "conso_5_usages_ef": "number",
+}
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def make_refresher(directory: str) -> DataRefresher:
+    """DataRefresher dont point de reprise, métadonnées et données sont dans `directory`"""
+    os.environ["ADEME_CHECKPOINT_DIR"] = os.path.join(directory, "checkpoint")
+    try:
+        refresher = DataRefresher(codes_postaux_file=os.path.join(directory, "codes.csv"))
+    finally:
+        del os.environ["ADEME_CHECKPOINT_DIR"]
+    refresher.METADATA_FILE = os.path.join(directory, "metadata.json")
+    refresher.DATA_FILE = os.path.join(directory, "donnees.csv")
+    return refresher
+
+def rows(keys, code_postal: str, value: float) -> list:
+    return [
+        {"numero_dpe": str(key), "code_postal_ban": code_postal, "etiquette_dpe": "C", "conso_5_usages_ef": value}
+        for key in keys
+    ]
+
+def write_pages(refresher: DataRefresher):
+    """
+    Pages récupérées : le DPE 2 apparaît sur deux pages des existants, le
+    DPE 4 dans les existants et les neufs ; les neufs n'ont pas etiquette_dpe
+    """
+    pages = refresher.checkpoint.pages
+    pages.set_schema("existants", TYPES)
+    pages.set_schema("neufs", {col: kind for col, kind in TYPES.items() if col != "etiquette_dpe"})
+    pages.write("existants", "69001", "u1", 0, rows([1, 2], "69001", 1.0))
+    pages.write("existants", "69001", "u1", 1, rows([2, 3, 4], "69001", 2.0))
+    pages.write("existants", "69002", "u2", 0, rows([5, 6], "69002", 1.0))
+    pages.write("neufs", "69001", "u3", 0, [
+        {key: value for key, value in row.items() if key != "etiquette_dpe"} for row in rows([4], "69001", 3.0)
+    ])
+    pages.write("neufs", "69003", "u4", 0, rows([7], "69003", 3.0))
+
+def test_harmonize_partitions():
+    """Un DataFrame par code postal, colonnes identiques, doublons supprimés dans le code postal"""
+    print_section("🔗 Fusion par code postal")
+    with tempfile.TemporaryDirectory() as directory:
+        refresher = make_refresher(directory)
+        write_pages(refresher)
+        frames = list(refresher.harmonize_partitions())
+
+        assert [sorted(set(df['code_postal_ban'])) for df in frames] == [["69001"], ["69002"], ["69003"]]
+        assert len({tuple(df.columns) for df in frames}) == 1
+        assert 'source_dpe' in frames[0].columns
+        assert set(refresher.common_columns) >= set(frames[0].columns) - {'source_dpe'}
+
+        first = frames[0].set_index('numero_dpe')
+        assert sorted(first.index) == ["1", "2", "3", "4"]
+        assert first.loc["2", 'conso_5_usages_ef'] == 2.0
+        assert first.loc["4", 'source_dpe'] == 'neuf' and first.loc["4", 'conso_5_usages_ef'] == 3.0
+        assert first.loc["1", 'source_dpe'] == 'existant'
+    print("✅ 3 codes postaux, version neuve retenue")
+
+def test_full_reload_writes_generation():
+    """Le rechargement complet est écrit par code postal dans une nouvelle génération"""
+    print_section("💾 Rechargement complet")
+    with tempfile.TemporaryDirectory() as directory:
+        refresher = make_refresher(directory)
+        write_pages(refresher)
+
+        result = refresher.save_refreshed_data(refresher.harmonize_partitions(), backup=False)
+        assert result == {"rows": 7, "partitions": 3}, result
+
+        store = refresher.dataset_store()
+        assert store.current().partitions() == ["69001", "69002", "69003"]
+        df = store.load().set_index('numero_dpe')
+        assert sorted(df.index) == [str(key) for key in range(1, 8)]
+        assert df.loc["4", 'source_dpe'] == 'neuf'
+        assert df['source_dpe'].value_counts().to_dict() == {'existant': 5, 'neuf': 2}
+        assert not os.path.exists(refresher.checkpoint.directory), "point de reprise non effacé"
+    print("✅ 7 DPE dans 3 partitions, point de reprise effacé")
+
+def test_watermarks():
+    """
+    Filigranes : date de modification la plus récente par dataset et code
+    postal, jamais en recul, enregistrés seulement avec les données
+    """
+    print_section("🔖 Filigranes")
+    with tempfile.TemporaryDirectory() as directory:
+        refresher = make_refresher(directory)
+        field = refresher.WATERMARK_FIELD
+        with open(refresher.METADATA_FILE, "w") as f:
+            json.dump({"last_update_date": "2024-01-01", "watermarks": {
+                "existants": {"69001": "2024-01-01", "69002": "2024-03-01", "69009": "2023-01-01"}
+            }}, f)
+        since = {
+            "existants": {"69001": "2024-01-01", "69002": "2024-03-01", "69003": "2024-01-01"},
+            "neufs": {"69001": "2024-01-01"},
+        }
+
+        existants = pd.DataFrame({
+            "numero_dpe": ["1", "2", "3", "4", "5"],
+            "code_postal_ban": ["69001", "69001", "69002", "69004", None],
+            field: ["2024-02-10T08:00:00", "2023-12-01", "2024-02-01", "2024-05-01", "2024-09-01"],
+        })
+        # Neufs lus depuis les pages (dataset pyarrow), comme après fetch_pages
+        pages = refresher.checkpoint.pages
+        pages.set_schema("neufs", {"numero_dpe": "string", "code_postal_ban": "string", field: "string"})
+        pages.write("neufs", "69001", "u1", 0, [{"numero_dpe": "6", "code_postal_ban": "69001", field: "2024-04-02"}])
+
+        pending = refresher._advance_watermarks({"existants": existants, "neufs": pages.dataset("neufs")}, since)
+        assert pending["existants"] == {
+            "69001": "2024-02-10",  # date la plus récente, tronquée au jour
+            "69002": "2024-03-01",  # DPE plus ancien que le filigrane : pas de recul
+            "69003": "2024-01-01",  # aucune ligne : filigrane de départ
+            "69009": "2023-01-01",  # code postal non rafraîchi : conservé
+        }, pending["existants"]
+        assert pending["neufs"] == {"69001": "2024-04-02"}
+
+        # Récupération non enregistrée : rien ne change sur disque
+        refresher._pending_watermarks = pending
+        assert refresher.get_watermarks()["existants"]["69001"] == "2024-01-01"
+
+        refresher.upsert_new_data(pd.DataFrame({
+            "numero_dpe": ["1"], "code_postal_ban": ["69001"], "conso_5_usages_ef": [1.0]
+        }), backup=False)
+        assert refresher.get_watermarks() == pending
+        assert refresher.get_last_update_date() == "2024-01-01"
+        assert refresher._pending_watermarks is None
+    print("✅ Filigranes avancés par code postal, enregistrés avec les données")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Fusion par code postal", test_harmonize_partitions),
+        ("Rechargement complet", test_full_reload_writes_generation),
+        ("Filigranes", test_watermarks),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
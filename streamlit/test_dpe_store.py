@@ -0,0 +1,220 @@
+"""
+Tests du jeu de données partitionné (utils/dpe_store.py)
+Usage: python test_dpe_store.py  (ou pytest test_dpe_store.py)
+
+Upsert, couches d'upsert et repli, générations et rétention,
+restauration, compactage, et compactage concurrent d'un rechargement
+complet.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from utils.dpe_store import DpeStore, Generation
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def make_rows(keys, code_postal: str, value: float) -> pd.DataFrame:
+    return pd.DataFrame({
+        'numero_dpe': [str(key) for key in keys],
+        'code_postal_ban': code_postal,
+        'conso_5_usages_ef': value,
+        'etiquette_dpe': 'C',
+    })
+
+def make_store(directory: str, **kwargs) -> DpeStore:
+    """Jeu de données sans compactage automatique"""
+    store = DpeStore(directory, **kwargs)
+    store.MAX_DELTAS = 1000
+    store.MAX_STALE = 1.0
+    store.MAX_LAYERS = 1000
+    return store
+
+def snapshot(store: DpeStore) -> dict:
+    """numero_dpe -> (code postal, conso) du jeu courant"""
+    df = store.load()
+    if df.empty:
+        return {}
+    return {
+        key: (str(cp), float(conso))
+        for key, cp, conso in zip(df['numero_dpe'], df['code_postal_ban'], df['conso_5_usages_ef'])
+    }
+
+def test_upsert_and_load():
+    """Ajouts, mises à jour et changement de code postal"""
+    print_section("🔁 Upsert et lecture")
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        store.replace(pd.concat([make_rows(range(0, 10), '69001', 1.0), make_rows(range(10, 20), '69002', 1.0)]))
+        result = store.upsert(pd.concat([make_rows(range(5, 12), '69003', 2.0), make_rows(range(20, 25), '69001', 3.0)]))
+
+        assert result['added'] == 5 and result['updated'] == 7, result
+        assert result['total'] == 25
+        data = snapshot(store)
+        assert data['5'] == ('69003', 2.0) and data['11'] == ('69003', 2.0)
+        assert data['0'] == ('69001', 1.0) and data['24'] == ('69001', 3.0)
+        assert len(data) == 25
+
+        filtered = store.load(columns=['conso_5_usages_ef'], filters=[('code_postal_ban', '==', '69003')])
+        assert len(filtered) == 7 and list(filtered.columns) == ['conso_5_usages_ef']
+    print("✅ Versions courantes lues, filtres appliqués")
+
+def test_upsert_layers():
+    """Un upsert n'écrit que ses deltas et leurs entrées d'index ; au-delà de MAX_LAYERS, repli en une génération complète"""
+    print_section("🧅 Couches d'upsert")
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        store.MAX_LAYERS = 3
+        # Clés distinctes par code postal : numero_dpe = code postal + numéro
+        store.replace(pd.concat([
+            make_rows([f"{cp}-{i}" for i in range(100)], cp, 0.0) for cp in ('69001', '69002', '69003')
+        ]))
+        store.upsert(pd.concat([make_rows(['69001-0', '69001-1'], '69001', 1.0), make_rows(['new'], '69002', 1.0)]))
+
+        layer = store.current()
+        assert layer.depth() == 1 and layer.count() == 301
+        assert layer._own_partitions() == ['69001', '69002'], "partition non modifiée liée"
+        conn = sqlite3.connect(layer.index_path)
+        assert sorted(key for (key,) in conn.execute("SELECT numero_dpe FROM locations")) == ['69001-0', '69001-1', 'new']
+        conn.close()
+        assert layer.partitions() == ['69001', '69002', '69003']
+
+        store.upsert(make_rows(['69001-0', '69003-5'], '69003', 2.0))
+        store.upsert(make_rows(['69001-1'], '69001', 3.0))
+        data = snapshot(store)
+        assert len(data) == 301 and store.current().depth() == 3
+        assert data['69001-0'] == ('69003', 2.0) and data['69001-1'] == ('69001', 3.0) and data['new'] == ('69002', 1.0)
+        assert len(store.current().read_partition('69001')) == 99
+        assert store.current().compaction_candidates(0, 1.0) == ['69001', '69002', '69003']
+
+        # Quatrième couche : repli (pendant l'upsert, DPE_COMPACT_BACKGROUND=0) ou en arrière-plan
+        store.upsert(make_rows(['69002-7'], '69002', 4.0))
+        store.wait_compaction()
+        folded = store.current()
+        assert folded.depth() == 0 and folded.count() == 301
+        assert snapshot(store) == {**data, '69002-7': ('69002', 4.0)}
+        # Fichiers sans version courante écartés au repli
+        assert all(os.path.exists(os.path.join(folded._partition_dir(cp), name))
+                   for cp in folded.partitions() for name in folded._files(cp))
+        assert len(store.backups()) <= store.keep
+    print("✅ Deltas seuls par couche, repli sans perte")
+
+def test_generations_retention_and_restore():
+    """Une génération par écriture, rétention des sauvegardes, restauration"""
+    print_section("🗂️ Générations, rétention et restauration")
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory, keep=2)
+        store.replace(make_rows(range(10), '69001', 0.0))
+        for i in range(1, 6):
+            store.upsert(make_rows([0], '69001', float(i)))
+
+        names = [g.name for g in store.generations()]
+        assert open(f"{directory}/CURRENT").read() == names[-1]
+        assert snapshot(store)['0'] == ('69001', 5.0)
+        # Couches : parents conservés, mais au plus `keep` sauvegardes
+        assert len(store.backups()) <= 2, store.backups()
+
+        backup = store.backups()[0]['name']
+        store.restore(backup)
+        assert snapshot(store)['0'] == ('69001', 4.0)
+        assert len(snapshot(store)) == 10
+
+        # Couches repliées à chaque upsert : les anciennes chaînes sortent de la rétention,
+        # restent courante, précédente (toujours gardée) et au plus `keep` sauvegardes
+        store.MAX_LAYERS = 0
+        for i in range(3):
+            store.upsert(make_rows([1], '69001', 6.0))
+            store.wait_compaction()
+        names = [g.name for g in store.generations()]
+        assert store.current().depth() == 0 and len(names) <= 4, names
+        assert snapshot(store)['0'] == ('69001', 4.0) and snapshot(store)['1'] == ('69001', 6.0)
+    print("✅ Sauvegardes bornées, restauration publiée comme nouvelle génération")
+
+def test_compaction():
+    """Deltas repliés en une base, mêmes données"""
+    print_section("🗜️ Compactage")
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        store.replace(make_rows(range(100), '69001', 0.0))
+        for i in range(5):
+            store.upsert(make_rows(range(i * 10, i * 10 + 20), '69001', float(i + 1)))
+        before = snapshot(store)
+
+        assert store.compact(['69001']) == ['69001']
+        files = store.current()._files('69001')
+        assert len(files) == 1 and files[0].startswith('base-'), files
+        assert snapshot(store) == before
+    print("✅ Une base par partition, données inchangées")
+
+def test_compaction_across_full_reload():
+    """Un rechargement complet pendant le compactage : la base compactée (ancien jeu) n'est pas adoptée"""
+    print_section("🏁 Compactage concurrent d'un rechargement complet")
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        store.replace(make_rows(range(10), '69001', 1.0))
+        store.upsert(make_rows(range(5), '69001', 2.0))
+
+        # Le rechargement complet (mêmes numéros de fichiers) et un upsert
+        # ont lieu pendant la lecture des partitions par compact()
+        read_partition = Generation.read_partition
+        interleaved = []
+
+        def read_and_reload(generation, partition):
+            df = read_partition(generation, partition)
+            if not interleaved:
+                interleaved.append(partition)
+                store.replace(make_rows(range(100, 110), '69001', 7.0))
+                store.upsert(make_rows(range(100, 103), '69001', 8.0))
+            return df
+
+        Generation.read_partition = read_and_reload
+        try:
+            compacted = store.compact(['69001'])
+        finally:
+            Generation.read_partition = read_partition
+
+        assert interleaved == ['69001']
+        assert compacted == [], compacted
+        data = snapshot(store)
+        assert set(data) == {str(key) for key in range(100, 110)}, sorted(data)
+        assert data['100'] == ('69001', 8.0) and data['109'] == ('69001', 7.0)
+    print("✅ Données du rechargement conservées")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Upsert et lecture", test_upsert_and_load),
+        ("Couches d'upsert", test_upsert_layers),
+        ("Générations et rétention", test_generations_retention_and_restore),
+        ("Compactage", test_compaction),
+        ("Compactage et rechargement", test_compaction_across_full_reload),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
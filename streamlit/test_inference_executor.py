@@ -0,0 +1,121 @@
+"""
+Tests du pool d'inférence à file bornée (utils/inference_executor.py)
+Usage: python test_inference_executor.py  (ou pytest test_inference_executor.py)
+
+Refus immédiat (ExecutorSaturated -> 429) quand exécution et file sont
+pleines, attente d'une place pour les flux, compteurs.
+"""
+
+import asyncio
+import threading
+import time
+
+from utils.inference_executor import ExecutorSaturated, InferenceExecutor
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def occupy(executor: InferenceExecutor, count: int) -> threading.Event:
+    """Occuper `count` places du pool jusqu'à ce que l'événement renvoyé soit levé"""
+    release = threading.Event()
+    for _ in range(count):
+        threading.Thread(target=lambda: asyncio.run(executor.run(release.wait, 10)), daemon=True).start()
+    deadline = time.monotonic() + 5
+    while executor.stats()["pending"] < count:
+        assert time.monotonic() < deadline, "places jamais occupées"
+        time.sleep(0.005)
+    return release
+
+def wait_idle(executor: InferenceExecutor):
+    """Attendre la fin des tâches en cours (places rendues)"""
+    deadline = time.monotonic() + 5
+    while executor.stats()["pending"]:
+        assert time.monotonic() < deadline, "tâches jamais terminées"
+        time.sleep(0.005)
+
+def test_rejects_when_full():
+    """max_workers + max_queue tâches en cours : la suivante est refusée sans attendre"""
+    print_section("🚦 File pleine")
+    executor = InferenceExecutor(max_workers=1, max_queue=1)
+    release = occupy(executor, 2)
+    assert executor.is_saturated()
+
+    try:
+        asyncio.run(executor.run(lambda: "trop"))
+    except ExecutorSaturated as e:
+        assert e.retry_after >= 1
+    else:
+        raise AssertionError("Une tâche au-delà de la file aurait dû être refusée")
+
+    release.set()
+    wait_idle(executor)
+    # La place est rendue juste après la fin de la tâche : run_when_free couvre cet intervalle
+    assert asyncio.run(executor.run_when_free(lambda x: x * 2, 21)) == 42
+    stats = executor.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 3 and stats["pending"] == 0, stats
+    assert not executor.is_saturated()
+    print("✅ Refus immédiat, places rendues à la fin des tâches")
+
+def test_run_when_free_waits():
+    """run_when_free attend qu'une place se libère au lieu d'échouer"""
+    print_section("⏳ Attente d'une place")
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+    release = occupy(executor, 1)
+    threading.Timer(0.05, release.set).start()
+
+    started = time.perf_counter()
+    assert asyncio.run(executor.run_when_free(lambda: "ok")) == "ok"
+    assert time.perf_counter() - started >= 0.04
+    assert executor.stats()["rejected"] == 0
+    print("✅ Tâche exécutée une fois la place libérée")
+
+def test_errors_release_slots():
+    """Une tâche en erreur libère sa place et propage l'exception"""
+    print_section("💥 Erreurs")
+    executor = InferenceExecutor(max_workers=1, max_queue=0)
+
+    def fail():
+        raise ValueError("schéma invalide")
+
+    for _ in range(3):
+        try:
+            asyncio.run(executor.run(fail))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("L'erreur aurait dû être propagée")
+    assert executor.stats()["pending"] == 0 and not executor.is_saturated()
+    print("✅ Places libérées après erreur")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("File pleine", test_rejects_when_full),
+        ("Attente d'une place", test_run_when_free_waits),
+        ("Erreurs", test_errors_release_slots),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Tests des tâches de fond (utils/job_manager.py)
+Usage: python test_job_manager.py  (ou pytest test_job_manager.py)
+
+Single-flight par type, annulation coopérative, annulation concurrente de
+la fin d'une tâche (autre worker), rétention des enregistrements et
+tâches interrompues par un redémarrage.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from utils.job_manager import JobManager
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def wait_finished(manager: JobManager, job_id: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = manager.get(job_id)
+        if record['status'] in JobManager.FINISHED:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"Tâche {job_id} toujours en cours")
+
+def submit_when_free(manager: JobManager, job_type: str, target) -> dict:
+    """Soumettre une tâche une fois la précédente du même type entièrement terminée (verrou libéré)"""
+    for _ in range(500):
+        record, created = manager.submit(job_type, target)
+        if created:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"Tâche {job_type} jamais libérée")
+
+def test_single_flight():
+    """Une deuxième demande du même type renvoie la tâche en cours"""
+    print_section("🔒 Une tâche par type")
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(directory)
+        release = threading.Event()
+        first, created = manager.submit("refresh", lambda job: release.wait(10) and {"rows": 1})
+        assert created
+        second, created_again = manager.submit("refresh", lambda job: None)
+        assert not created_again and second['id'] == first['id']
+
+        other, created_other = manager.submit("retrain", lambda job: "ok")
+        assert created_other
+        release.set()
+        assert wait_finished(manager, first['id'])['result'] == {"rows": 1}
+        assert wait_finished(manager, other['id'])['status'] == 'succeeded'
+
+        third = submit_when_free(manager, "refresh", lambda job: None)
+        assert third['id'] != first['id']
+        wait_finished(manager, third['id'])
+    print("✅ Single-flight par type")
+
+def test_cancel_at_next_progress():
+    """L'annulation (depuis un autre worker) prend effet au progress() suivant"""
+    print_section("🛑 Annulation")
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(directory)
+        other_worker = JobManager(directory)
+        started = threading.Event()
+
+        def target(job):
+            started.set()
+            for step in range(1000):
+                job.progress("étape", step, 1000)
+                time.sleep(0.01)
+            return "terminé"
+
+        record, _ = manager.submit("refresh", target)
+        started.wait(5)
+        other_worker.cancel(record['id'])
+        assert wait_finished(manager, record['id'])['status'] == 'cancelled'
+
+        try:
+            other_worker.cancel(record['id'])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Annuler une tâche terminée aurait dû échouer")
+    print("✅ Tâche annulée, nouvelle annulation refusée")
+
+def test_cancel_racing_finish():
+    """Une annulation concurrente de la fin ne remet jamais une tâche terminée en cours"""
+    print_section("🏁 Annulation concurrente de la fin")
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(directory)
+        other_worker = JobManager(directory)
+        ids = []
+
+        for _ in range(100):
+            record = submit_when_free(manager, "refresh", lambda job: "ok")
+            ids.append(record['id'])
+            while True:
+                try:
+                    other_worker.cancel(record['id'])
+                except ValueError:
+                    break  # terminée
+            wait_finished(manager, record['id'])
+
+        statuses = [manager.get(job_id)['status'] for job_id in ids]
+        assert all(status in JobManager.FINISHED for status in statuses), statuses
+        assert manager.active("refresh") is None
+    print("✅ 100 tâches terminées, aucune restée active")
+
+def test_retention():
+    """Seules les `keep` tâches terminées les plus récentes sont conservées"""
+    print_section("🧹 Rétention")
+    with tempfile.TemporaryDirectory() as directory:
+        manager = JobManager(directory, keep=3)
+        ids = []
+        for _ in range(6):
+            record = submit_when_free(manager, "retrain", lambda job: None)
+            wait_finished(manager, record['id'])
+            ids.append(record['id'])
+        # La rétention suit on_finish : laisser la dernière tâche l'appliquer
+        time.sleep(0.1)
+        kept = [record['id'] for record in manager.list()]
+        assert kept == ids[::-1][:3], (kept, ids)
+        assert manager.get(ids[0]) is None
+    print("✅ 3 enregistrements conservés")
+
+def test_interrupted_after_restart():
+    """
+    Tâche restée « running » après un arrêt, même pid que le nouveau
+    processus (PID 1 du conteneur) : marquée interrompue au démarrage,
+    sauf si un autre worker détient encore le verrou de son type
+    """
+    print_section("💥 Tâches interrompues")
+    with tempfile.TemporaryDirectory() as directory:
+        for job_id, job_type in (("crash", "refresh"), ("other", "retrain")):
+            with open(os.path.join(directory, f"{job_id}.json"), "w") as f:
+                json.dump({
+                    'id': job_id, 'type': job_type, 'status': 'running', 'stage': None, 'percent': 0.0,
+                    'params': {}, 'result': None, 'error': None, 'pid': os.getpid(),
+                    'created_at': datetime.now().isoformat(), 'started_at': datetime.now().isoformat(),
+                    'finished_at': None, 'updated_at': None,
+                }, f)
+
+        # Un worker vivant exécute encore une tâche "retrain" (verrou de son type)
+        with open(os.path.join(directory, "retrain.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            manager = JobManager(directory)
+
+        assert manager.get("crash")['status'] == 'interrupted'
+        assert manager.get("crash")['finished_at'] is not None
+        assert manager.active("refresh") is None
+        assert manager.get("other")['status'] == 'running'
+
+        record = submit_when_free(manager, "refresh", lambda job: "ok")
+        assert wait_finished(manager, record['id'])['status'] == 'succeeded'
+    print("✅ Tâche du processus arrêté interrompue, tâche d'un worker vivant conservée")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Single-flight", test_single_flight),
+        ("Annulation", test_cancel_at_next_progress),
+        ("Annulation et fin", test_cancel_racing_finish),
+        ("Rétention", test_retention),
+        ("Tâches interrompues", test_interrupted_after_restart),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Tests du registre de modèles (utils/model_registry.py) et de la publication
+des versions (ModelTrainer.publish_models / load_models)
+Usage: python test_model_registry.py  (ou pytest test_model_registry.py)
+
+Activation, historique et retour arrière ; modèles compilés écrits à la
+publication et jamais au chargement.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeRegressor
+
+from synthetic_data import make_dataset, make_features
+from utils.model_registry import ModelRegistry
+from utils.model_trainer import ModelTrainer
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def train_models(seed: int = 0):
+    df = make_dataset(n=500, seed=seed)
+    X = make_features(df)
+    classifier = RandomForestClassifier(n_estimators=5, max_depth=6, random_state=0, n_jobs=1).fit(X, df['etiquette_dpe'])
+    regressor = DecisionTreeRegressor(max_depth=6, random_state=0).fit(X, df['cout_total_5_usages'])
+    return classifier, regressor
+
+def snapshot_files(directory: str) -> dict:
+    """Fichiers d'un répertoire et leur date de modification"""
+    return {
+        os.path.join(root, name): os.stat(os.path.join(root, name)).st_mtime_ns
+        for root, _, names in os.walk(directory) for name in names
+    }
+
+def test_activate_and_rollback():
+    """Activation atomique, historique et retour à la version précédente"""
+    print_section("🔁 Activation et retour arrière")
+    with tempfile.TemporaryDirectory() as directory:
+        registry = ModelRegistry(directory)
+        classifier, regressor = train_models()
+        assert registry.get_active_version() is None
+
+        first = registry.register(classifier, regressor, {'classification': {'accuracy': 0.5}})
+        second = registry.register(classifier, regressor, {'classification': {'accuracy': 0.7}})
+        assert registry.get_active_version() is None, "register() ne doit pas activer"
+        assert [v['version'] for v in registry.list_versions()] == [second, first]
+        assert registry.list_versions()[0]['accuracy'] == 0.7
+
+        registry.activate(first)
+        registry.activate(second)
+        assert registry.get_active_version() == second
+        assert registry.rollback() == first
+        assert registry.get_active_version() == first
+        assert [entry['version'] for entry in registry.get_history()] == [first, second, first]
+
+        try:
+            registry.activate("v-inconnue")
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("Activer une version inconnue aurait dû échouer")
+        assert registry.get_active_version() == first
+
+        single = ModelRegistry(os.path.join(directory, "autre"))
+        single.activate(single.register(classifier, regressor, {}))
+        try:
+            single.rollback()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Retour arrière sans version précédente aurait dû échouer")
+    print("✅ Pointeur, historique et retour arrière")
+
+def test_publish_compiles_before_activation():
+    """publish_models écrit les modèles compilés dans la version ; le chargement mmap n'écrit rien"""
+    print_section("🗜️ Modèles compilés à la publication")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            trainer = ModelTrainer()
+            classifier, regressor = train_models()
+            version = trainer.publish_models(classifier, regressor, {'classification': {}, 'regression': {}})
+
+            version_dir = trainer.registry.version_dir(version)
+            assert trainer.registry.get_active_version() == version
+            for path in (ModelTrainer.COMPILED_CLASSIFIER_PATH, ModelTrainer.COMPILED_REGRESSOR_PATH):
+                assert os.path.exists(os.path.join(version_dir, os.path.basename(path))), path
+
+            before = snapshot_files(directory)
+            compiled_classifier, compiled_regressor = trainer.load_models(engine="mmap")
+            assert snapshot_files(directory) == before
+
+            X = make_features(make_dataset(n=200, seed=1))
+            assert np.array_equal(compiled_classifier.predict(X), classifier.predict(X))
+            assert np.array_equal(compiled_regressor.predict(X), regressor.predict(X))
+        finally:
+            os.chdir(cwd)
+    print("✅ Version complète à l'activation, chargement en lecture seule")
+
+def test_mmap_without_compiled_files():
+    """Une version sans modèles compilés est compilée en mémoire, sans écriture"""
+    print_section("📦 Version sans modèles compilés")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            trainer = ModelTrainer()
+            classifier, regressor = train_models()
+            version = trainer.registry.register(classifier, regressor, {})
+            trainer.registry.activate(version)
+
+            before = snapshot_files(directory)
+            compiled_classifier, _ = trainer.load_models(engine="mmap")
+            assert snapshot_files(directory) == before
+
+            X = make_features(make_dataset(n=200, seed=2))
+            assert np.array_equal(compiled_classifier.predict(X), classifier.predict(X))
+        finally:
+            os.chdir(cwd)
+    print("✅ Aucun fichier écrit dans le registre")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Activation et retour arrière", test_activate_and_rollback),
+        ("Compilation à la publication", test_publish_compiles_before_activation),
+        ("Version sans modèles compilés", test_mmap_without_compiled_files),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
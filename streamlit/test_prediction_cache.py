@@ -0,0 +1,126 @@
+"""
+Tests du cache de prédictions (utils/prediction_cache.py)
+Usage: python test_prediction_cache.py  (ou pytest test_prediction_cache.py)
+
+Clés canoniques, LRU, niveau SQLite partagé entre workers, invalidation
+par version et borne du niveau SQLite.
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+
+from utils.prediction_cache import PredictionCache
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def disk_versions(db_path: str) -> list:
+    """Versions présentes dans le niveau SQLite"""
+    with sqlite3.connect(db_path) as conn:
+        return sorted(version for (version,) in conn.execute("SELECT DISTINCT version FROM predictions"))
+
+def disk_rows(db_path: str) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+def test_keys():
+    """Même logement, même clé quel que soit le type ; la version fait partie de la clé"""
+    print_section("🔑 Clés canoniques")
+    X = np.array([[1, 2, 0], [1, 2, 3]])
+    keys = PredictionCache.make_keys("v1", X)
+    assert keys == PredictionCache.make_keys("v1", X.astype(np.float32))
+    assert keys[0] == PredictionCache.make_keys("v1", np.array([[1.0, 2.0, -0.0]]))[0]
+    assert keys[0] != keys[1]
+    assert keys != PredictionCache.make_keys("v2", X)
+    print("✅ Clés stables et propres à la version")
+
+def test_lru():
+    """Le LRU évince l'entrée la moins récemment utilisée"""
+    print_section("🧠 LRU en mémoire")
+    cache = PredictionCache(max_entries=2)
+    cache.put_many("v1", {"a": ("A", 1.0), "b": ("B", 2.0)})
+    assert cache.get_many(["a"]) == [("A", 1.0)]
+    cache.put_many("v1", {"c": ("C", 3.0)})
+
+    assert cache.get_many(["a", "b", "c"]) == [("A", 1.0), None, ("C", 3.0)]
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    print("✅ Éviction et compteurs")
+
+def test_shared_tier_and_invalidation():
+    """Un worker lit les résultats d'un autre ; invalidate() ne garde que la version donnée"""
+    print_section("🗄️ Niveau partagé et invalidation")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "cache", "predictions.db")
+        worker_a = PredictionCache(db_path=db_path)
+        worker_b = PredictionCache(db_path=db_path)
+
+        worker_a.put_many("v1", {"k1": ("C", 1.5)})
+        worker_a.put_many("v2", {"k2": ("D", 2.5)})
+        assert worker_b.get_many(["k1", "k2"]) == [("C", 1.5), ("D", 2.5)]
+        assert worker_b.stats()["disk_hits"] == 2
+
+        worker_b.invalidate("v2")
+        assert worker_b.stats()["entries"] == 0
+        assert disk_versions(db_path) == ["v2"]
+        assert PredictionCache(db_path=db_path).get_many(["k1", "k2"]) == [None, ("D", 2.5)]
+    print("✅ Résultats partagés, autres versions purgées")
+
+def test_disk_tier_bound():
+    """Le niveau SQLite est élagué aux écritures les plus récentes, évictions comptées"""
+    print_section("📏 Borne du niveau SQLite")
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "predictions.db")
+        cache = PredictionCache(max_entries=10, db_path=db_path, disk_max_entries=100)
+
+        for start in range(0, 1000, 50):
+            cache.put_many("v1", {f"k{i}": ("C", float(i)) for i in range(start, start + 50)})
+
+        # Élagage toutes les 10 écritures : jamais plus de 100 + 50 lignes
+        assert disk_rows(db_path) <= 150, disk_rows(db_path)
+        cache.trim_disk()
+        assert disk_rows(db_path) == 100
+        stats = cache.stats()
+        assert stats["disk_evictions"] == 900 and stats["disk_max_entries"] == 100
+
+        reader = PredictionCache(db_path=db_path)
+        assert reader.get_many(["k0", "k999"]) == [None, ("C", 999.0)]
+    print("✅ 100 lignes conservées, 900 évictions")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Clés", test_keys),
+        ("LRU", test_lru),
+        ("Niveau partagé et invalidation", test_shared_tier_and_invalidation),
+        ("Borne du niveau SQLite", test_disk_tier_bound),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
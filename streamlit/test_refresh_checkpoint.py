@@ -0,0 +1,120 @@
+"""
+Tests du point de reprise des rafraîchissements (utils/refresh_checkpoint.py)
+Usage: python test_refresh_checkpoint.py  (ou pytest test_refresh_checkpoint.py)
+
+Reprise d'un rafraîchissement de même clé (paramètres d'origine, unités
+terminées, curseurs), pages écrites après le dernier curseur noté
+refaites, nouveau départ pour une autre clé.
+"""
+
+import os
+import tempfile
+
+from test_data_refresher import TYPES, make_refresher, rows
+from utils.refresh_checkpoint import RefreshCheckpoint, unit_id
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def test_resume_same_key():
+    """Même clé : reprise avec les paramètres, unités et curseurs du premier lancement"""
+    print_section("♻️ Reprise")
+    with tempfile.TemporaryDirectory() as directory:
+        first = RefreshCheckpoint(directory)
+        assert not first.begin("existants+neufs complet", {"end_date": "2024-06-30"})
+        done, partial = unit_id("existants", "69001"), unit_id("existants", "69002")
+        first.complete(done, "existants 69001", 120)
+        first.save_cursor(partial, "https://example.org/lines?after=abc", pages=2, rows=2000)
+
+        # Processus relancé : l'état est relu depuis le disque
+        second = RefreshCheckpoint(directory)
+        assert second.begin("existants+neufs complet", {"end_date": "2024-07-15"})
+        assert second.params == {"end_date": "2024-06-30"}
+        assert second.is_done(done) and not second.is_done(partial)
+        assert second.rows(done) == 120
+        assert second.cursor(partial) == {"next": "https://example.org/lines?after=abc", "pages": 2, "rows": 2000}
+
+        status = second.status()
+        assert status["status"] == "running" and status["resumed"] == 1, status
+        assert status["units_done"] == 1 and status["rows_saved"] == 120 and status["cursors_in_progress"] == 1
+
+        second.complete(partial, "existants 69002", 2500)
+        second.finish()
+        assert second.status()["status"] == "fetched" and second.cursor(partial) is None
+        # Récupération terminée mais données non enregistrées : toujours reprise
+        assert RefreshCheckpoint(directory).begin("existants+neufs complet", {})
+    print("✅ Paramètres, unités et curseurs repris")
+
+def test_new_key_starts_over():
+    """Autre clé (autre période) : état et pages du rafraîchissement précédent effacés"""
+    print_section("🆕 Nouveau départ")
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint = RefreshCheckpoint(os.path.join(directory, "checkpoint"))
+        checkpoint.begin("existants+neufs complet", {})
+        checkpoint.pages.set_schema("existants", TYPES)
+        checkpoint.pages.write("existants", "69001", "u1", 0, rows([1], "69001", 1.0))
+        checkpoint.complete("u1", "existants 69001", 1)
+
+        assert not checkpoint.begin("existants+neufs 2024-06-01", {})
+        assert checkpoint.pages.files("existants") == []
+        assert not checkpoint.is_done("u1") and checkpoint.status()["units_done"] == 0
+
+        checkpoint.clear()
+        assert checkpoint.status() == {"status": "none"}
+    print("✅ Ancien état effacé")
+
+def test_unit_resumes_after_last_cursor():
+    """Une unité reprise garde ses pages notées et refait celles écrites après le dernier curseur"""
+    print_section("📄 Reprise d'une unité")
+    with tempfile.TemporaryDirectory() as directory:
+        refresher = make_refresher(directory)
+        checkpoint = refresher.checkpoint
+        checkpoint.begin("existants complet", {})
+        checkpoint.pages.set_schema("existants", TYPES)
+        for page in range(3):
+            checkpoint.pages.write("existants", "69001", "u1", page, rows([page], "69001", 1.0))
+        # Interruption après l'écriture de la page 2, avant que son curseur soit noté
+        checkpoint.save_cursor("u1", "https://example.org/lines?after=p2", pages=2, rows=2)
+
+        writer = refresher._unit_writer("existants", "69001", "u1")
+        assert (writer.pages, writer.rows, writer.cursor) == (2, 2, "https://example.org/lines?after=p2")
+        assert [os.path.basename(path) for path in checkpoint.pages.files("existants")] == [
+            "u1-00000.parquet", "u1-00001.parquet"
+        ]
+
+        writer(rows([2], "69001", 2.0))
+        assert checkpoint.pages.dataset("existants").count_rows() == 3
+    print("✅ Pages 0 et 1 conservées, page 2 récrite")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Reprise", test_resume_same_key),
+        ("Nouveau départ", test_new_key_starts_over),
+        ("Reprise d'une unité", test_unit_resumes_after_last_cursor),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Tests du plan d'extraction (utils/refresh_plan.py)
+Usage: python test_refresh_plan.py  (ou pytest test_refresh_plan.py)
+
+Regroupement des mois sous la limite d'une unité, coût attendu, ordre
+d'exécution et réutilisation d'un plan enregistré.
+"""
+
+import os
+import tempfile
+import time
+
+from utils.refresh_plan import FetchUnit, RefreshPlan, group_months, month_end
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def make_plan(**kwargs) -> RefreshPlan:
+    units = [
+        FetchUnit("existants", "69001", "", "code_postal_ban:69001", 2500),
+        FetchUnit("existants", "69002", "2024-01", "code_postal_ban:69002 AND ...", 10000),
+        FetchUnit("existants", "69002", "2024-02", "code_postal_ban:69002 AND ...", 0),
+        FetchUnit("neufs", "69003", "", "code_postal_ban:69003", 999),
+    ]
+    return RefreshPlan("existants+neufs complet", units, planning_requests=6, **kwargs)
+
+def test_month_periods():
+    """Mois consécutifs regroupés sous max_rows ; un mois trop gros reste seul"""
+    print_section("📅 Périodes")
+    assert month_end("2024-02-01") == "2024-02-29"
+    assert month_end("2023-12-01T00:00:00") == "2023-12-31"
+
+    months = [("2024-01-01", 4000), ("2024-02-01", 5000), ("2024-03-01", 12000),
+              ("2024-04-01", 100), ("2024-05-01", 200)]
+    assert group_months(months, 10000) == [
+        ("2024-01-01", "2024-02-29", 9000),
+        ("2024-03-01", "2024-03-31", 12000),
+        ("2024-04-01", "2024-05-31", 300),
+    ]
+    assert group_months([], 10000) == []
+    print("✅ 5 mois en 3 périodes")
+
+def test_plan_cost():
+    """Lignes et requêtes attendues, codes postaux et ordre d'exécution"""
+    print_section("💰 Coût du plan")
+    plan = make_plan()
+    assert plan.expected_rows == 13499
+    # Une requête minimum par unité, même vide
+    assert [plan.unit_requests(unit) for unit in plan.units] == [3, 10, 1, 1]
+    assert plan.expected_requests == 15
+    assert plan.codes_postaux("existants") == ["69001", "69002"]
+    assert [unit.expected_rows for unit in plan.by_size()] == [10000, 2500, 999, 0]
+
+    description = plan.describe()
+    assert "existants: 2 codes postaux, 3 unités (dont 2 découpées)" in description
+    assert "(+ 6 requêtes d'agrégation)" in description
+    print("✅ 13 499 lignes, 15 requêtes")
+
+def test_save_and_load():
+    """Un plan enregistré n'est réutilisé que pour la même clé et tant qu'il est récent"""
+    print_section("💾 Réutilisation")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plans", "refresh_plan.json")
+        plan = make_plan(page_size=500)
+        plan.save(path)
+
+        loaded = RefreshPlan.load(path, plan.key, ttl=60)
+        assert loaded.units == plan.units and loaded.page_size == 500
+        assert loaded.expected_requests == plan.expected_requests
+        assert RefreshPlan.load(path, "existants 2024-06-01", ttl=60) is None
+
+        make_plan(created_at=time.time() - 120).save(path)
+        assert RefreshPlan.load(path, plan.key, ttl=60) is None
+
+        with open(path, "w") as f:
+            f.write("{tronqué")
+        assert RefreshPlan.load(path, plan.key, ttl=60) is None
+        assert RefreshPlan.load(os.path.join(directory, "absent.json"), plan.key, ttl=60) is None
+    print("✅ Clé, âge et fichier illisible")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Périodes", test_month_periods),
+        ("Coût du plan", test_plan_cost),
+        ("Réutilisation", test_save_and_load),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
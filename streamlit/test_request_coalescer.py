@@ -0,0 +1,114 @@
+"""
+Tests du regroupement de requêtes (utils/request_coalescer.py)
+Usage: python test_request_coalescer.py  (ou pytest test_request_coalescer.py)
+
+Résultats redistribués dans l'ordre, erreurs propagées à tout le lot,
+lots découpés par clé (version de modèles).
+"""
+
+import threading
+
+from utils.request_coalescer import RequestCoalescer
+
+def print_section(title: str):
+    """Afficher une section"""
+    print("\n" + "="*60)
+    print(f"  {title}")
+    print("="*60 + "\n")
+
+def submit_all(coalescer: RequestCoalescer, items: list) -> list:
+    """Soumettre les éléments depuis des threads concurrents et attendre leurs résultats"""
+    futures = [None] * len(items)
+    barrier = threading.Barrier(len(items))
+
+    def submit(i):
+        barrier.wait()
+        futures[i] = coalescer.submit_future(items[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(items))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return futures
+
+def test_results_follow_requests():
+    """Chaque requête reçoit le résultat de son élément, en lots de max_batch au plus"""
+    print_section("📦 Redistribution des résultats")
+    batches = []
+
+    def batch_fn(items):
+        batches.append(len(items))
+        return [item * 10 for item in items]
+
+    coalescer = RequestCoalescer(batch_fn, max_wait_ms=50, max_batch=8)
+    futures = submit_all(coalescer, list(range(20)))
+    assert [future.result(timeout=5) for future in futures] == [i * 10 for i in range(20)]
+    assert max(batches) <= 8 and sum(batches) == 20, batches
+    assert coalescer.stats()['requests'] == 20
+    print(f"✅ 20 requêtes en {len(batches)} lots")
+
+def test_errors_reach_every_request():
+    """Une exception de batch_fn est transmise à toutes les requêtes du lot"""
+    print_section("💥 Propagation des erreurs")
+
+    def batch_fn(items):
+        raise ValueError("modèle indisponible")
+
+    coalescer = RequestCoalescer(batch_fn, max_wait_ms=20, max_batch=8)
+    futures = submit_all(coalescer, list(range(4)))
+    for future in futures:
+        assert isinstance(future.exception(timeout=5), ValueError)
+    assert coalescer.stats()['errors'] >= 1
+    print("✅ Erreur transmise")
+
+def test_batches_split_by_group_key():
+    """Avec group_key, batch_fn ne reçoit qu'une version de modèles par appel"""
+    print_section("🔀 Lots découpés par version")
+    calls = []
+
+    def batch_fn(items):
+        versions = {version for _, version in items}
+        calls.append(versions)
+        # La réponse annonce la version avec laquelle le lot est calculé
+        version = items[0][1]
+        return [(value, version) for value, _ in items]
+
+    coalescer = RequestCoalescer(batch_fn, max_wait_ms=50, max_batch=32,
+                                 group_key=lambda item: item[1])
+    items = [(i, "v1" if i % 2 else "v2") for i in range(16)]
+    futures = submit_all(coalescer, items)
+
+    assert [future.result(timeout=5) for future in futures] == items
+    assert all(len(versions) == 1 for versions in calls), calls
+    print(f"✅ {len(calls)} appels, une version chacun")
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Redistribution", test_results_follow_requests),
+        ("Erreurs", test_errors_reach_every_request),
+        ("Clé de regroupement", test_batches_split_by_group_key),
+    ]
+
+    results = {}
+
+    for test_name, test_func in tests:
+        try:
+            test_func()
+            results[test_name] = True
+        except Exception as e:
+            print(f"\n❌ Erreur lors du test '{test_name}': {e!r}")
+            results[test_name] = False
+
+    print_section("📋 RÉSUMÉ DES TESTS")
+
+    for test_name, result in results.items():
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"{status} - {test_name}")
+
+    passed = sum(results.values())
+    print(f"\nRéussis: {passed}/{len(results)}")
+
+if __name__ == "__main__":
+    main()
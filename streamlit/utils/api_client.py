@@ -47,20 +47,48 @@ class APIClient:
         response = requests.post(f"{self.base_url}/predict", json=features)
         return self._handle_response(response)
     
-    def predict_batch(self, data_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def predict_batch(self, data_list: List[Dict[str, Any]], format: str = "json") -> Dict[str, Any]:
         """
         Faire des prédictions multiples
         
         Args:
             data_list: Liste de dictionnaires contenant les features
+                (ou DataFrame pandas avec format="arrow")
+            format: "json" ou "arrow" (Arrow IPC dans les deux sens, sans
+                sérialisation JSON par ligne ; nécessite pyarrow)
             
         Returns:
-            Dict avec predictions et total
+            Dict avec predictions et total (avec format="arrow", predictions est
+            un DataFrame : etiquette_dpe, cout_total_5_usages, proba_<classe>)
         """
+        if format == "arrow":
+            return self._predict_batch_arrow(data_list)
+        
         payload = {"data": data_list}
         response = requests.post(f"{self.base_url}/predict/batch", json=payload)
         return self._handle_response(response)
     
+    def _predict_batch_arrow(self, data_list) -> Dict[str, Any]:
+        """Envoyer le lot en Arrow IPC et décoder la table de résultats"""
+        import pyarrow as pa
+        from utils.arrow_io import ARROW_STREAM, read_table, write_table
+        
+        if isinstance(data_list, list):
+            table = pa.Table.from_pylist(data_list)
+        else:
+            table = pa.Table.from_pandas(data_list, preserve_index=False)
+        
+        response = requests.post(
+            f"{self.base_url}/predict/batch",
+            data=write_table(table, "arrow"),
+            headers={"Content-Type": ARROW_STREAM, "Accept": ARROW_STREAM}
+        )
+        if response.status_code != 200:
+            raise Exception(f"Erreur API ({response.status_code}): {response.text}")
+        
+        predictions = read_table(response.content, "arrow").to_pandas()
+        return {"predictions": predictions, "total": len(predictions)}
+    
     def get_metrics(self) -> Dict[str, Any]:
         """Récupérer les métriques des modèles"""
         response = requests.get(f"{self.base_url}/models/metrics")
@@ -71,6 +99,21 @@ class APIClient:
         response = requests.get(f"{self.base_url}/models/info")
         return self._handle_response(response)
     
+    def get_model_versions(self) -> Dict[str, Any]:
+        """Récupérer les versions du registre de modèles"""
+        response = requests.get(f"{self.base_url}/models/versions")
+        return self._handle_response(response)
+    
+    def activate_model_version(self, version: str) -> Dict[str, Any]:
+        """Activer une version du registre de modèles"""
+        response = requests.post(f"{self.base_url}/models/activate/{version}")
+        return self._handle_response(response)
+    
+    def rollback_models(self) -> Dict[str, Any]:
+        """Réactiver la version de modèles précédente"""
+        response = requests.post(f"{self.base_url}/models/rollback")
+        return self._handle_response(response)
+    
     def refresh_data(self, full_reload: bool = False) -> Dict[str, Any]:
         """
         Rafraîchir les données
@@ -79,7 +122,7 @@ class APIClient:
             full_reload: Si True, recharge toutes les données
             
         Returns:
-            Dict avec status, message, new_records, total_records
+            Dict avec status, message et job_id (voir get_job)
         """
         response = requests.post(
             f"{self.base_url}/data/refresh",
@@ -87,10 +130,25 @@ class APIClient:
         )
         return self._handle_response(response)
     
+    def get_refresh_status(self) -> Dict[str, Any]:
+        """Récupérer l'état du rafraîchissement (tâche en cours et point de reprise)"""
+        response = requests.get(f"{self.base_url}/data/refresh/status")
+        return self._handle_response(response)
+    
     def retrain_models(self) -> Dict[str, Any]:
         """Lancer le réentraînement des modèles"""
         response = requests.post(f"{self.base_url}/models/retrain")
         return self._handle_response(response)
+    
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Récupérer l'état d'une tâche (status, stage, percent, result)"""
+        response = requests.get(f"{self.base_url}/jobs/{job_id}")
+        return self._handle_response(response)
+    
+    def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Annuler une tâche en cours"""
+        response = requests.delete(f"{self.base_url}/jobs/{job_id}")
+        return self._handle_response(response)
 
 # Fonction utilitaire pour Streamlit
 @st.cache_resource
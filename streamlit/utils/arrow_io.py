@@ -0,0 +1,120 @@
+"""
+Format d'échange Apache Arrow / Parquet pour les prédictions par lot
+
+Les colonnes reçues sont décodées directement dans la matrice d'inférence
+(float32, ordre de ModelTrainer.FEATURES) sans passer par des objets Python
+par ligne ; les résultats sont renvoyés sous forme de table Arrow.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from utils.media_types import ARROW_STREAM, PARQUET
+from utils.media_types import TABLE_CONTENT_TYPES as CONTENT_TYPES, TABLE_MEDIA_TYPES as MEDIA_TYPES
+
+
+def is_available() -> bool:
+    """pyarrow est-il installé ?"""
+    return pa is not None
+
+
+def read_table(body: bytes, fmt: str) -> 'pa.Table':
+    """Lire un corps de requête Arrow IPC (stream) ou Parquet"""
+    if fmt == 'arrow':
+        return pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    if fmt == 'parquet':
+        return pq.read_table(pa.BufferReader(body))
+    raise ValueError(f"Format non supporté: {fmt}")
+
+
+def write_table(table: 'pa.Table', fmt: str) -> bytes:
+    """Sérialiser une table en Arrow IPC (stream) ou Parquet"""
+    sink = pa.BufferOutputStream()
+
+    if fmt == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == 'parquet':
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Format non supporté: {fmt}")
+
+    return sink.getvalue().to_pybytes()
+
+
+def _encode_categorical(column: 'pa.ChunkedArray', mapping: Dict[str, int], default: int) -> np.ndarray:
+    """Encoder une colonne de chaînes via son dictionnaire (une recherche par valeur distincte)"""
+    column = column.combine_chunks()
+    if not pa.types.is_dictionary(column.type):
+        column = pc.dictionary_encode(column)
+
+    lookup = [mapping.get(value, default) for value in column.dictionary.to_pylist()]
+    lookup.append(default)  # valeurs nulles
+
+    indices = pc.fill_null(column.indices, len(lookup) - 1)
+    return np.asarray(lookup, dtype=np.float32)[indices.to_numpy()]
+
+
+def table_to_features(table: 'pa.Table', features: List[str],
+                      categorical_maps: Dict[str, Dict[str, int]],
+                      categorical_defaults: Dict[str, int]) -> pd.DataFrame:
+    """
+    Construire la matrice d'inférence à partir d'une table Arrow
+
+    Les colonnes numériques sont copiées une seule fois dans une matrice
+    float32 (le dtype utilisé par les arbres) ; le DataFrame renvoyé est une
+    vue sur cette matrice.
+
+    Raises:
+        ValueError: colonne absente, de type inattendu ou contenant des valeurs nulles
+    """
+    missing = [col for col in features if col not in table.column_names]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+
+    X = np.empty((table.num_rows, len(features)), dtype=np.float32)
+
+    for j, col in enumerate(features):
+        column = table.column(col)
+
+        if col in categorical_maps:
+            value_type = column.type.value_type if pa.types.is_dictionary(column.type) else column.type
+            if not (pa.types.is_string(value_type) or pa.types.is_large_string(value_type)):
+                raise ValueError(f"Colonne '{col}': type {column.type} inattendu (chaîne attendue)")
+            X[:, j] = _encode_categorical(column, categorical_maps[col], categorical_defaults[col])
+            continue
+
+        if not (pa.types.is_floating(column.type) or pa.types.is_integer(column.type)):
+            raise ValueError(f"Colonne '{col}': type {column.type} inattendu (numérique attendu)")
+        if column.null_count:
+            raise ValueError(f"Colonne '{col}': {column.null_count} valeurs manquantes")
+
+        offset = 0
+        for chunk in column.chunks:
+            X[offset:offset + len(chunk), j] = chunk.to_numpy(zero_copy_only=False)
+            offset += len(chunk)
+
+    return pd.DataFrame(X, columns=features, copy=False)
+
+
+def predictions_to_table(labels: np.ndarray, couts: np.ndarray,
+                         proba: Optional[np.ndarray], classes: Optional[List[str]]) -> 'pa.Table':
+    """Table Arrow des résultats (une colonne proba_<classe> par classe)"""
+    columns = {
+        'etiquette_dpe': pa.array(labels.astype(str)),
+        'cout_total_5_usages': pa.array(np.asarray(couts, dtype=np.float64)),
+    }
+    if proba is not None:
+        for j, cls in enumerate(classes):
+            columns[f'proba_{cls}'] = pa.array(np.ascontiguousarray(proba[:, j]))
+
+    return pa.table(columns)
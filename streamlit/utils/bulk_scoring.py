@@ -0,0 +1,198 @@
+"""
+Lecture et écriture par blocs pour le scoring en masse (CSV / NDJSON)
+
+Le corps de la requête est lu au fil de l'eau et découpé en DataFrames de
+taille fixe ; les résultats sont sérialisés bloc par bloc. La mémoire reste
+bornée par la taille d'un bloc, quelle que soit la taille du fichier.
+"""
+
+import csv
+import io
+import json
+from typing import AsyncIterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.media_types import STREAM_CONTENT_TYPES as CONTENT_TYPES, STREAM_MEDIA_TYPES as MEDIA_TYPES
+
+INVALID_ROW_ERROR = "valeurs manquantes ou invalides"
+
+
+class ChunkedTableReader:
+    """
+    Découper un flux d'octets CSV ou NDJSON en DataFrames de chunk_rows lignes
+
+    Les colonnes `columns` sont obligatoires ; celles de `categorical_columns`
+    sont lues comme chaînes, les autres sont converties en nombres (les
+    valeurs invalides deviennent NaN et la ligne est signalée invalide).
+    """
+
+    def __init__(self, byte_stream: AsyncIterator[bytes], fmt: str, chunk_rows: int,
+                 columns: List[str], categorical_columns: List[str]):
+        if fmt not in MEDIA_TYPES:
+            raise ValueError(f"Format non supporté: {fmt}")
+
+        self.byte_stream = byte_stream.__aiter__()
+        self.fmt = fmt
+        self.chunk_rows = max(1, chunk_rows)
+        self.columns = columns
+        self.categorical_columns = categorical_columns
+
+        self._pending = bytearray()
+        self._pending_lines = 0
+        self._eof = False
+        self._header: Optional[bytes] = None
+        self.rows_read = 0
+
+    async def _read_more(self) -> bool:
+        """Lire le prochain morceau du flux ; False en fin de flux"""
+        if self._eof:
+            return False
+        try:
+            data = await self.byte_stream.__anext__()
+        except StopAsyncIteration:
+            self._eof = True
+            return False
+
+        self._pending += data
+        self._pending_lines += data.count(b'\n')
+        return True
+
+    async def start(self):
+        """
+        Lire l'en-tête (CSV) ou la première ligne (NDJSON) et vérifier le schéma
+
+        Raises:
+            ValueError: si des colonnes obligatoires sont absentes
+        """
+        while self._pending_lines == 0 and await self._read_more():
+            pass
+
+        end = self._pending.find(b'\n')
+        first_line = bytes(self._pending if end < 0 else self._pending[:end]).strip()
+        if not first_line:
+            raise ValueError("Corps de requête vide")
+
+        if self.fmt == 'csv':
+            header = next(csv.reader([first_line.decode('utf-8-sig')]))
+            present = set(header)
+            # L'en-tête est conservé pour être réinjecté devant chaque bloc
+            self._header = bytes(self._pending[:end + 1]) if end >= 0 else first_line + b'\n'
+            del self._pending[:len(self._header)]
+            self._pending_lines = self._pending.count(b'\n')
+        else:
+            try:
+                present = set(json.loads(first_line))
+            except (ValueError, TypeError):
+                raise ValueError("La première ligne n'est pas un objet JSON valide")
+
+        missing = [col for col in self.columns if col not in present]
+        if missing:
+            raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+
+    def _take_block(self, n_lines: int) -> bytes:
+        """Retirer les n_lines premières lignes complètes du tampon"""
+        pos = -1
+        for _ in range(n_lines):
+            pos = self._pending.find(b'\n', pos + 1)
+
+        block = bytes(self._pending[:pos + 1])
+        del self._pending[:pos + 1]
+        self._pending_lines -= n_lines
+        return block
+
+    async def chunks(self) -> AsyncIterator[pd.DataFrame]:
+        """Itérer sur les blocs (DataFrames avec exactement les colonnes `columns`)"""
+        while True:
+            while self._pending_lines >= self.chunk_rows:
+                yield self._parse(self._take_block(self.chunk_rows))
+
+            if not await self._read_more():
+                break
+
+        # Fin de flux : lignes restantes (moins de chunk_rows, dernière ligne
+        # éventuellement sans saut de ligne) en un seul bloc
+        if self._pending_lines or bytes(self._pending).strip():
+            yield self._parse(bytes(self._pending))
+        self._pending.clear()
+        self._pending_lines = 0
+
+    def _parse(self, block: bytes) -> pd.DataFrame:
+        """Convertir un bloc de lignes en DataFrame typé"""
+        if self.fmt == 'csv':
+            df = pd.read_csv(
+                io.BytesIO(self._header + block),
+                usecols=self.columns,
+                dtype={col: str for col in self.categorical_columns},
+                skip_blank_lines=True
+            )
+        else:
+            records = []
+            for line in block.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                records.append(record if isinstance(record, dict) else {})
+            df = pd.DataFrame.from_records(records, columns=self.columns)
+
+        df = df.reindex(columns=self.columns)
+        for col in self.columns:
+            if col not in self.categorical_columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+
+        df.index = pd.RangeIndex(self.rows_read, self.rows_read + len(df))
+        self.rows_read += len(df)
+        return df
+
+
+def format_predictions(fmt: str, rows: np.ndarray, valid: np.ndarray,
+                       labels: np.ndarray, couts: np.ndarray,
+                       proba: Optional[np.ndarray], classes: Optional[List[str]],
+                       header: bool) -> bytes:
+    """
+    Sérialiser les résultats d'un bloc
+
+    Args:
+        rows: Numéro de ligne (0-based) de chaque entrée du bloc
+        valid: Masque des lignes prédites ; labels/couts/proba ne concernent que celles-ci
+        header: Écrire l'en-tête CSV (premier bloc uniquement)
+    """
+    n = len(rows)
+    label_col = np.full(n, None, dtype=object)
+    cout_col = np.full(n, np.nan)
+    label_col[valid] = labels
+    cout_col[valid] = couts
+
+    if fmt == 'csv':
+        out = pd.DataFrame({'row': rows, 'etiquette_dpe': label_col, 'cout_total_5_usages': cout_col})
+        if proba is not None:
+            for j, cls in enumerate(classes):
+                col = np.full(n, np.nan)
+                col[valid] = proba[:, j]
+                out[f'proba_{cls}'] = col
+        out['error'] = np.where(valid, '', INVALID_ROW_ERROR)
+        return out.to_csv(index=False, header=header).encode('utf-8')
+
+    lines = []
+    proba_rows = iter(proba.tolist()) if proba is not None else None
+    labels_iter = iter(label_col[valid].tolist())
+    couts_iter = iter(cout_col[valid].tolist())
+
+    for row, is_valid in zip(rows.tolist(), valid.tolist()):
+        if not is_valid:
+            lines.append(json.dumps({'row': row, 'error': INVALID_ROW_ERROR}))
+            continue
+        result = {
+            'row': row,
+            'etiquette_dpe': str(next(labels_iter)),
+            'cout_total_5_usages': next(couts_iter),
+        }
+        if proba_rows is not None:
+            result['probabilities'] = dict(zip(classes, next(proba_rows)))
+        lines.append(json.dumps(result))
+
+    return ('\n'.join(lines) + '\n').encode('utf-8') if lines else b''
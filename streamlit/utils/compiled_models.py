@@ -0,0 +1,240 @@
+"""
+Moteur d'inférence compilé pour les modèles à base d'arbres
+
+Les arbres d'un modèle scikit-learn entraîné (RandomForestClassifier,
+DecisionTreeRegressor, ...) sont convertis en tableaux NumPy plats
+(feature, seuil, enfants, valeurs des feuilles). Le parcours est vectorisé
+sur toutes les lignes et tous les arbres à la fois, sans validation
+d'estimateur ni dispatch Python par arbre.
+
+Les sorties sont identiques bit à bit à celles de scikit-learn exécuté
+avec n_jobs=1 (les arbres sont accumulés dans le même ordre).
+
+Le gain porte sur les petits lots (requêtes unitaires, lots regroupés) où le
+coût fixe de scikit-learn domine. Sur de très grands lots, le parcours Cython
+de scikit-learn reste plus rapide : voir benchmark_inference.py.
+"""
+
+import numpy as np
+import pandas as pd
+import sklearn
+from typing import Any, Dict, List, Optional
+from sklearn.utils.fixes import parse_version
+
+# Avant scikit-learn 1.4, tree_.value contient des effectifs pondérés que
+# predict_proba normalise ; depuis 1.4, il contient déjà des fractions.
+_NORMALIZE_CLASS_VALUES = parse_version(sklearn.__version__) < parse_version("1.4")
+
+# Marqueur de feuille utilisé par scikit-learn
+TREE_LEAF = -1
+
+
+class CompiledTrees:
+    """Ensemble d'arbres empaquetés dans des tableaux NumPy plats"""
+
+    # Tableaux constituant la représentation compilée
+    ARRAY_NAMES = [
+        'feature', 'threshold', 'left', 'right',
+        'missing_go_to_left', 'value', 'roots'
+    ]
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray,
+                 missing_go_to_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray):
+        """
+        Args:
+            feature: Indice de la feature testée par nœud
+            threshold: Seuil de chaque nœud (X <= seuil -> gauche)
+            left, right: Indices absolus des enfants (TREE_LEAF pour une feuille)
+            missing_go_to_left: Direction des valeurs manquantes par nœud
+            value: Valeur de sortie par nœud, (n_nodes,) ou (n_nodes, n_classes)
+            roots: Indice absolu de la racine de chaque arbre
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_estimators(cls, estimators: List[Any], classification: bool) -> 'CompiledTrees':
+        """Empaqueter les arbres (tree_) d'une liste d'estimateurs scikit-learn"""
+        features, thresholds, lefts, rights, missings, values, roots = [], [], [], [], [], [], []
+        offset = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            if tree.n_outputs != 1:
+                raise ValueError("Les modèles multi-sorties ne sont pas supportés")
+
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == TREE_LEAF
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, TREE_LEAF, tree.children_left + offset).astype(np.intp))
+            rights.append(np.where(is_leaf, TREE_LEAF, tree.children_right + offset).astype(np.intp))
+
+            missing = getattr(tree, 'missing_go_to_left', None)
+            if missing is None:
+                missing = np.zeros(n_nodes, dtype=bool)
+            missings.append(np.asarray(missing).astype(bool))
+
+            if classification:
+                node_values = tree.value[:, 0, :estimator.n_classes_].astype(np.float64)
+                if _NORMALIZE_CLASS_VALUES:
+                    normalizer = node_values.sum(axis=1)[:, np.newaxis]
+                    normalizer[normalizer == 0.0] = 1.0
+                    node_values = node_values / normalizer
+            else:
+                node_values = tree.value[:, 0, 0].astype(np.float64)
+            values.append(node_values)
+
+            roots.append(offset)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_go_to_left=np.concatenate(missings),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp)
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Exporter les tableaux de la représentation compilée"""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'CompiledTrees':
+        """Reconstruire la représentation compilée à partir de ses tableaux"""
+        return cls(**{name: arrays[name] for name in cls.ARRAY_NAMES})
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Indice absolu de la feuille atteinte par chaque ligne dans chaque arbre
+
+        Returns:
+            np.ndarray de forme (n_trees, n_samples)
+        """
+        n_samples = X.shape[0]
+        nodes = np.repeat(self.roots, n_samples)
+        rows = np.tile(np.arange(n_samples, dtype=np.intp), self.n_trees)
+
+        # Ne parcourir que les (arbre, ligne) qui ne sont pas encore sur une feuille
+        active = np.flatnonzero(self.left[nodes] != TREE_LEAF)
+
+        while active.size:
+            idx = nodes[active]
+            x = X[rows[active], self.feature[idx]]
+
+            go_left = x <= self.threshold[idx]
+            is_nan = np.isnan(x)
+            if is_nan.any():
+                go_left = np.where(is_nan, self.missing_go_to_left[idx], go_left)
+
+            next_nodes = np.where(go_left, self.left[idx], self.right[idx])
+            nodes[active] = next_nodes
+            active = active[self.left[next_nodes] != TREE_LEAF]
+
+        return nodes.reshape(self.n_trees, n_samples)
+
+    def accumulate(self, X: np.ndarray) -> np.ndarray:
+        """Moyenne des valeurs des feuilles sur tous les arbres (ordre des arbres)"""
+        leaves = self.apply(X)
+
+        out = np.zeros((X.shape[0],) + self.value.shape[1:], dtype=np.float64)
+        for tree_leaves in leaves:
+            out += self.value[tree_leaves]
+        out /= self.n_trees
+
+        return out
+
+
+class _CompiledModel:
+    """Base commune : conversion des entrées comme le fait scikit-learn"""
+
+    def __init__(self, trees: CompiledTrees, n_features_in_: int,
+                 feature_names_in_: Optional[np.ndarray] = None):
+        self.trees = trees
+        self.n_features_in_ = n_features_in_
+        self.feature_names_in_ = feature_names_in_
+
+    @property
+    def n_estimators(self) -> int:
+        return self.trees.n_trees
+
+    def _as_matrix(self, X) -> np.ndarray:
+        """Convertir X en matrice float32 (même dtype que le parcours scikit-learn)"""
+        if isinstance(X, pd.DataFrame) and self.feature_names_in_ is not None:
+            X = X[list(self.feature_names_in_)]
+
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X doit avoir {self.n_features_in_} colonnes, reçu la forme {X.shape}"
+            )
+
+        return X
+
+
+class CompiledClassifier(_CompiledModel):
+    """Équivalent compilé d'un RandomForestClassifier / DecisionTreeClassifier"""
+
+    def __init__(self, trees: CompiledTrees, classes_: np.ndarray, n_features_in_: int,
+                 feature_names_in_: Optional[np.ndarray] = None):
+        super().__init__(trees, n_features_in_, feature_names_in_)
+        self.classes_ = classes_
+        self.n_classes_ = len(classes_)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.trees.accumulate(self._as_matrix(X))
+
+    def predict(self, X) -> np.ndarray:
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+
+class CompiledRegressor(_CompiledModel):
+    """Équivalent compilé d'un DecisionTreeRegressor / RandomForestRegressor"""
+
+    def predict(self, X) -> np.ndarray:
+        return self.trees.accumulate(self._as_matrix(X))
+
+
+def compile_model(model) -> _CompiledModel:
+    """
+    Compiler un modèle scikit-learn à base d'arbres
+
+    Supporte les arbres de décision seuls et les forêts aléatoires,
+    en classification comme en régression.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        if not hasattr(model, 'tree_'):
+            raise TypeError(f"Modèle non supporté : {type(model).__name__}")
+        estimators = [model]
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+
+    if hasattr(model, 'classes_'):
+        if np.ndim(model.n_classes_) != 0:
+            raise ValueError("Les modèles multi-sorties ne sont pas supportés")
+        trees = CompiledTrees.from_estimators(list(estimators), classification=True)
+        return CompiledClassifier(trees, model.classes_, model.n_features_in_, feature_names)
+
+    trees = CompiledTrees.from_estimators(list(estimators), classification=False)
+    return CompiledRegressor(trees, model.n_features_in_, feature_names)
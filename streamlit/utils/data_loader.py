@@ -2,14 +2,16 @@ import pandas as pd
 import streamlit as st
 import os
 
+from utils.dpe_store import dataset_exists, load_dataset
+
 @st.cache_data
 def load_data(path: str = "data/donnees_ademe_finales_nettoyees_69_final_pret.csv") -> pd.DataFrame:
-    """Charge le fichier CSV et le met en cache."""
-    if not os.path.exists(path):
+    """Charge le jeu de données (partitions indexées, ou CSV historique) et le met en cache."""
+    if not dataset_exists(path):
         st.error(f"❌ Fichier introuvable : {path}")
         return pd.DataFrame()
     try:
-        df = pd.read_csv(path)
+        df = load_dataset(path)
         st.success(f"✅ Données chargées ({len(df)} lignes, {len(df.columns)} colonnes)")
         return df
     except Exception as e:
@@ -2,9 +2,262 @@ import requests
 import pandas as pd
 import os
 import json
+import asyncio
+import hashlib
+import math
+import random
+import threading
 from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 import time
-from typing import Optional, List, Tuple, Set
+from typing import Any, Dict, Iterator, Optional, List, Tuple, Set
+from requests.adapters import HTTPAdapter
+
+from utils.dpe_store import DpeStore, store_dir
+from utils.page_store import UnitWriter
+from utils.refresh_checkpoint import RefreshCheckpoint, unit_id
+from utils.refresh_plan import FetchUnit, RefreshPlan, group_months
+
+try:
+    import httpx
+except ImportError:  # repli sur la récupération séquentielle (requests)
+    httpx = None
+
+
+class AdemeAPIError(Exception):
+    """Requête ADEME toujours en échec après les nouvelles tentatives"""
+
+
+class TokenBucket:
+    """
+    Limiteur de débit à jetons, adaptatif (AIMD)
+    
+    reserve() réserve un jeton et renvoie l'attente nécessaire, ce qui sert
+    aussi bien aux appels bloquants (time.sleep) qu'asynchrones
+    (asyncio.sleep). Un 429 divise le débit par deux et suspend tous les
+    appelants pendant le Retry-After ; chaque succès le remonte
+    progressivement vers le débit maximal.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.5):
+        self.max_rate = max(rate, min_rate)
+        self.min_rate = min_rate
+        self.rate = self.max_rate
+        self.burst = max(1, burst)
+        
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """Réserver un jeton ; renvoie le délai (s) à attendre avant d'envoyer la requête"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+    
+    def throttled(self, pause: float = 0.0):
+        """Le serveur a limité le débit : ralentir (et suspendre pendant `pause` s)"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if pause > 0:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+    
+    def succeeded(self):
+        """Requête acceptée : remonter le débit"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class AdemeTransport:
+    """
+    Couche HTTP partagée des appels à l'API ADEME
+    
+    Connexions persistantes (pool keep-alive), compression gzip, délais
+    explicites, nouvelles tentatives avec backoff exponentiel et gigue sur
+    429 / 5xx / erreurs réseau (en respectant Retry-After), et limiteur de
+    débit adaptatif. Utilisée par la récupération séquentielle (requests)
+    comme par la récupération asynchrone (httpx).
+    """
+    
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    HEADERS = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+    
+    def __init__(self, max_connections: int = 8, timeout: float = 30.0,
+                 connect_timeout: float = 10.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 60.0,
+                 rate_limit: float = 10.0):
+        """
+        Args:
+            max_connections: Taille du pool de connexions
+            timeout: Délai de lecture d'une réponse (s)
+            connect_timeout: Délai d'établissement de connexion (s)
+            max_retries: Nouvelles tentatives par requête
+            backoff_base, backoff_max: Bornes (s) du backoff exponentiel
+            rate_limit: Débit maximal (requêtes/s)
+        """
+        self.max_connections = max(1, max_connections)
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate_limit, burst=self.max_connections)
+        
+        self._session = None
+        self._lock = threading.Lock()
+        self.reset_stats()
+    
+    @property
+    def session(self) -> requests.Session:
+        """Session requests (pool keep-alive), créée au premier appel"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(self.HEADERS)
+            self._session = session
+        return self._session
+    
+    def async_client(self) -> "httpx.AsyncClient":
+        """Client httpx configuré comme la session (à ouvrir dans la boucle d'événements)"""
+        return httpx.AsyncClient(
+            headers=self.HEADERS,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+    
+    def reset_stats(self):
+        """Remettre à zéro les compteurs (début d'un rafraîchissement)"""
+        with self._lock:
+            self._stats = {"requests": 0, "retries": 0, "throttled": 0,
+                           "server_errors": 0, "network_errors": 0, "failures": 0}
+    
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs depuis le dernier reset_stats() et débit courant"""
+        with self._lock:
+            return {**self._stats, "rate_limit": round(self.bucket.rate, 2)}
+    
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+    
+    def _retry_after(self, headers) -> Optional[float]:
+        """Délai Retry-After (secondes ou date HTTP), None si absent ou invalide"""
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now().astimezone()).total_seconds())
+        except (TypeError, ValueError):
+            return None
+    
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponentiel avec gigue complète"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _next_delay(self, attempt: int, status: Optional[int], headers) -> Optional[float]:
+        """
+        Décider d'une nouvelle tentative après un échec
+        
+        Returns:
+            Délai avant la tentative suivante, ou None s'il n'y a plus de tentative
+        """
+        if status == 429:
+            self._count("throttled")
+        elif status is None:
+            self._count("network_errors")
+        else:
+            self._count("server_errors")
+        
+        retry_after = self._retry_after(headers) if headers is not None else None
+        if status == 429:
+            self.bucket.throttled(retry_after or 0.0)
+        
+        if attempt >= self.max_retries:
+            self._count("failures")
+            return None
+        
+        self._count("retries")
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return self._backoff(attempt)
+    
+    def _describe(self, api_url: str, status: Optional[int], error: Optional[Exception]) -> str:
+        cause = f"HTTP {status}" if status is not None else type(error).__name__
+        return f"{api_url} en échec après {self.max_retries + 1} tentatives ({cause})"
+    
+    def get_json(self, api_url: str, params: Optional[dict]) -> Optional[dict]:
+        """
+        GET bloquant
+        
+        Returns:
+            Corps JSON, ou None pour une réponse non réessayable (4xx hors 429)
+        
+        Raises:
+            AdemeAPIError: si la requête échoue encore après max_retries nouvelles tentatives
+        """
+        attempt = 0
+        while True:
+            time.sleep(self.bucket.reserve())
+            self._count("requests")
+            status, headers, error = None, None, None
+            try:
+                response = self.session.get(
+                    api_url, params=params, timeout=(self.connect_timeout, self.timeout)
+                )
+                status, headers = response.status_code, response.headers
+                if status == 200:
+                    self.bucket.succeeded()
+                    return response.json()
+                if status not in self.RETRY_STATUSES:
+                    return None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            
+            delay = self._next_delay(attempt, status, headers)
+            if delay is None:
+                raise AdemeAPIError(self._describe(api_url, status, error))
+            time.sleep(delay)
+            attempt += 1
+    
+    async def aget_json(self, client: "httpx.AsyncClient", api_url: str,
+                        params: Optional[dict]) -> Optional[dict]:
+        """Équivalent asynchrone de get_json (client issu de async_client())"""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.bucket.reserve())
+            self._count("requests")
+            status, headers, error = None, None, None
+            try:
+                response = await client.get(api_url, params=params)
+                status, headers = response.status_code, response.headers
+                if status == 200:
+                    self.bucket.succeeded()
+                    return response.json()
+                if status not in self.RETRY_STATUSES:
+                    return None
+            except httpx.TransportError as e:
+                error = e
+            
+            delay = self._next_delay(attempt, status, headers)
+            if delay is None:
+                raise AdemeAPIError(self._describe(api_url, status, error))
+            await asyncio.sleep(delay)
+            attempt += 1
+
 
 class DataRefresher:
     """
@@ -16,6 +269,23 @@ class DataRefresher:
     BASE_URL_EXISTANTS = "https://data.ademe.fr/data-fair/api/v1/datasets/dpe03existant/lines"
     BASE_URL_NEUFS = "https://data.ademe.fr/data-fair/api/v1/datasets/dpe02neuf/lines"
     
+    # Taille de page et fenêtre maximale (page * size) de l'API data-fair
+    PAGE_SIZE = 1000
+    MAX_RESULT_WINDOW = 10000
+    
+    # Pagination par curseur (liens `next` avec `after`) : tri sur une clé unique et stable
+    CURSOR_SORT = "_i"
+    
+    # Planification : lignes maximales par unité de récupération, codes postaux
+    # par requête d'agrégation, plan enregistré
+    UNIT_MAX_ROWS = 10000
+    AGG_CODES_BATCH = 100
+    PLAN_FILE = "data/refresh_plan.json"
+    
+    # Rafraîchissement incrémental : filigrane (date de dernière modification
+    # déjà intégrée) par dataset et code postal, rectifications comprises
+    WATERMARK_FIELD = "date_derniere_modification_dpe"
+    
     METADATA_FILE = "data/metadata.json"
     DATA_FILE = "data/donnees_ademe_finales_nettoyees_69_final_pret.csv"
     
@@ -101,10 +371,60 @@ class DataRefresher:
         "surface_habitable_logement", "cout_ecs"
     ]
     
-    def __init__(self, codes_postaux_file: str = "data/adresses-69.csv"):
-        """Initialiser le refresher avec le fichier des codes postaux"""
+    def __init__(self, codes_postaux_file: str = "data/adresses-69.csv",
+                 max_concurrency: Optional[int] = None):
+        """
+        Initialiser le refresher avec le fichier des codes postaux
+        
+        Args:
+            codes_postaux_file: Fichier des codes postaux
+            max_concurrency: Nombre maximal de requêtes ADEME simultanées, tous
+                codes postaux et datasets confondus (défaut : ADEME_CONCURRENCY
+                ou 8 ; 1 = récupération séquentielle)
+        """
         self.codes_postaux_file = codes_postaux_file
-        self.codes_postaux = self._load_codes_postaux()
+        
+        # Sans fichier, codes postaux découverts auprès de l'API (au premier
+        # accès) et gardés ADEME_CODES_TTL secondes dans les métadonnées
+        self.departement = os.getenv("ADEME_DEPARTEMENT", "69")
+        self.codes_ttl = float(os.getenv("ADEME_CODES_TTL", str(7 * 24 * 3600)))
+        self._codes_postaux: Optional[List[str]] = None
+        
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("ADEME_CONCURRENCY", "8"))
+        self.max_concurrency = max(1, max_concurrency)
+        
+        # "cursor" (défaut, repli automatique sur les pages) ou "pages"
+        self.use_cursor = os.getenv("ADEME_PAGINATION", "cursor") != "pages"
+        # Support des curseurs constaté par URL d'API (absent = pas encore testé)
+        self._cursor_support: Dict[str, bool] = {}
+        
+        # Plan d'extraction calculé par agrégations avant la récupération
+        # (ADEME_PLANNER=0 pour récupérer code postal par code postal)
+        self.use_planner = os.getenv("ADEME_PLANNER", "1") != "0"
+        self.plan_ttl = float(os.getenv("ADEME_PLAN_TTL", "21600"))
+        self.last_plan: Optional[RefreshPlan] = None
+        
+        # Transport HTTP partagé (pool, retries, limiteur de débit)
+        self.transport = AdemeTransport(
+            max_connections=self.max_concurrency,
+            timeout=float(os.getenv("ADEME_API_TIMEOUT", "30")),
+            max_retries=int(os.getenv("ADEME_API_RETRY", "3")),
+            rate_limit=float(os.getenv("ADEME_RATE_LIMIT", "10")),
+        )
+        
+        # Point de reprise : unités terminées et curseurs en cours, sur disque
+        self.checkpoint = RefreshCheckpoint(os.getenv("ADEME_CHECKPOINT_DIR", "data/refresh_checkpoint"))
+        
+        # Durée (s), compteurs HTTP, fin de période et date de début de la dernière récupération
+        self.last_fetch_seconds = None
+        self.last_fetch_stats = {}
+        self.last_fetch_end_date = None
+        self.last_fetch_started_on = None
+        
+        # Filigranes calculés par le dernier rafraîchissement, enregistrés
+        # avec les données (save_refreshed_data)
+        self._pending_watermarks: Optional[Dict[str, Dict[str, str]]] = None
         
         # Identifier les colonnes communes
         self.common_columns = self._identify_common_columns()
@@ -113,15 +433,115 @@ class DataRefresher:
         print(f"📊 DPE Existants: {len(self.COLUMNS_EXISTANTS)} colonnes")
         print(f"🏗️ DPE Neufs: {len(self.COLUMNS_NEUFS)} colonnes")
     
+    @property
+    def codes_postaux(self) -> List[str]:
+        """Codes postaux à rafraîchir (chargés ou découverts au premier accès)"""
+        if self._codes_postaux is None:
+            self._codes_postaux = self._load_codes_postaux()
+        return self._codes_postaux
+    
+    @codes_postaux.setter
+    def codes_postaux(self, codes: List[str]):
+        self._codes_postaux = list(codes)
+    
     def _load_codes_postaux(self) -> List[str]:
         """Charger les codes postaux du département 69"""
         if not os.path.exists(self.codes_postaux_file):
-            # Si le fichier n'existe pas, utiliser les codes postaux du Rhône par défaut
+            # Sans fichier : codes postaux réels du département, découverts auprès de l'API
+            codes = self._cached_codes_postaux() or self.discover_codes_postaux()
+            if codes:
+                return codes
+            
+            # API injoignable : codes postaux du Rhône par défaut
+            print("⚠️ Découverte des codes postaux impossible : codes synthétiques 69001-69299")
             return [f"69{i:03d}" for i in range(1, 300)]
         
         df = pd.read_csv(self.codes_postaux_file, dtype=str, sep=';')
         return df['code_postal'].unique().tolist()
     
+    def _cached_codes_postaux(self) -> Optional[List[str]]:
+        """Codes postaux découverts encore valides (moins de codes_ttl secondes)"""
+        discovery = self._load_metadata().get('codes_postaux_discovery') or {}
+        if discovery.get('departement') != self.departement or not discovery.get('codes'):
+            return None
+        
+        age = (datetime.now() - datetime.fromisoformat(discovery['discovered_at'])).total_seconds()
+        return discovery['codes'] if age <= self.codes_ttl else None
+    
+    def discover_codes_postaux(self) -> Optional[List[str]]:
+        """
+        Découvrir les codes postaux du département ayant des DPE
+        
+        Une agrégation par valeurs distinctes de code_postal_ban, filtrée sur
+        code_departement_ban, par dataset ; le résultat est enregistré dans
+        les métadonnées (codes_postaux_discovery).
+        
+        Returns:
+            Codes postaux triés, ou None si l'API ne répond pas
+        """
+        codes = set()
+        for source in ("existants", "neufs"):
+            api_url, _ = self._dataset(source)
+            counts = self._value_counts(api_url, "code_postal_ban", f"code_departement_ban:{self.departement}")
+            if counts is None:
+                return None
+            codes.update(code for code, rows in counts.items() if rows > 0)
+        
+        codes = sorted(codes)
+        print(f"🔍 {len(codes)} codes postaux découverts pour le département {self.departement}")
+        
+        metadata = self._load_metadata()
+        metadata['codes_postaux_discovery'] = {
+            'departement': self.departement,
+            'discovered_at': datetime.now().isoformat(),
+            'codes': codes
+        }
+        self._write_metadata(metadata)
+        return codes
+    
+    @staticmethod
+    def _agg_url(api_url: str) -> str:
+        """URL de l'agrégation par valeurs (values_agg) d'un dataset"""
+        return api_url.rsplit("/lines", 1)[0] + "/values_agg"
+    
+    def _value_counts(self, api_url: str, field: str, qs: str) -> Optional[Dict[str, int]]:
+        """Lignes par valeur de `field` (requête bloquante) ; None si l'agrégation échoue"""
+        params = {"field": field, "agg_size": 1000, "size": 0, "qs": qs}
+        try:
+            data = self.transport.get_json(self._agg_url(api_url), params)
+        except AdemeAPIError as e:
+            print(f"⚠️ Agrégation {field} impossible: {e}")
+            return None
+        
+        if data is None or "aggs" not in data:
+            return None
+        return {bucket["value"]: bucket["total"] for bucket in data["aggs"]}
+    
+    def codes_with_rows(self, source: str, start_date: Optional[str] = None,
+                        end_date: Optional[str] = None,
+                        since: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Codes postaux ayant au moins une ligne dans la période (tous si l'agrégation échoue)
+        
+        Évite les requêtes de récupération vouées à revenir vides. Avec
+        `since` (filigrane par code postal), une agrégation par filigrane distinct.
+        """
+        api_url, _ = self._dataset(source)
+        counts = {}
+        for window, window_codes in self._group_by_window(self.codes_postaux, start_date, end_date, since).items():
+            q_parts = [f"code_departement_ban:{self.departement}", window]
+            window_counts = self._value_counts(api_url, "code_postal_ban", " AND ".join(p for p in q_parts if p))
+            if window_counts is None:
+                return self.codes_postaux
+            for cp in window_codes:
+                counts[cp] = window_counts.get(cp, 0)
+        
+        codes = [cp for cp in self.codes_postaux if counts.get(cp, 0) > 0]
+        skipped = len(self.codes_postaux) - len(codes)
+        if skipped:
+            print(f"  ⏭️ {source}: {skipped} codes postaux sans DPE sur la période ignorés")
+        return codes
+    
     def _identify_common_columns(self) -> Set[str]:
         """Identifier les colonnes communes entre DPE existants et neufs"""
         set_existants = set(self.COLUMNS_EXISTANTS)
@@ -142,6 +562,23 @@ class DataRefresher:
         
         return common
     
+    def _load_metadata(self) -> dict:
+        """Contenu de METADATA_FILE ({} s'il est absent ou illisible)"""
+        if not os.path.exists(self.METADATA_FILE):
+            return {}
+        
+        try:
+            with open(self.METADATA_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Erreur lecture metadata: {e}")
+            return {}
+    
+    def _write_metadata(self, metadata: dict):
+        os.makedirs(os.path.dirname(self.METADATA_FILE), exist_ok=True)
+        with open(self.METADATA_FILE, 'w') as f:
+            json.dump(metadata, f, indent=2)
+    
     def get_last_update_date(self) -> Optional[str]:
         """Récupérer la date de dernière mise à jour depuis les métadonnées"""
         if not os.path.exists(self.METADATA_FILE):
@@ -157,10 +594,9 @@ class DataRefresher:
     
     def save_metadata(self, last_date: str, total_records: int, 
                      existants_count: int, neufs_count: int):
-        """Sauvegarder les métadonnées de mise à jour"""
-        os.makedirs(os.path.dirname(self.METADATA_FILE), exist_ok=True)
-        
-        metadata = {
+        """Sauvegarder les métadonnées de mise à jour (les autres clés sont conservées)"""
+        metadata = self._load_metadata()
+        metadata.update({
             'last_update_date': last_date,
             'last_refresh': datetime.now().isoformat(),
             'total_records': total_records,
@@ -168,20 +604,63 @@ class DataRefresher:
             'neufs_count': neufs_count,
             'codes_postaux': self.codes_postaux,
             'common_columns_count': len(self.common_columns)
-        }
+        })
         
-        with open(self.METADATA_FILE, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        self._write_metadata(metadata)
+    
+    def get_watermarks(self) -> Dict[str, Dict[str, str]]:
+        """Filigranes enregistrés : {dataset: {code postal: date de dernière modification intégrée}}"""
+        return self._load_metadata().get('watermarks', {})
+    
+    def _advance_watermarks(self, frames: Dict[str, Any],
+                            since: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Filigranes après une récupération complète de `frames` (DataFrames ou datasets pyarrow)
+        
+        Pour chaque (dataset, code postal) récupéré : date de modification la
+        plus récente parmi les lignes reçues, sans jamais reculer sous
+        `since` (filigrane de départ). Les autres filigranes sont conservés.
+        """
+        watermarks = {source: dict(codes) for source, codes in self.get_watermarks().items()}
+        for source, df in frames.items():
+            current = watermarks.setdefault(source, {})
+            current.update(since.get(source, {}))
+            
+            modified = self._select_columns(df, ['code_postal_ban', self.WATERMARK_FIELD])
+            if self.WATERMARK_FIELD not in modified.columns:
+                continue
+            modified = modified.dropna()
+            latest = modified[self.WATERMARK_FIELD].astype(str).str[:10].groupby(
+                modified['code_postal_ban'].astype(str)
+            ).max()
+            for cp, date in latest.items():
+                if cp in current and date > current[cp]:
+                    current[cp] = date
+        return watermarks
+    
+    def _commit_watermarks(self):
+        """Enregistrer les filigranes du dernier rafraîchissement (données enregistrées)"""
+        if self._pending_watermarks is None:
+            return
+        metadata = self._load_metadata()
+        metadata['watermarks'] = self._pending_watermarks
+        self._write_metadata(metadata)
+        self._pending_watermarks = None
     
     def fetch_data_smart(self, code_postal: str, api_url: str, columns: List[str],
                         etiquette: Optional[str] = None,
                         start_date: Optional[str] = None, 
-                        end_date: Optional[str] = None) -> List[dict]:
+                        end_date: Optional[str] = None,
+                        on_page=None) -> List[dict]:
         """
         Récupérer les données de manière intelligente avec découpage si nécessaire
         Version générique qui fonctionne pour les deux API
+        
+        Avec on_page, chaque page lui est transmise au lieu d'être accumulée
+        (la liste renvoyée reste alors vide).
         """
         results = []
+        emit = on_page or results.extend
         size = 1000
         page = 1
         
@@ -202,11 +681,10 @@ class DataRefresher:
             "q_fields": "code_postal_ban,etiquette_dpe,date_reception_dpe"
         }
         
-        response = requests.get(api_url, params=params)
-        if response.status_code != 200:
+        data = self.transport.get_json(api_url, params)
+        if data is None:
             return results
         
-        data = response.json()
         total = data.get("total", 0)
         
         # Si total > 10000 et pas filtré par étiquette
@@ -214,7 +692,7 @@ class DataRefresher:
             etiquettes = ["A", "B", "C", "D", "E", "F", "G"]
             for etiq in etiquettes:
                 results.extend(
-                    self.fetch_data_smart(code_postal, api_url, columns, etiquette=etiq)
+                    self.fetch_data_smart(code_postal, api_url, columns, etiquette=etiq, on_page=on_page)
                 )
             return results
         
@@ -226,7 +704,7 @@ class DataRefresher:
                 year_end = f"{year}-12-31"
                 results.extend(
                     self.fetch_data_smart(
-                        code_postal, api_url, columns, etiquette, year_start, year_end
+                        code_postal, api_url, columns, etiquette, year_start, year_end, on_page
                     )
                 )
             return results
@@ -234,94 +712,740 @@ class DataRefresher:
         # Récupération normale par page
         while True:
             params["page"] = page
-            response = requests.get(api_url, params=params)
-            if response.status_code != 200:
+            data = self.transport.get_json(api_url, params)
+            if data is None:
                 break
             
-            page_results = response.json().get("results", [])
+            page_results = data.get("results", [])
             if not page_results:
                 break
             
-            results.extend(page_results)
+            emit(page_results)
             
             if len(page_results) < size:
                 break
             
             page += 1
-            time.sleep(0.5)
         
         return results
     
-    def fetch_dpe_existants(self, start_date: Optional[str] = None, 
-                           end_date: Optional[str] = None,
-                           progress_callback=None) -> pd.DataFrame:
-        """Récupérer les DPE des logements existants"""
-        print("\n" + "="*60)
-        print("🏠 RÉCUPÉRATION DPE EXISTANTS")
-        print("="*60)
+    def _window_filter(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       since: Optional[str] = None) -> Optional[str]:
+        """
+        Filtre de période d'une requête
         
-        all_results = []
-        total_codes = len(self.codes_postaux)
+        Avec `since` (filigrane d'un code postal) : DPE modifiés depuis cette
+        date, bornes incluses (la date de modification est au jour près, les
+        lignes déjà vues ce jour-là sont remplacées à l'identique). Sinon, DPE
+        reçus entre start_date et end_date ; None pour tout récupérer.
+        """
+        if since:
+            return f"{self.WATERMARK_FIELD}:[{since} TO *]"
+        if start_date and end_date:
+            return f"date_reception_dpe:[{start_date} TO {end_date}]"
+        return None
+    
+    def _group_by_window(self, codes: List[str], start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         since: Optional[Dict[str, str]] = None) -> Dict[Optional[str], List[str]]:
+        """Codes postaux regroupés par filtre de période (un seul groupe sans filigranes)"""
+        groups: Dict[Optional[str], List[str]] = {}
+        for cp in codes:
+            window = self._window_filter(start_date, end_date, since.get(cp) if since else None)
+            groups.setdefault(window, []).append(cp)
+        return groups
+    
+    def _cursor_params(self, code_postal: str, columns: List[str],
+                       start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       since: Optional[str] = None) -> dict:
+        """Paramètres de la première requête d'un parcours par curseur"""
+        q_parts = [f"code_postal_ban:{code_postal}", self._window_filter(start_date, end_date, since)]
         
-        for idx, cp in enumerate(self.codes_postaux):
-            if progress_callback:
-                progress_callback(idx + 1, total_codes, cp, "existants")
+        return {
+            "size": self.PAGE_SIZE,
+            "sort": self.CURSOR_SORT,
+            "qs": " AND ".join(part for part in q_parts if part),
+            "select": ",".join(columns),
+            "q_fields": "code_postal_ban,date_reception_dpe"
+        }
+    
+    def _cursor_supported(self, api_url: str, first_page: Optional[dict]) -> bool:
+        """
+        Le serveur pagine-t-il par curseur ?
+        
+        Une première page pleine doit renvoyer un lien `next` portant `after` ;
+        sinon (ou si le tri est refusé) l'URL est mémorisée comme sans support
+        et la récupération repasse par les pages et le découpage.
+        """
+        if first_page is None:
+            self._cursor_support[api_url] = False
+            return False
+        
+        if len(first_page.get("results", [])) < self.PAGE_SIZE:
+            return True  # une seule page : rien à conclure
+        
+        supported = "after=" in (first_page.get("next") or "")
+        if not supported and self._cursor_support.get(api_url) is not False:
+            print(f"⚠️ Pagination par curseur indisponible pour {api_url} : repli sur les pages")
+        self._cursor_support[api_url] = supported
+        return supported
+    
+    def _next_cursor(self, data: dict) -> Optional[str]:
+        """Lien de la page suivante, None si la page courante est la dernière"""
+        if len(data.get("results", [])) < self.PAGE_SIZE:
+            return None
+        return data.get("next")
+    
+    def fetch_data_cursor(self, code_postal: str, api_url: str, columns: List[str],
+                          start_date: Optional[str] = None,
+                          end_date: Optional[str] = None,
+                          writer: Optional[UnitWriter] = None,
+                          since: Optional[str] = None) -> Optional[List[dict]]:
+        """
+        Récupérer toutes les lignes d'un code postal en un seul parcours par curseur
+        
+        Sans limite de fenêtre (page * size) : aucun découpage par étiquette
+        ou par année n'est nécessaire. Avec `writer`, chaque page y est écrite
+        (point de reprise noté après chaque page) et un parcours interrompu
+        repart de sa dernière page. Avec `since`, seuls les DPE modifiés
+        depuis cette date.
+        
+        Returns:
+            Lignes récupérées (vide avec writer), ou None si le serveur ne
+            pagine pas par curseur (l'appelant se replie alors sur
+            fetch_data_smart / fetch_new_records)
+        """
+        results = []
+        emit = writer or results.extend
+        next_url = writer.cursor if writer else None
+        if not next_url:
+            if not self.use_cursor or self._cursor_support.get(api_url) is False:
+                return None
             
-            if start_date and end_date:
-                results = self.fetch_new_records(
-                    cp, self.BASE_URL_EXISTANTS, self.COLUMNS_EXISTANTS,
-                    start_date, end_date
-                )
-            else:
-                results = self.fetch_data_smart(
-                    cp, self.BASE_URL_EXISTANTS, self.COLUMNS_EXISTANTS
-                )
+            data = self.transport.get_json(api_url, self._cursor_params(code_postal, columns, start_date, end_date, since))
+            if not self._cursor_supported(api_url, data):
+                return None
             
-            all_results.extend(results)
-            print(f"  ✓ {cp}: {len(results)} DPE")
+            emit(data.get("results", []))
+            next_url = self._next_cursor(data)
+            self._save_cursor(writer, next_url)
         
-        print(f"\n✅ Total DPE existants récupérés: {len(all_results)}")
-        return pd.DataFrame(all_results)
+        while next_url:
+            data = self.transport.get_json(next_url, None)
+            if data is None:
+                raise AdemeAPIError(f"Curseur refusé par {api_url} ({code_postal})")
+            emit(data.get("results", []))
+            next_url = self._next_cursor(data)
+            self._save_cursor(writer, next_url)
+        
+        return results
     
-    def fetch_dpe_neufs(self, start_date: Optional[str] = None,
-                       end_date: Optional[str] = None,
-                       progress_callback=None) -> pd.DataFrame:
-        """Récupérer les DPE des logements neufs"""
-        print("\n" + "="*60)
-        print("🏗️ RÉCUPÉRATION DPE NEUFS")
-        print("="*60)
+    def _save_cursor(self, writer: Optional[UnitWriter], next_url: Optional[str]):
+        """Noter dans le point de reprise la page suivante d'un parcours par curseur"""
+        if writer is not None and next_url:
+            self.checkpoint.save_cursor(writer.uid, next_url, writer.pages, writer.rows)
+    
+    def _dataset(self, source: str) -> Tuple[str, List[str]]:
+        """URL et colonnes d'un dataset ("existants" ou "neufs")"""
+        if source == "existants":
+            return self.BASE_URL_EXISTANTS, self.COLUMNS_EXISTANTS
+        return self.BASE_URL_NEUFS, self.COLUMNS_NEUFS
+    
+    def fetch_pages(self, sources: List[str], start_date: Optional[str] = None,
+                    end_date: Optional[str] = None,
+                    progress_callback=None,
+                    since: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, "ds.Dataset"]:
+        """
+        Récupérer un ou plusieurs datasets pour tous les codes postaux, page par page sur disque
+        
+        Avec httpx, codes postaux et pages des datasets demandés sont récupérés
+        en parallèle (au plus max_concurrency requêtes simultanées) ; sinon,
+        un code postal après l'autre. Chaque page est écrite dès réception
+        dans le PageStore du point de reprise (Parquet partitionné par
+        dataset et code postal) : la mémoire reste bornée à quelques pages.
+        progress_callback(current, total, code_postal, source) est appelé à
+        chaque code postal terminé.
+        
+        since : filigrane par dataset puis code postal ; seuls les DPE
+        modifiés depuis sont récupérés (start_date et end_date sont ignorés
+        pour les codes postaux qui en ont un).
+        
+        Returns:
+            Dataset pyarrow par source (lecture paresseuse, par colonnes), valable
+            jusqu'à l'effacement du point de reprise (save_refreshed_data)
+        """
+        started = time.perf_counter()
+        self.transport.reset_stats()
+        concurrent = httpx is not None and self.max_concurrency > 1
+        
+        # Reprise d'un rafraîchissement interrompu : même période qu'au démarrage
+        window = start_date or 'complet'
+        if since:
+            window = self._since_key(since)
+        if self.checkpoint.begin(f"{'+'.join(sources)} {window}", {"end_date": end_date}):
+            end_date = self.checkpoint.params.get("end_date")
+            status = self.checkpoint.status()
+            print(f"♻️ Reprise du rafraîchissement interrompu : {status['units_done']} unités "
+                  f"({status['rows_saved']} DPE) déjà récupérées")
+        self.last_fetch_end_date = end_date
+        self.last_fetch_started_on = self.checkpoint.state["started_at"][:10]
+        for source in sources:
+            self._ensure_schema(source)
         
-        all_results = []
-        total_codes = len(self.codes_postaux)
+        # Le plan écarte déjà les codes postaux sans ligne ; sinon, une agrégation par dataset
+        codes = None
+        if not (concurrent and self.use_planner):
+            codes = {
+                source: self.codes_with_rows(source, start_date, end_date, (since or {}).get(source))
+                for source in sources
+            }
+        
+        if concurrent:
+            asyncio.run(self._fetch_datasets_async(sources, start_date, end_date, progress_callback, codes, since))
+        else:
+            for source in sources:
+                self._fetch_dataset_sequential(source, start_date, end_date, progress_callback,
+                                               codes[source], (since or {}).get(source))
         
-        for idx, cp in enumerate(self.codes_postaux):
+        self.checkpoint.finish()
+        self.last_fetch_seconds = time.perf_counter() - started
+        self.last_fetch_stats = self.transport.stats()
+        print(f"⏱️ Récupération ({', '.join(sources)}) terminée en {self.last_fetch_seconds:.1f} s "
+              f"({self.last_fetch_stats['requests']} requêtes, {self.last_fetch_stats['retries']} nouvelles tentatives, "
+              f"{self.last_fetch_stats['throttled']} limitations 429)")
+        
+        return {source: self.checkpoint.pages.dataset(source) for source in sources}
+    
+    def _ensure_schema(self, source: str):
+        """Types des colonnes d'après le schéma de l'API (à défaut, déduits de la première page)"""
+        store = self.checkpoint.pages
+        if store.has_schema(source):
+            return
+        
+        api_url, columns = self._dataset(source)
+        try:
+            fields = self.transport.get_json(api_url.rsplit("/lines", 1)[0] + "/schema", None)
+        except AdemeAPIError:
+            fields = None
+        if not isinstance(fields, list):
+            return
+        
+        types = {field.get("key"): field.get("type") for field in fields}
+        store.set_schema(source, {col: types.get(col, "string") for col in columns})
+    
+    def _unit_writer(self, source: str, code_postal: str, uid: str) -> UnitWriter:
+        """Destination des pages d'une unité, reprise après la dernière page notée d'un curseur"""
+        _, columns = self._dataset(source)
+        cursor = self.checkpoint.cursor(uid) or {}
+        writer = UnitWriter(self.checkpoint.pages, source, code_postal, uid, columns,
+                            cursor.get("pages", 0), cursor.get("rows", 0), cursor.get("next"))
+        # Pages écrites après le dernier point noté (ou d'une unité sans curseur) : à refaire
+        self.checkpoint.pages.discard(source, code_postal, uid, writer.pages)
+        return writer
+    
+    def _fetch_dataset_sequential(self, source: str, start_date: Optional[str],
+                                  end_date: Optional[str], progress_callback=None,
+                                  codes: Optional[List[str]] = None,
+                                  since: Optional[Dict[str, str]] = None):
+        """Récupérer un dataset code postal par code postal (sans httpx)"""
+        api_url, columns = self._dataset(source)
+        codes = self.codes_postaux if codes is None else codes
+        total_codes = len(codes)
+        
+        for idx, cp in enumerate(codes):
             if progress_callback:
-                progress_callback(idx + 1, total_codes, cp, "neufs")
+                progress_callback(idx + 1, total_codes, cp, source)
             
-            if start_date and end_date:
-                results = self.fetch_new_records(
-                    cp, self.BASE_URL_NEUFS, self.COLUMNS_NEUFS,
-                    start_date, end_date
-                )
-            else:
-                results = self.fetch_data_smart(
-                    cp, self.BASE_URL_NEUFS, self.COLUMNS_NEUFS
-                )
+            cp_since = since.get(cp) if since else None
+            uid = unit_id(source, cp, start_date, end_date, cp_since)
+            if not self.checkpoint.is_done(uid):
+                writer = self._unit_writer(source, cp, uid)
+                if self.fetch_data_cursor(cp, api_url, columns, start_date, end_date, writer, cp_since) is None:
+                    if self._window_filter(start_date, end_date, cp_since):
+                        self.fetch_new_records(cp, api_url, columns, start_date, end_date, cp_since, writer)
+                    else:
+                        self.fetch_data_smart(cp, api_url, columns, on_page=writer)
+                self.checkpoint.complete(uid, f"{source} {cp}", writer.rows)
             
-            all_results.extend(results)
-            print(f"  ✓ {cp}: {len(results)} DPE")
+            print(f"  ✓ {cp}: {self.checkpoint.rows(uid)} DPE")
+    
+    @staticmethod
+    async def _gather_all(coros: list) -> list:
+        """gather() qui annule les autres tâches dès qu'une échoue (ex: progress_callback)"""
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    
+    async def _fetch_datasets_async(self, sources: List[str], start_date: Optional[str],
+                                    end_date: Optional[str], progress_callback=None,
+                                    codes: Optional[Dict[str, List[str]]] = None,
+                                    since: Optional[Dict[str, Dict[str, str]]] = None):
+        """
+        Récupérer les datasets en parallèle sous une limite globale de concurrence
+        
+        codes : codes postaux à récupérer par dataset (None = plan, ou tous
+        les codes postaux si le plan est indisponible) ; since : filigranes
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        done = {source: 0 for source in sources}
         
-        print(f"\n✅ Total DPE neufs récupérés: {len(all_results)}")
-        return pd.DataFrame(all_results)
+        async with self.transport.async_client() as client:
+            
+            if codes is None and self.use_planner:
+                plan = await self._aplan(client, semaphore, sources, start_date, end_date, since)
+                if plan is not None:
+                    await self._aexecute_plan(client, semaphore, plan, sources, progress_callback)
+                    return
+            
+            if codes is None:
+                codes = {source: self.codes_postaux for source in sources}
+            
+            async def fetch_code(source: str, cp: str):
+                api_url, columns = self._dataset(source)
+                cp_since = (since or {}).get(source, {}).get(cp)
+                uid = unit_id(source, cp, start_date, end_date, cp_since)
+                if not self.checkpoint.is_done(uid):
+                    writer = self._unit_writer(source, cp, uid)
+                    rows = await self._afetch_cursor(
+                        client, semaphore, api_url,
+                        self._cursor_params(cp, columns, start_date, end_date, cp_since), cp, writer
+                    )
+                    if rows is None and self._window_filter(start_date, end_date, cp_since):
+                        await self._afetch_new_records(
+                            client, semaphore, cp, api_url, columns, start_date, end_date, cp_since, writer
+                        )
+                    elif rows is None:
+                        await self._afetch_data_smart(client, semaphore, cp, api_url, columns, on_page=writer)
+                    self.checkpoint.complete(uid, f"{source} {cp}", writer.rows)
+                
+                done[source] += 1
+                print(f"  ✓ {cp} ({source}): {self.checkpoint.rows(uid)} DPE")
+                if progress_callback:
+                    progress_callback(done[source], len(codes[source]), cp, source)
+            
+            await self._gather_all([fetch_code(source, cp) for source in sources for cp in codes[source]])
+    
+    def plan_refresh(self, sources: Optional[List[str]] = None, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None,
+                     since: Optional[Dict[str, Dict[str, str]]] = None) -> Optional[RefreshPlan]:
+        """
+        Calculer (ou relire) le plan d'un rafraîchissement sans rien récupérer
+        
+        Returns:
+            Plan (print(plan) affiche requêtes et lignes attendues), ou None si
+            l'API ne fournit pas les agrégations nécessaires (ou sans httpx)
+        """
+        if httpx is None:
+            return None
+        
+        async def plan() -> Optional[RefreshPlan]:
+            async with self.transport.async_client() as client:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                return await self._aplan(client, semaphore, sources or ["existants", "neufs"],
+                                         start_date, end_date, since)
+        
+        return asyncio.run(plan())
+    
+    @staticmethod
+    def _since_key(since: Dict[str, Dict[str, str]]) -> str:
+        """Clé courte d'un jeu de filigranes (plan, point de reprise)"""
+        return "filigranes:" + hashlib.sha1(json.dumps(since, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    
+    def _plan_key(self, sources: List[str], start_date: Optional[str], end_date: Optional[str],
+                  since: Optional[Dict[str, Dict[str, str]]] = None) -> str:
+        window = f"{start_date}..{end_date}" if start_date and end_date else "complet"
+        if since:
+            window = self._since_key(since)
+        codes = hashlib.sha1(",".join(self.codes_postaux).encode("utf-8")).hexdigest()[:8]
+        return f"{'+'.join(sources)} {window} codes:{codes}"
+    
+    async def _aplan(self, client, semaphore: asyncio.Semaphore, sources: List[str],
+                     start_date: Optional[str], end_date: Optional[str],
+                     since: Optional[Dict[str, Dict[str, str]]] = None) -> Optional[RefreshPlan]:
+        """
+        Plan en cache (mémoire puis PLAN_FILE, moins de plan_ttl s) ou recalculé
+        
+        Avec des filigranes, la période reste ouverte (modifiés depuis) : le
+        plan est toujours recalculé, sauf à la reprise d'un rafraîchissement.
+        """
+        key = self._plan_key(sources, start_date, end_date, since)
+        
+        # Reprise : plan du rafraîchissement interrompu, quel que soit son âge (mêmes unités)
+        saved = self.checkpoint.plan()
+        if saved is not None and saved["key"] == key:
+            self.last_plan = RefreshPlan.from_dict(saved)
+            print(self.last_plan.describe())
+            return self.last_plan
+        
+        ttl = 0 if since else self.plan_ttl
+        if self.last_plan is not None and self.last_plan.key == key \
+                and time.time() - self.last_plan.created_at <= ttl:
+            self.checkpoint.set_plan(self.last_plan.to_dict())
+            return self.last_plan
+        
+        plan = RefreshPlan.load(self.PLAN_FILE, key, ttl)
+        if plan is None:
+            planned = await asyncio.gather(*(
+                self._aplan_source(client, semaphore, source, start_date, end_date, (since or {}).get(source))
+                for source in sources
+            ))
+            if any(result is None for result in planned):
+                print("⚠️ Agrégations indisponibles : récupération sans plan, code postal par code postal")
+                return None
+            
+            plan = RefreshPlan(
+                key, [unit for units, _ in planned for unit in units],
+                planning_requests=sum(count for _, count in planned), page_size=self.PAGE_SIZE
+            )
+            plan.save(self.PLAN_FILE)
+        
+        self.last_plan = plan
+        self.checkpoint.set_plan(plan.to_dict())
+        print(plan.describe())
+        return plan
+    
+    async def _aaggregate(self, client, semaphore: asyncio.Semaphore, api_url: str, field: str,
+                          qs: str, agg_size: str, interval: Optional[str] = None) -> Optional[list]:
+        """Requête values_agg (comptes par valeur de `field`) ; None si non supportée"""
+        params = {"field": field, "agg_size": agg_size, "size": 0, "qs": qs}
+        if interval:
+            params["interval"] = interval
+        
+        data = await self._aget_json(client, semaphore, self._agg_url(api_url), params)
+        if data is None or "aggs" not in data:
+            return None
+        return data["aggs"]
+    
+    async def _aplan_source(self, client, semaphore: asyncio.Semaphore, source: str,
+                            start_date: Optional[str], end_date: Optional[str],
+                            since: Optional[Dict[str, str]] = None):
+        """
+        Découper un dataset en unités d'au plus UNIT_MAX_ROWS lignes
+        
+        Trois niveaux d'agrégation, chacun limité aux cases trop volumineuses
+        du précédent : code postal, puis code postal x étiquette, puis mois
+        de réception (mois consécutifs regroupés). Les lignes hors des valeurs
+        agrégées (étiquette ou date absente) forment une unité « reste ».
+        Avec `since`, chaque code postal est restreint aux DPE modifiés depuis
+        son filigrane ; les codes postaux sont agrégés par filigrane commun.
+        
+        Returns:
+            (unités, nombre de requêtes d'agrégation), ou None si l'API ne les supporte pas
+        """
+        api_url, _ = self._dataset(source)
+        limit = self.UNIT_MAX_ROWS
+        
+        def window(cp: str) -> Optional[str]:
+            return self._window_filter(start_date, end_date, since.get(cp) if since else None)
+        
+        def qs(cp: str, *parts) -> str:
+            return " AND ".join(part for part in parts + (window(cp),) if part)
+        
+        def batches(codes: List[str]) -> List[Tuple[Optional[str], List[str]]]:
+            return [
+                (window_filter, group[i:i + self.AGG_CODES_BATCH])
+                for window_filter, group in self._group_by_window(codes, start_date, end_date, since).items()
+                for i in range(0, len(group), self.AGG_CODES_BATCH)
+            ]
+        
+        # 1. Lignes par code postal
+        code_batches = batches(self.codes_postaux)
+        aggs = await asyncio.gather(*(
+            self._aggregate_codes(client, semaphore, api_url, "code_postal_ban", window_filter, batch,
+                                  f"{len(batch)}")
+            for window_filter, batch in code_batches
+        ))
+        requests_count = len(code_batches)
+        if any(agg is None for agg in aggs):
+            return None
+        counts = {bucket["value"]: bucket["total"] for agg in aggs for bucket in agg}
+        
+        # 2. Codes postaux trop volumineux : lignes par étiquette
+        big = [cp for cp in self.codes_postaux if counts.get(cp, 0) > limit]
+        by_label: Dict[str, Dict[str, int]] = {}
+        if big:
+            big_batches = batches(big)
+            aggs = await asyncio.gather(*(
+                self._aggregate_codes(client, semaphore, api_url, "code_postal_ban;etiquette_dpe",
+                                      window_filter, batch, f"{len(batch)};20")
+                for window_filter, batch in big_batches
+            ))
+            requests_count += len(big_batches)
+            if any(agg is None for agg in aggs):
+                return None
+            for agg in aggs:
+                for bucket in agg:
+                    by_label[bucket["value"]] = {
+                        sub["value"]: sub["total"] for sub in bucket.get("aggs", [])
+                    }
+        
+        # 3. Cases (code postal, étiquette) encore trop volumineuses : lignes par mois
+        cells = [(cp, label) for cp in big for label, rows in by_label.get(cp, {}).items() if rows > limit]
+        months = await asyncio.gather(*(
+            self._aaggregate(client, semaphore, api_url, "date_reception_dpe",
+                             qs(cp, f"code_postal_ban:{cp}", f"etiquette_dpe:{label}"), "1000", interval="month")
+            for cp, label in cells
+        ))
+        requests_count += len(cells)
+        if any(agg is None for agg in months):
+            return None
+        by_month = {
+            cell: sorted((bucket["value"], bucket["total"]) for bucket in agg if bucket["total"])
+            for cell, agg in zip(cells, months)
+        }
+        
+        units = []
+        
+        def add(cp: str, label: str, query: str, rows: int):
+            if rows > 0:
+                units.append(FetchUnit(source, cp, label, query, rows))
+        
+        for cp in self.codes_postaux:
+            rows = counts.get(cp, 0)
+            base = f"code_postal_ban:{cp}"
+            if rows <= limit:
+                add(cp, "", qs(cp, base), rows)
+                continue
+            
+            labels = by_label.get(cp, {})
+            for label, label_rows in sorted(labels.items()):
+                cell = f"etiquette_dpe:{label}"
+                if label_rows <= limit:
+                    add(cp, label, qs(cp, base, cell), label_rows)
+                    continue
+                
+                periods = group_months(by_month[(cp, label)], limit)
+                for start, end, period_rows in periods:
+                    add(cp, f"{label} {start}..{end}", qs(cp, base, cell, f"date_reception_dpe:[{start} TO {end}]"),
+                        period_rows)
+                if periods:
+                    outside = f"NOT date_reception_dpe:[{periods[0][0]} TO {periods[-1][1]}]"
+                    add(cp, f"{label} hors période", qs(cp, base, cell, outside),
+                        label_rows - sum(period[2] for period in periods))
+            
+            if labels:
+                add(cp, "autres étiquettes", qs(cp, base, f"NOT etiquette_dpe:({' OR '.join(sorted(labels))})"),
+                    rows - sum(labels.values()))
+        
+        return units, requests_count
+    
+    async def _aggregate_codes(self, client, semaphore: asyncio.Semaphore, api_url: str, field: str,
+                               window: Optional[str], codes: List[str], agg_size: str) -> Optional[list]:
+        """Agrégation restreinte à un lot de codes postaux partageant le filtre de période `window`"""
+        q_parts = [f"code_postal_ban:({' OR '.join(codes)})", window]
+        return await self._aaggregate(
+            client, semaphore, api_url, field, " AND ".join(part for part in q_parts if part), agg_size
+        )
+    
+    async def _aexecute_plan(self, client, semaphore: asyncio.Semaphore, plan: RefreshPlan,
+                             sources: List[str], progress_callback=None):
+        """
+        Récupérer les unités du plan en parallèle, les plus volumineuses d'abord
+        
+        progress_callback est appelé quand toutes les unités d'un code postal
+        sont terminées ; total = codes postaux du plan pour ce dataset.
+        """
+        remaining: Dict[Tuple[str, str], int] = {}
+        for unit in plan.units:
+            remaining[(unit.source, unit.code_postal)] = remaining.get((unit.source, unit.code_postal), 0) + 1
+        totals = {source: len(plan.codes_postaux(source)) for source in sources}
+        done = {source: 0 for source in sources}
+        
+        async def fetch_unit(unit: FetchUnit):
+            uid = unit_id(unit.source, unit.qs)
+            if not self.checkpoint.is_done(uid):
+                writer = self._unit_writer(unit.source, unit.code_postal, uid)
+                await self._afetch_unit(client, semaphore, unit, writer)
+                self.checkpoint.complete(uid, f"{unit.source} {unit.code_postal} {unit.label}".strip(),
+                                         writer.rows)
+            
+            key = (unit.source, unit.code_postal)
+            remaining[key] -= 1
+            if remaining[key] == 0:
+                done[unit.source] += 1
+                print(f"  ✓ {unit.code_postal} ({unit.source})")
+                if progress_callback:
+                    progress_callback(done[unit.source], totals[unit.source], unit.code_postal, unit.source)
+        
+        await self._gather_all([fetch_unit(unit) for unit in plan.by_size()])
+    
+    async def _afetch_unit(self, client, semaphore: asyncio.Semaphore, unit: FetchUnit,
+                           writer: UnitWriter):
+        """Récupérer une unité du plan dans `writer` : par curseur, sinon par pages (unité sous la fenêtre)"""
+        api_url, columns = self._dataset(unit.source)
+        params = {"size": self.PAGE_SIZE, "qs": unit.qs, "select": ",".join(columns)}
+        label = f"{unit.code_postal} {unit.label}".strip()
+        
+        rows = await self._afetch_cursor(
+            client, semaphore, api_url, {**params, "sort": self.CURSOR_SORT}, label, writer
+        )
+        if rows is not None:
+            return
+        
+        if unit.expected_rows > self.MAX_RESULT_WINDOW:
+            print(f"⚠️ {unit.source} {label}: {unit.expected_rows} lignes, seules "
+                  f"{self.MAX_RESULT_WINDOW} sont accessibles sans curseur")
+        params["page"] = 1
+        first_page = await self._aget_json(client, semaphore, api_url, params)
+        if first_page is not None:
+            await self._afetch_pages(client, semaphore, api_url, params, first_page, writer)
+    
+    async def _aget_json(self, client, semaphore: asyncio.Semaphore, api_url: str,
+                         params: dict) -> Optional[dict]:
+        """Requête GET sous la limite de concurrence (None si la réponse n'est pas réessayable)"""
+        async with semaphore:
+            return await self.transport.aget_json(client, api_url, params)
+    
+    async def _afetch_cursor(self, client, semaphore: asyncio.Semaphore, api_url: str,
+                             params: dict, label: str,
+                             writer: Optional[UnitWriter] = None) -> Optional[List[dict]]:
+        """
+        Version asynchrone de fetch_data_cursor pour une requête donnée
+        
+        params doit inclure le tri sur CURSOR_SORT ; les pages d'une même
+        requête sont lues en séquence (chaque lien `next` dépend de la précédente).
+        """
+        results = []
+        emit = writer or results.extend
+        next_url = writer.cursor if writer else None
+        if not next_url:
+            if not self.use_cursor or self._cursor_support.get(api_url) is False:
+                return None
+            
+            data = await self._aget_json(client, semaphore, api_url, params)
+            if not self._cursor_supported(api_url, data):
+                return None
+            
+            emit(data.get("results", []))
+            next_url = self._next_cursor(data)
+            self._save_cursor(writer, next_url)
+        
+        while next_url:
+            data = await self._aget_json(client, semaphore, next_url, None)
+            if data is None:
+                raise AdemeAPIError(f"Curseur refusé par {api_url} ({label})")
+            emit(data.get("results", []))
+            next_url = self._next_cursor(data)
+            self._save_cursor(writer, next_url)
+        
+        return results
+    
+    async def _afetch_pages(self, client, semaphore: asyncio.Semaphore, api_url: str,
+                            params: dict, first_page: dict, on_page=None) -> List[dict]:
+        """
+        Récupérer les pages suivant la première, en parallèle
+        
+        Le total annoncé par la première page donne le nombre de pages
+        (borné par la fenêtre maximale de l'API) ; une page en échec ou vide
+        termine la récupération comme en séquentiel. Avec on_page, chaque
+        page lui est transmise dans l'ordre dès que les précédentes l'ont été.
+        """
+        results = []
+        emit = on_page or results.extend
+        page_results = first_page.get("results", [])
+        emit(page_results)
+        if len(page_results) < self.PAGE_SIZE:
+            return results
+        
+        total = min(first_page.get("total", 0), self.MAX_RESULT_WINDOW)
+        tasks = [
+            asyncio.ensure_future(self._aget_json(client, semaphore, api_url, {**params, "page": page}))
+            for page in range(2, math.ceil(total / self.PAGE_SIZE) + 1)
+        ]
+        try:
+            for task in tasks:
+                data = await task
+                page_results = data.get("results", []) if data else []
+                if not page_results:
+                    break
+                emit(page_results)
+                if len(page_results) < self.PAGE_SIZE:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return results
+    
+    async def _afetch_data_smart(self, client, semaphore: asyncio.Semaphore, code_postal: str,
+                                 api_url: str, columns: List[str], etiquette: Optional[str] = None,
+                                 start_date: Optional[str] = None,
+                                 end_date: Optional[str] = None, on_page=None) -> List[dict]:
+        """Version asynchrone de fetch_data_smart (mêmes découpages, tranches en parallèle)"""
+        q_parts = [f"code_postal_ban:{code_postal}"]
+        if etiquette:
+            q_parts.append(f"etiquette_dpe:{etiquette}")
+        if start_date and end_date:
+            q_parts.append(f"date_reception_dpe:[{start_date} TO {end_date}]")
+        
+        params = {
+            "page": 1,
+            "size": self.PAGE_SIZE,
+            "qs": " AND ".join(q_parts),
+            "select": ",".join(columns),
+            "q_fields": "code_postal_ban,etiquette_dpe,date_reception_dpe"
+        }
+        
+        first_page = await self._aget_json(client, semaphore, api_url, params)
+        if first_page is None:
+            return []
+        
+        total = first_page.get("total", 0)
+        slices = []
+        
+        # Au-delà de la fenêtre de l'API : découper par étiquette, puis par année
+        if total > self.MAX_RESULT_WINDOW and etiquette is None:
+            slices = [(etiq, None, None) for etiq in ["A", "B", "C", "D", "E", "F", "G"]]
+        elif total > self.MAX_RESULT_WINDOW and start_date is None:
+            slices = [
+                (etiquette, f"{year}-01-01", f"{year}-12-31")
+                for year in range(2021, datetime.now().year + 1)
+            ]
+        
+        if slices:
+            parts = await asyncio.gather(*(
+                self._afetch_data_smart(client, semaphore, code_postal, api_url, columns, *s, on_page=on_page)
+                for s in slices
+            ))
+            return [row for part in parts for row in part]
+        
+        return await self._afetch_pages(client, semaphore, api_url, params, first_page, on_page)
+    
+    async def _afetch_new_records(self, client, semaphore: asyncio.Semaphore, code_postal: str,
+                                  api_url: str, columns: List[str],
+                                  start_date: Optional[str], end_date: Optional[str],
+                                  since: Optional[str] = None, on_page=None) -> List[dict]:
+        """Version asynchrone de fetch_new_records"""
+        params = {
+            "page": 1,
+            "size": self.PAGE_SIZE,
+            "qs": f"code_postal_ban:{code_postal} AND {self._window_filter(start_date, end_date, since)}",
+            "select": ",".join(columns),
+            "q_fields": "code_postal_ban,date_reception_dpe"
+        }
+        
+        first_page = await self._aget_json(client, semaphore, api_url, params)
+        if first_page is None:
+            return []
+        
+        return await self._afetch_pages(client, semaphore, api_url, params, first_page, on_page)
     
     def fetch_new_records(self, code_postal: str, api_url: str, columns: List[str],
-                         start_date: str, end_date: str) -> List[dict]:
-        """Récupérer uniquement les nouveaux enregistrements pour un code postal"""
+                         start_date: Optional[str], end_date: Optional[str],
+                         since: Optional[str] = None, on_page=None) -> List[dict]:
+        """Récupérer uniquement les nouveaux enregistrements (ou modifiés depuis `since`) pour un code postal"""
         results = []
+        emit = on_page or results.extend
         size = 1000
         page = 1
         
-        q_filter = f"code_postal_ban:{code_postal} AND date_reception_dpe:[{start_date} TO {end_date}]"
+        q_filter = f"code_postal_ban:{code_postal} AND {self._window_filter(start_date, end_date, since)}"
         
         while True:
             params = {
@@ -332,29 +1456,45 @@ class DataRefresher:
                 "q_fields": "code_postal_ban,date_reception_dpe"
             }
             
-            response = requests.get(api_url, params=params)
-            if response.status_code != 200:
+            data = self.transport.get_json(api_url, params)
+            if data is None:
                 break
             
-            page_results = response.json().get("results", [])
+            page_results = data.get("results", [])
             if not page_results:
                 break
             
-            results.extend(page_results)
+            emit(page_results)
             
             if len(page_results) < size:
                 break
             
             page += 1
-            time.sleep(0.5)
         
         return results
     
-    def harmonize_and_merge(self, df_existants: pd.DataFrame, 
-                           df_neufs: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _select_columns(frame, columns: List[str]) -> pd.DataFrame:
+        """
+        Colonnes `columns` présentes dans frame (DataFrame, ou dataset
+        pyarrow lu colonne par colonne : seules celles-ci sont chargées)
+        """
+        if isinstance(frame, pd.DataFrame):
+            return frame[[col for col in columns if col in frame.columns]].copy()
+        names = frame.schema.names
+        return frame.to_table(columns=[col for col in columns if col in names]).to_pandas()
+    
+    @staticmethod
+    def _count_rows(frame) -> int:
+        return len(frame) if isinstance(frame, pd.DataFrame) else frame.count_rows()
+    
+    def harmonize_and_merge(self, df_existants, df_neufs) -> pd.DataFrame:
         """
         Harmoniser et fusionner les deux datasets
         Ne garde que les colonnes communes
+        
+        df_existants et df_neufs : DataFrames, ou datasets pyarrow de
+        fetch_pages (seules les colonnes communes sont lues depuis les pages)
         """
         print("\n" + "="*60)
         print("🔗 HARMONISATION ET FUSION")
@@ -364,13 +1504,9 @@ class DataRefresher:
         common_cols = list(self.common_columns)
         
         # Filtrer pour ne garder que les colonnes communes
-        df_existants_filtered = df_existants[
-            [col for col in common_cols if col in df_existants.columns]
-        ].copy()
+        df_existants_filtered = self._select_columns(df_existants, common_cols)
         
-        df_neufs_filtered = df_neufs[
-            [col for col in common_cols if col in df_neufs.columns]
-        ].copy()
+        df_neufs_filtered = self._select_columns(df_neufs, common_cols)
         
         # Ajouter une colonne pour identifier la source
         df_existants_filtered['source_dpe'] = 'existant'
@@ -393,107 +1529,230 @@ class DataRefresher:
         
         return df_merged
     
-    def refresh_all_data(self, progress_callback=None) -> Tuple[pd.DataFrame, dict]:
+    def harmonize_partitions(self) -> Iterator[pd.DataFrame]:
+        """
+        Harmoniser et fusionner les pages récupérées, un code postal à la fois
+        Rechargement complet : équivalent de harmonize_and_merge, sans jamais
+        charger tout le jeu de données
+        
+        Pour chaque code postal du point de reprise, les pages des DPE
+        existants puis neufs sont lues lot par lot (colonnes communes
+        seulement), source_dpe est ajoutée à chaque lot et les doublons
+        numero_dpe sont supprimés dans le code postal (la dernière version
+        l'emporte). Un DataFrame est produit par code postal.
+        """
+        print("\n" + "="*60)
+        print("🔗 HARMONISATION ET FUSION (par code postal)")
+        print("="*60)
+        
+        pages = self.checkpoint.pages
+        sources = {"existants": "existant", "neufs": "neuf"}
+        columns = [col for col in self.COLUMNS_EXISTANTS if col in self.common_columns] + ['source_dpe']
+        codes = sorted(set().union(*(pages.codes(source) for source in sources)))
+        total, duplicates_removed = 0, 0
+        
+        for cp in codes:
+            chunks = []
+            for source, label in sources.items():
+                dataset = pages.dataset(source, cp)
+                names = [col for col in columns if col in dataset.schema.names]
+                for batch in dataset.to_batches(columns=names):
+                    chunk = batch.to_pandas()
+                    chunk['source_dpe'] = label
+                    chunks.append(chunk)
+            if not chunks:
+                continue
+            
+            df = pd.concat(chunks, ignore_index=True).reindex(columns=columns)
+            initial_count = len(df)
+            df = df.drop_duplicates(subset=['numero_dpe'], keep='last')
+            duplicates_removed += initial_count - len(df)
+            total += len(df)
+            yield df
+        
+        print(f"  ✅ Dataset fusionné: {total} lignes, {len(columns)} colonnes, {len(codes)} codes postaux")
+        print(f"  🔄 Doublons supprimés: {duplicates_removed}")
+    
+    def checkpoint_status(self) -> dict:
+        """État du point de reprise (status: none, running, fetched)"""
+        return self.checkpoint.status()
+    
+    def _run_stats(self, started: float) -> dict:
+        """Durées et compteurs HTTP d'un rafraîchissement commencé à `started`"""
+        return {
+            'fetch_seconds': round(self.last_fetch_seconds, 1),
+            'duration_seconds': round(time.perf_counter() - started, 1),
+            'requests': self.last_fetch_stats['requests'],
+            'retries': self.last_fetch_stats['retries'],
+            'throttled': self.last_fetch_stats['throttled']
+        }
+    
+    def refresh_all_data(self, progress_callback=None, backup: bool = True) -> dict:
         """
-        Rafraîchir TOUTES les données (existants + neufs)
+        Rafraîchir TOUTES les données (existants + neufs) et remplacer le jeu partitionné
         Mode complet
+        
+        Les pages récupérées sont fusionnées code postal par code postal
+        (harmonize_partitions) et écrites au fur et à mesure dans une
+        nouvelle génération (save_refreshed_data) : la mémoire reste bornée
+        par le plus gros code postal.
+        
+        Returns:
+            Statistiques ; total_count est le nombre de DPE enregistrés
         """
         print("\n" + "🚀"*30)
         print("  RAFRAÎCHISSEMENT COMPLET DES DONNÉES")
         print("🚀"*30 + "\n")
         
-        # Récupérer DPE existants
-        df_existants = self.fetch_dpe_existants(progress_callback=progress_callback)
+        started = time.perf_counter()
         
-        # Récupérer DPE neufs
-        df_neufs = self.fetch_dpe_neufs(progress_callback=progress_callback)
+        # Récupérer DPE existants et neufs (en parallèle si possible)
+        frames = self.fetch_pages(["existants", "neufs"], progress_callback=progress_callback)
+        existants_count, neufs_count = self._count_rows(frames["existants"]), self._count_rows(frames["neufs"])
         
-        # Fusionner
-        df_merged = self.harmonize_and_merge(df_existants, df_neufs)
+        # Tout est récupéré : filigranes au jour du début de la récupération
+        self._pending_watermarks = self._advance_watermarks(frames, {
+            source: {cp: self.last_fetch_started_on for cp in self.codes_postaux} for source in frames
+        })
+        
+        # Fusionner et enregistrer (efface le point de reprise)
+        result = self.save_refreshed_data(self.harmonize_partitions(), backup=backup)
         
         # Statistiques
         stats = {
-            'existants_count': len(df_existants),
-            'neufs_count': len(df_neufs),
-            'total_count': len(df_merged),
-            'common_columns': len(self.common_columns)
+            'existants_count': existants_count,
+            'neufs_count': neufs_count,
+            'total_count': result['rows'],
+            'common_columns': len(self.common_columns),
+            **self._run_stats(started)
         }
         
-        return df_merged, stats
+        print(f"⏱️ Rafraîchissement complet: {stats['duration_seconds']} s")
+        return stats
     
     def refresh_new_data(self, progress_callback=None) -> Tuple[pd.DataFrame, dict]:
         """
-        Rafraîchir uniquement les NOUVELLES données depuis la dernière mise à jour
+        Rafraîchir uniquement les DPE nouveaux ou modifiés depuis la dernière mise à jour
         Mode incrémental
+        
+        Chaque (dataset, code postal) repart de son filigrane (date de dernière
+        modification déjà intégrée) : les DPE rectifiés ou réédités sont
+        récupérés avec les nouveaux, puis remplacent l'ancienne version
+        (upsert_new_data, sur numero_dpe). Les filigranes n'avancent
+        qu'à l'enregistrement des données (upsert_new_data) : une
+        récupération interrompue ne fait avancer aucun code postal.
         """
         print("\n" + "🔄"*30)
         print("  RAFRAÎCHISSEMENT INCRÉMENTAL")
         print("🔄"*30 + "\n")
         
+        started = time.perf_counter()
+        sources = ["existants", "neufs"]
         last_update = self.get_last_update_date()
         
+        # Codes postaux sans filigrane : depuis la dernière mise à jour globale
+        # (métadonnées antérieures aux filigranes), sinon les 3 derniers mois
         if last_update:
-            start_date = (datetime.fromisoformat(last_update) + timedelta(days=1)).strftime("%Y-%m-%d")
+            start_date = datetime.fromisoformat(last_update).strftime("%Y-%m-%d")
         else:
-            # Si première fois, récupérer les 3 derniers mois
             start_date = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
         
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        
-        print(f"📅 Période: {start_date} → {end_date}")
-        
-        # Récupérer nouveaux DPE existants
-        df_existants = self.fetch_dpe_existants(start_date, end_date, progress_callback)
+        watermarks = self.get_watermarks()
+        since = {
+            source: {cp: watermarks.get(source, {}).get(cp, start_date) for cp in self.codes_postaux}
+            for source in sources
+        }
+        oldest = min((date for codes in since.values() for date in codes.values()), default=start_date)
+        print(f"📅 DPE modifiés depuis le filigrane de chaque code postal (le plus ancien: {oldest})")
         
-        # Récupérer nouveaux DPE neufs
-        df_neufs = self.fetch_dpe_neufs(start_date, end_date, progress_callback)
+        # Récupérer DPE existants et neufs nouveaux ou modifiés (en parallèle si possible)
+        frames = self.fetch_pages(sources, progress_callback=progress_callback, since=since)
+        df_existants, df_neufs = frames["existants"], frames["neufs"]
+        existants_count, neufs_count = self._count_rows(df_existants), self._count_rows(df_neufs)
+        self._pending_watermarks = self._advance_watermarks(frames, since)
         
         # Fusionner
-        if len(df_existants) == 0 and len(df_neufs) == 0:
+        if existants_count == 0 and neufs_count == 0:
             print("\n✅ Aucun nouveau DPE trouvé")
+            # Rien à enregistrer : les filigranes des nouveaux codes postaux le sont tout de suite
+            self._commit_watermarks()
+            self.checkpoint.clear()
             return pd.DataFrame(), {
                 'existants_count': 0,
                 'neufs_count': 0,
-                'total_count': 0
+                'total_count': 0,
+                **self._run_stats(started)
             }
         
         df_merged = self.harmonize_and_merge(df_existants, df_neufs)
         
         # Statistiques
         stats = {
-            'existants_count': len(df_existants),
-            'neufs_count': len(df_neufs),
+            'existants_count': existants_count,
+            'neufs_count': neufs_count,
             'total_count': len(df_merged),
-            'period': f"{start_date} to {end_date}"
+            'period': f"modifiés depuis {oldest}",
+            **self._run_stats(started)
         }
         
+        print(f"⏱️ Rafraîchissement incrémental: {stats['duration_seconds']} s")
         return df_merged, stats
     
-    def merge_with_existing(self, new_df: pd.DataFrame) -> pd.DataFrame:
-        """Fusionner les nouvelles données avec les données existantes"""
-        if not os.path.exists(self.DATA_FILE):
-            return new_df
+    def dataset_store(self) -> DpeStore:
+        """Jeu de données partitionné par code postal associé à DATA_FILE"""
+        return DpeStore(store_dir(self.DATA_FILE))
+    
+    def upsert_new_data(self, new_df: pd.DataFrame, backup: bool = True) -> dict:
+        """
+        Enregistrer un rafraîchissement incrémental par upsert sur numero_dpe
         
-        existing_df = pd.read_csv(self.DATA_FILE)
+        Seules les entrées d'index des DPE reçus sont lues et seules leurs
+        partitions (codes postaux) reçoivent un fichier delta ; le CSV
+        historique (DATA_FILE) est importé une fois, au premier upsert.
+        La génération remplacée reste une sauvegarde si `backup`.
         
-        # Concaténer et supprimer les doublons basés sur numero_dpe
-        if 'numero_dpe' in new_df.columns and 'numero_dpe' in existing_df.columns:
-            merged_df = pd.concat([existing_df, new_df], ignore_index=True)
-            merged_df = merged_df.drop_duplicates(subset=['numero_dpe'], keep='last')
-        else:
-            merged_df = pd.concat([existing_df, new_df], ignore_index=True)
+        Returns:
+            {"added", "updated", "partitions", "total"}
+        """
+        store = self.dataset_store()
+        if not store.exists() and os.path.exists(self.DATA_FILE):
+            print(f"📦 Import de {self.DATA_FILE} dans le jeu partitionné {store.directory}")
+            store.import_csv(self.DATA_FILE)
         
-        return merged_df
+        result = store.upsert(new_df, backup=backup)
+        print(f"🔁 Upsert: {result['added']} DPE ajoutés, {result['updated']} DPE mis à jour "
+              f"({result['partitions']} partitions, {result['total']} DPE au total)")
+        
+        # Données enregistrées : les filigranes peuvent avancer et le point de
+        # reprise n'a plus lieu d'être
+        self._commit_watermarks()
+        self.checkpoint.clear()
+        return result
     
-    def save_refreshed_data(self, df: pd.DataFrame, backup: bool = True):
-        """Sauvegarder les données rafraîchies"""
-        os.makedirs(os.path.dirname(self.DATA_FILE), exist_ok=True)
+    def save_refreshed_data(self, frames, backup: bool = True) -> dict:
+        """
+        Sauvegarder les données rafraîchies (remplace tout le jeu partitionné)
+        
+        frames : un DataFrame, ou des DataFrames successifs écrits au fil de
+        l'itération (harmonize_partitions). Les données sont écrites dans
+        une nouvelle génération, publiée atomiquement : les lecteurs voient
+        l'ancien jeu jusqu'à la fin de l'écriture. La génération remplacée
+        reste une sauvegarde si `backup` (rétention : DPE_BACKUP_KEEP,
+        DPE_BACKUP_MAX_AGE_DAYS).
+        
+        Returns:
+            {"rows", "partitions"}
+        """
+        store = self.dataset_store()
+        result = store.replace(frames, backup=backup)
+        print(f"✅ Données sauvegardées: {store.directory}")
         
-        # Créer une sauvegarde si demandé
-        if backup and os.path.exists(self.DATA_FILE):
-            backup_file = f"{self.DATA_FILE}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            os.rename(self.DATA_FILE, backup_file)
-            print(f"💾 Sauvegarde créée: {backup_file}")
+        backups = store.backups()
+        if backup and backups:
+            print(f"💾 Sauvegarde conservée: {backups[0]['name']} ({len(backups)} au total)")
         
-        df.to_csv(self.DATA_FILE, index=False, encoding='utf-8')
-        print(f"✅ Données sauvegardées: {self.DATA_FILE}")
\ No newline at end of file
+        # Données enregistrées : les filigranes peuvent avancer et le point de
+        # reprise n'a plus lieu d'être
+        self._commit_watermarks()
+        self.checkpoint.clear()
+        return result
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Schéma du jeu de données DPE
+
+Type de chaque colonne, appliqué avant toute écriture Parquet (et à la
+lecture des anciens fichiers CSV) :
+- texte : identifiants et adresses, quasi uniques (str)
+- category : modalités répétées (étiquettes, types, codes...), stockées en
+  dictionnaire dans Parquet et relues en pandas Categorical
+- date : colonnes date_* (datetime64)
+- float32 : mesures (consommations, coûts, surfaces...) ; les modèles
+  arborescents travaillent de toute façon en float32
+- float64 : coordonnées et compteurs de l'API (_i, _rand), trop grands
+  pour float32
+
+Une colonne inconnue (colonnes dérivées du jeu nettoyé) est typée d'après
+ses valeurs : float64 si numérique, category sinon.
+"""
+
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+KEY = "numero_dpe"
+
+TEXT_COLUMNS = {
+    KEY, "adresse_ban", "adresse_brut", "nom_rue_ban", "complement_adresse_logement",
+    "identifiant_ban", "_geopoint",
+}
+FLOAT64_COLUMNS = {"coordonnee_cartographique_x_ban", "coordonnee_cartographique_y_ban", "_i", "_rand"}
+FLOAT32_PREFIXES = (
+    "conso_", "cout_", "emission_", "deperditions_", "besoin_", "apport_", "surface_", "production_",
+    "ubat_", "hauteur_", "volume_", "score_", "nombre_", "annee_", "numero_etage",
+)
+CATEGORY_PREFIXES = (
+    "code_", "type_", "etiquette_", "qualite_", "description_", "configuration_", "categorie_",
+    "classe_", "modele_", "version_", "methode_", "statut_", "nom_commune_", "source_",
+    "ventilation_", "appartement_", "numero_voie_",
+)
+DATE_PREFIX = "date_"
+
+
+def column_type(column: str, values: Optional[pd.Series] = None) -> str:
+    """Type d'une colonne : text, category, date, float32 ou float64"""
+    if column in TEXT_COLUMNS:
+        return "text"
+    if column in FLOAT64_COLUMNS:
+        return "float64"
+    if column.startswith(DATE_PREFIX):
+        return "date"
+    if column.startswith(FLOAT32_PREFIXES):
+        return "float32"
+    if column.startswith(CATEGORY_PREFIXES):
+        return "category"
+    # Colonne inconnue : d'après ses valeurs
+    if values is not None and pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return "float64"
+    if values is not None and pd.api.types.is_datetime64_any_dtype(values):
+        return "date"
+    return "category"
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """Valeurs en chaînes, valeurs manquantes conservées (69001.0 -> "69001")"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    if pd.api.types.is_float_dtype(values):
+        present = values.dropna()
+        if (present % 1 == 0).all():
+            values = values.astype("Int64")
+    elif pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        return values
+    return values.astype(str).where(values.notna())
+
+
+def cast_column(values: pd.Series, kind: str) -> pd.Series:
+    """Convertir une colonne vers son type ; valeurs non convertibles -> manquantes"""
+    if kind in ("float32", "float64"):
+        return pd.to_numeric(values, errors="coerce").astype(kind)
+    if kind == "date":
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+        # Dates ADEME : AAAA-MM-JJ, parfois suivies d'une heure
+        return pd.to_datetime(_as_text(values).str[:10], format="%Y-%m-%d", errors="coerce")
+    if kind == "category":
+        if isinstance(values.dtype, pd.CategoricalDtype) and \
+                pd.api.types.infer_dtype(values.cat.categories, skipna=True) in ("string", "empty"):
+            return values
+        return _as_text(values).astype("category")
+    return _as_text(values).astype(object)
+
+
+def column_types(df: pd.DataFrame) -> Dict[str, str]:
+    return {column: column_type(column, df[column]) for column in df.columns}
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes converties vers leur type (copie)"""
+    return pd.DataFrame(
+        {column: cast_column(df[column], kind) for column, kind in column_types(df).items()},
+        index=df.index
+    )
+
+
+def date_columns(columns: List[str]) -> List[str]:
+    return [column for column in columns if column_type(column) == "date"]
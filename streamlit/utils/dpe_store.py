@@ -0,0 +1,1118 @@
+"""
+Jeu de données DPE partitionné par code postal, indexé par numero_dpe
+
+Le jeu de données (un CSV réécrit en entier à chaque rafraîchissement) est
+rangé en partitions, une par code postal :
+code_postal=<cp>/base-<n>.parquet puis delta-<n>.parquet, typés selon
+utils.dpe_schema et compressés (zstd). Un index SQLite (index.db) associe
+chaque numero_dpe au fichier qui porte sa version courante. Un upsert ne lit que les entrées d'index des DPE reçus et écrit un
+fichier delta par partition concernée : son coût suit la taille du delta,
+pas celle du jeu de données.
+
+À la lecture, une ligne n'est retenue que si l'index désigne son fichier :
+les versions remplacées (rectification, changement de code postal)
+disparaissent sans dédoublonnage global. load() ne lit que les colonnes
+et les partitions demandées (filtre sur code_postal_ban). Base et deltas ne sont jamais
+réécrits ; quand une partition dépasse DPE_COMPACT_MAX_DELTAS deltas ou
+DPE_COMPACT_MAX_STALE lignes remplacées, un compactage en arrière-plan la
+réécrit en une nouvelle base, publiée comme n'importe quelle écriture.
+
+Chaque écriture produit une génération <répertoire>/gen-<n>/ (partitions,
+index et generation.json), jamais modifiée une fois publiée. Un upsert
+produit une couche : son index ne contient que les DPE reçus, son
+répertoire que ses deltas, et elle désigne la génération dont elle reprend
+l'état (parent). À la lecture, la version de la couche la plus récente
+l'emporte. Rechargement complet et compactage produisent une génération
+complète (index entier, fichiers liés en dur) ; au-delà de
+DPE_COMPACT_MAX_LAYERS couches, le compactage replie la chaîne en une
+génération complète. Le fichier CURRENT désigne la génération lue ; il est
+remplacé atomiquement (fichier temporaire, fsync, rename) une fois la
+génération entièrement écrite. Un lecteur voit donc l'ancien ou le nouvel
+état, jamais un état partiel, et une écriture interrompue ne laisse qu'une
+génération non publiée, supprimée à l'écriture suivante.
+
+Les générations remplacées servent de sauvegardes : seuls les fichiers
+propres à chacune occupent de la place. Au-delà de DPE_BACKUP_KEEP
+sauvegardes ou de DPE_BACKUP_MAX_AGE_DAYS jours, elles sont supprimées,
+sauf si une génération conservée en reprend l'état ; la génération
+précédente est toujours conservée (lectures en cours).
+"""
+
+import glob
+import hashlib
+import json
+import operator
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import pandas as pd
+
+from utils.dpe_schema import KEY, apply_schema, cast_column
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # partitions en CSV (non typées à l'écriture)
+    pa = pc = pq = None
+
+try:
+    import fcntl
+except ImportError:  # Windows : exclusion limitée au processus courant
+    fcntl = None
+
+PARTITION_COLUMN = "code_postal_ban"
+UNKNOWN_PARTITION = "inconnu"
+
+FILE_EXTENSION = ".parquet" if pq is not None else ".csv"
+COMPRESSION = "zstd"
+
+# Filtres de load() : (colonne, opérateur, valeur)
+Filters = List[Tuple[str, str, Any]]
+COMPARISONS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt,
+    "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+OPERATORS = (*COMPARISONS, "in", "not in")
+
+# Rétention des sauvegardes (générations remplacées)
+BACKUP_KEEP = int(os.getenv("DPE_BACKUP_KEEP", "5"))
+BACKUP_MAX_AGE_DAYS = float(os.getenv("DPE_BACKUP_MAX_AGE_DAYS", "30"))
+
+# Seuils de compactage d'une partition : deltas, part de lignes remplacées
+COMPACT_MAX_DELTAS = int(os.getenv("DPE_COMPACT_MAX_DELTAS", "8"))
+COMPACT_MAX_STALE = float(os.getenv("DPE_COMPACT_MAX_STALE", "0.5"))
+# Couches d'upsert au-delà desquelles le compactage replie la chaîne en une génération complète
+COMPACT_MAX_LAYERS = int(os.getenv("DPE_COMPACT_MAX_LAYERS", "8"))
+# 0 : compactage pendant l'upsert (scripts, tests)
+COMPACT_BACKGROUND = os.getenv("DPE_COMPACT_BACKGROUND", "1") != "0"
+
+# Compactages en cours dans le processus, par répertoire
+_compactions: Dict[str, threading.Thread] = {}
+_compactions_lock = threading.Lock()
+
+
+def store_dir(data_file: str) -> str:
+    """Répertoire du jeu partitionné associé à un fichier de données (CSV historique)"""
+    return f"{os.path.splitext(data_file)[0]}_store"
+
+
+def partition_name(value: Any) -> str:
+    """Partition d'un code postal (69001, 69001.0 ou "69001" -> "69001")"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return UNKNOWN_PARTITION
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() or UNKNOWN_PARTITION
+
+
+def _filter_partitions(partitions: List[str], filters: Optional[Filters]) -> List[str]:
+    """Partitions pouvant contenir des lignes retenues par les filtres sur code_postal_ban"""
+    for column, op, value in filters or []:
+        if column == PARTITION_COLUMN and op in ("==", "in"):
+            wanted = {partition_name(v) for v in (value if op == "in" else [value])}
+            partitions = [partition for partition in partitions if partition in wanted]
+    return partitions
+
+
+def _filter_value(values: pd.Series, value: Any) -> Any:
+    """Valeur de filtre au type de la colonne (69001 -> "69001" pour un code, date -> Timestamp)"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.Timestamp(value)
+    if pd.api.types.is_numeric_dtype(values):
+        return value
+    return partition_name(value) if value is not None else value
+
+
+def filter_mask(df: pd.DataFrame, filters: Filters) -> pd.Series:
+    """Lignes retenues par tous les filtres ; une valeur manquante (ou une colonne absente) n'est jamais retenue"""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if op not in OPERATORS:
+            raise ValueError(f"Opérateur de filtre inconnu: {op}")
+        if column not in df.columns:
+            return pd.Series(False, index=df.index)
+        values = df[column]
+        if op in ("in", "not in"):
+            kept = values.isin([_filter_value(values, v) for v in value])
+            mask &= (kept if op == "in" else ~kept) & values.notna()
+            continue
+
+        value = _filter_value(values, value)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        present = values.notna()
+        result = pd.Series(False, index=df.index)
+        result[present] = COMPARISONS[op](values[present], value)
+        mask &= result
+    return mask
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concaténer en gardant les colonnes category (catégories réunies, sans repasser par object)"""
+    frames = [frame for frame in frames if len(frame.columns)]
+    if not frames:
+        return pd.DataFrame()
+    categorical = {
+        column for frame in frames for column, dtype in frame.dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    for column in categorical:
+        # Colonne typée différemment selon les fichiers : valeurs en texte, comme les catégories
+        for i, frame in enumerate(frames):
+            if column in frame.columns and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+                frames[i] = frame.assign(**{column: cast_column(frame[column], "category")})
+        categories = pd.Index([])
+        for frame in frames:
+            if column in frame.columns:
+                categories = categories.append(frame[column].cat.categories)
+        categories = categories.unique()
+        for i, frame in enumerate(frames):
+            if column in frame.columns:
+                frames[i] = frame.assign(**{column: frame[column].cat.set_categories(categories)})
+    df = pd.concat(frames, ignore_index=True)
+    for column in categorical:
+        df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def _fsync_dir(path: str):
+    """Rendre durables les créations et renommages d'un répertoire (sans effet sous Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_text_atomic(path: str, content: str):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+def _link(source: str, target: str):
+    """Lien en dur (copie si le système de fichiers n'en permet pas)"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class Generation:
+    """
+    Une génération : partitions (base + deltas) et index numero_dpe -> (partition, fichier)
+
+    Génération complète (rechargement, compactage) ou couche d'upsert :
+    l'index et les fichiers d'une couche ne portent que ses propres DPE, le
+    reste est lu dans ses parents (voir chain).
+    """
+
+    # Nombre maximal de paramètres par requête SQLite (limite par défaut : 999)
+    SQL_BATCH = 500
+
+    INFO_FILE = "generation.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.name = os.path.basename(directory)
+        self.index_path = os.path.join(directory, "index.db")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS locations ("
+            "numero_dpe TEXT PRIMARY KEY, partition TEXT NOT NULL, file TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS locations_file ON locations (partition, file)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Lignes écrites par fichier (versions courantes ou remplacées)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "partition TEXT NOT NULL, file TEXT NOT NULL, rows INTEGER NOT NULL, PRIMARY KEY (partition, file))"
+        )
+        return conn
+
+    @contextmanager
+    def _transaction(self, create: bool = False) -> Iterator[sqlite3.Connection]:
+        """Connexion à l'index, validée à la sortie du bloc (annulée sur exception) puis fermée"""
+        if not create and not self.exists():
+            # Génération supprimée entre-temps : ne pas recréer une base vide à sa place
+            raise FileNotFoundError(self.index_path)
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _next_sequence(conn: sqlite3.Connection) -> int:
+        """Numéro du prochain fichier écrit (croissant, toutes partitions confondues)"""
+        row = conn.execute("SELECT value FROM meta WHERE key = 'sequence'").fetchone()
+        sequence = int(row[0]) + 1 if row else 1
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sequence', ?)", (str(sequence),))
+        return sequence
+
+    def parent(self) -> Optional["Generation"]:
+        """Génération dont cette couche reprend l'état (None pour une génération complète)"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'parent'").fetchone()
+        return Generation(os.path.join(os.path.dirname(self.directory), row[0])) if row else None
+
+    def chain(self) -> List["Generation"]:
+        """Cette génération puis ses parents, jusqu'à une génération complète"""
+        chain = [self]
+        parent = self.parent()
+        while parent is not None:
+            chain.append(parent)
+            parent = parent.parent()
+        return chain
+
+    def depth(self) -> int:
+        """Nombre de couches au-dessus de la génération complète"""
+        return len(self.chain()) - 1
+
+    def version(self) -> str:
+        """État : date du dernier rechargement complet et numéro du dernier fichier écrit"""
+        with self._transaction() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        return f"{meta.get('created_at', '')}#{meta.get('sequence', 0)}"
+
+    def info(self) -> Dict[str, Any]:
+        """Contenu de generation.json (date, type d'écriture, sauvegarde ou non)"""
+        try:
+            with open(os.path.join(self.directory, self.INFO_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_info(self, info: Dict[str, Any]):
+        _write_text_atomic(os.path.join(self.directory, self.INFO_FILE), json.dumps(info, indent=2))
+
+    def count(self) -> int:
+        """Nombre de DPE (versions courantes)"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'rows'").fetchone()
+            if row:  # couche : nombre tenu à jour à chaque écriture
+                return int(row[0])
+            return conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+
+    def _partition_dir(self, partition: str) -> str:
+        return os.path.join(self.directory, f"code_postal={partition}")
+
+    def _own_partitions(self) -> List[str]:
+        """Partitions ayant des fichiers dans cette génération (pour une couche, celles qu'elle a modifiées)"""
+        return sorted(
+            os.path.basename(path).split("=", 1)[1]
+            for path in glob.glob(os.path.join(self.directory, "code_postal=*"))
+        )
+
+    def partitions(self) -> List[str]:
+        """Partitions du jeu de données, toutes couches confondues"""
+        return sorted({partition for layer in self.chain() for partition in layer._own_partitions()})
+
+    def legacy_partitions(self) -> List[str]:
+        """Partitions ayant des fichiers dans un autre format que FILE_EXTENSION (CSV des versions précédentes)"""
+        legacy = {
+            partition for layer in self.chain() for partition in layer._own_partitions()
+            if any(not name.endswith(FILE_EXTENSION) for name in layer._files(partition))
+        }
+        return sorted(legacy)
+
+    def _files(self, partition: str) -> List[str]:
+        """Fichiers d'une partition propres à cette génération (Parquet, ou CSV des générations antérieures) : base puis deltas"""
+        paths = glob.glob(os.path.join(self._partition_dir(partition), "*"))
+        return sorted(os.path.basename(path) for path in paths if path.endswith((".parquet", ".csv")))
+
+    @staticmethod
+    def _file_name(kind: str, sequence: int) -> str:
+        """
+        Nom d'un nouveau fichier : type, numéro (ordre de lecture) et suffixe
+        aléatoire. Le numéro repart de 1 à chaque rechargement complet et
+        suit la génération restaurée : sans le suffixe, un même nom pourrait
+        désigner des contenus différents d'une génération à l'autre (et
+        un compactage remplacer des fichiers qu'il n'a pas lus).
+        """
+        return f"{kind}-{sequence:06d}-{uuid.uuid4().hex[:8]}{FILE_EXTENSION}"
+
+    @staticmethod
+    def _file_number(name: str) -> int:
+        """Numéro d'un fichier (base-000003-<suffixe>.parquet ou base-000003.csv -> 3)"""
+        return int(name.split("-")[1].split(".")[0])
+
+    def _write_partitions(self, conn: sqlite3.Connection, name: str, df: pd.DataFrame, partitions: pd.Series):
+        """Écrire un fichier `name` par partition présente dans `df` et l'inscrire dans files"""
+        for partition, rows in df.groupby(partitions, sort=True):
+            self._write(partition, name, rows)
+            conn.execute("INSERT OR REPLACE INTO files (partition, file, rows) VALUES (?, ?, ?)",
+                         (partition, name, len(rows)))
+
+    def _write(self, partition: str, name: str, df: pd.DataFrame):
+        """Écrire un fichier de partition ; il n'apparaît qu'une fois complet et sur disque"""
+        directory = self._partition_dir(partition)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        if name.endswith(".parquet"):
+            with open(f"{path}.tmp", "wb") as f:
+                df.to_parquet(f, index=False, compression=COMPRESSION)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with open(f"{path}.tmp", "w", encoding="utf-8", newline="") as f:
+                df.to_csv(f, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def layer_on(self, parent: "Generation"):
+        """
+        Devenir une couche au-dessus de `parent` (génération vide) : seules
+        les métadonnées sont reprises, sans copie d'index ni de fichiers
+        """
+        rows = parent.count()
+        with parent._transaction() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        meta.update(parent=parent.name, rows=str(rows))
+        with self._transaction(create=True) as conn:
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items())
+
+    def _link_files(self, source: "Generation"):
+        """Lier en dur (fichiers immuables) les fichiers propres à `source`"""
+        for partition in source._own_partitions():
+            os.makedirs(self._partition_dir(partition), exist_ok=True)
+            for name in source._files(partition):
+                _link(os.path.join(source._partition_dir(partition), name),
+                      os.path.join(self._partition_dir(partition), name))
+
+    def fold(self, source: "Generation"):
+        """
+        Reprendre l'état complet de `source` dans cette génération (vide),
+        qui devient complète : index de la génération complète de la chaîne
+        copié, couches appliquées de la plus ancienne à la plus récente,
+        fichiers sans version courante écartés
+        """
+        chain = source.chain()
+        source_conn = sqlite3.connect(chain[-1].index_path, timeout=30)
+        conn = sqlite3.connect(self.index_path)
+        try:
+            source_conn.backup(conn)
+            conn.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            conn.close()
+            source_conn.close()
+        self._link_files(chain[-1])
+        for layer in reversed(chain[:-1]):
+            self.merge(layer)
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM meta WHERE key IN ('parent', 'rows')")
+            dead = conn.execute(
+                "SELECT partition, file FROM files WHERE NOT EXISTS ("
+                "SELECT 1 FROM locations WHERE locations.partition = files.partition AND locations.file = files.file)"
+            ).fetchall()
+            conn.executemany("DELETE FROM files WHERE partition = ? AND file = ?", dead)
+        for partition, name in dead:
+            os.remove(os.path.join(self._partition_dir(partition), name))
+
+    def merge(self, layer: "Generation"):
+        """Appliquer une couche à cette génération complète : entrées d'index, fichiers (liés en dur), métadonnées"""
+        with layer._transaction() as source:
+            locations = source.execute("SELECT numero_dpe, partition, file FROM locations").fetchall()
+            files = source.execute("SELECT partition, file, rows FROM files").fetchall()
+            meta = [(key, value) for key, value in source.execute("SELECT key, value FROM meta")
+                    if key not in ("parent", "rows")]
+        self._link_files(layer)
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO locations (numero_dpe, partition, file) VALUES (?, ?, ?)", locations)
+            conn.executemany("INSERT OR REPLACE INTO files (partition, file, rows) VALUES (?, ?, ?)", files)
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta)
+
+    def sync(self):
+        """fsync des répertoires de la génération (liens, fichiers renommés) avant publication"""
+        for partition in self._own_partitions():
+            _fsync_dir(self._partition_dir(partition))
+        _fsync_dir(self.directory)
+
+    @staticmethod
+    def _keyed(df: pd.DataFrame) -> pd.DataFrame:
+        """Lignes ayant un numero_dpe, dernière version de chaque DPE seulement"""
+        keyed = df[df[KEY].notna()]
+        if len(keyed) < len(df):
+            print(f"⚠️ {len(df) - len(keyed)} DPE sans numero_dpe ignorés")
+        keyed = keyed.assign(**{KEY: keyed[KEY].astype(str)})
+        return keyed.drop_duplicates(subset=[KEY], keep="last")
+
+    def _locate(self, conn: sqlite3.Connection, keys: List[str]) -> Dict[str, tuple]:
+        """Emplacement (partition, fichier) actuel des DPE déjà présents parmi `keys`"""
+        found = {}
+        for i in range(0, len(keys), self.SQL_BATCH):
+            batch = keys[i:i + self.SQL_BATCH]
+            rows = conn.execute(
+                f"SELECT numero_dpe, partition, file FROM locations WHERE numero_dpe IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall()
+            found.update({key: (partition, file) for key, partition, file in rows})
+        return found
+
+    def _locate_chain(self, keys: List[str]) -> Dict[str, tuple]:
+        """Emplacement courant des DPE déjà présents parmi `keys`, couche la plus récente d'abord"""
+        found = {}
+        for layer in (self.chain() if self.exists() else []):
+            remaining = [key for key in keys if key not in found]
+            if not remaining:
+                break
+            with layer._transaction() as conn:
+                found.update(layer._locate(conn, remaining))
+        return found
+
+    def replace(self, frames: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> Dict[str, int]:
+        """
+        Écrire tout le jeu de données (génération vide) : une base par partition
+
+        frames : un DataFrame, ou des DataFrames successifs (par exemple un
+        par code postal) écrits au fil de l'itération, chacun dans sa propre
+        base : un seul morceau est en mémoire à la fois. Un DPE présent
+        dans plusieurs morceaux garde la version du dernier.
+        """
+        if isinstance(frames, pd.DataFrame):
+            frames = [frames]
+        written = set()
+        with self._transaction(create=True) as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('created_at', ?)",
+                         (datetime.now().isoformat(),))
+            for df in frames:
+                df = apply_schema(self._keyed(df))
+                partitions = df[PARTITION_COLUMN].astype(object).map(partition_name)
+                name = self._file_name("base", self._next_sequence(conn))
+                self._write_partitions(conn, name, df, partitions)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO locations (numero_dpe, partition, file) VALUES (?, ?, ?)",
+                    zip(df[KEY], partitions, [name] * len(df))
+                )
+                written.update(partitions.unique())
+            rows = conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+        return {"rows": rows, "partitions": len(written)}
+
+    def upsert(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Ajouter ou remplacer des DPE (clé numero_dpe)
+
+        Un fichier delta par partition recevant des lignes ; seules les
+        entrées d'index des DPE reçus sont lues (dans chaque couche) et
+        écrites (dans celle-ci).
+
+        Returns:
+            {"added", "updated", "partitions", "total"}
+        """
+        df = apply_schema(self._keyed(df))
+        partitions = df[PARTITION_COLUMN].astype(object).map(partition_name)
+        existing = self._locate_chain(df[KEY].tolist())
+
+        with self._transaction(create=True) as conn:
+            name = self._file_name("delta", self._next_sequence(conn))
+            self._write_partitions(conn, name, df, partitions)
+            # L'index ne désigne les nouveaux fichiers qu'une fois tous écrits
+            conn.executemany(
+                "INSERT OR REPLACE INTO locations (numero_dpe, partition, file) VALUES (?, ?, ?)",
+                zip(df[KEY], partitions, [name] * len(df))
+            )
+            conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = 'rows'",
+                         (len(df) - len(existing),))
+
+        return {
+            "added": len(df) - len(existing),
+            "updated": len(existing),
+            "partitions": partitions.nunique(),
+            "total": self.count(),
+        }
+
+    def _live_files(self, conn: sqlite3.Connection, partition: str) -> Dict[str, Optional[Set[str]]]:
+        """
+        Fichiers de la partition portant des versions courantes
+
+        Valeur : DPE courants du fichier, ou None s'ils le sont tous (aucune
+        ligne du fichier remplacée depuis) : le fichier est lu sans filtre.
+        """
+        written = dict(conn.execute("SELECT file, rows FROM files WHERE partition = ?", (partition,)).fetchall())
+        live = {}
+        for file, count in conn.execute(
+            "SELECT file, COUNT(*) FROM locations WHERE partition = ? GROUP BY file", (partition,)
+        ).fetchall():
+            if written.get(file) == count:
+                live[file] = None
+            else:
+                live[file] = {key for (key,) in conn.execute(
+                    "SELECT numero_dpe FROM locations WHERE partition = ? AND file = ?", (partition, file)
+                )}
+        return live
+
+    def _read_file(self, partition: str, name: str, columns: Optional[Set[str]],
+                   keys: Optional[Set[str]], exclude: Optional[Set[str]] = None) -> Any:
+        """
+        Un fichier de partition, restreint aux colonnes `columns` présentes
+        (toutes si None) et aux DPE `keys` (tous si None), sans les DPE
+        `exclude` (remplacés dans une couche plus récente)
+
+        Parquet : table Arrow (convertie en pandas une seule fois, voir
+        _to_frame) ; CSV : DataFrame typé.
+        """
+        path = os.path.join(self._partition_dir(partition), name)
+        if name.endswith(".parquet"):
+            parquet = pq.ParquetFile(path)
+            available = parquet.schema_arrow.names
+            wanted = available if columns is None else [column for column in available if column in columns]
+            table = parquet.read(columns=wanted)
+            if keys is not None:
+                table = table.filter(pc.is_in(table[KEY], value_set=pa.array(list(keys), pa.string())))
+            if exclude:
+                table = table.filter(pc.invert(pc.is_in(table[KEY], value_set=pa.array(list(exclude), pa.string()))))
+            return table
+
+        usecols = None if columns is None else (lambda column: column in columns)
+        df = apply_schema(pd.read_csv(path, dtype={KEY: str}, usecols=usecols, low_memory=False))
+        if keys is not None:
+            df = df[df[KEY].isin(keys)]
+        return df[~df[KEY].isin(exclude)] if exclude else df
+
+    @contextmanager
+    def _open_chain(self) -> Iterator[List[tuple]]:
+        """Index de la chaîne ouverts ensemble : [(génération, connexion)], couche la plus récente d'abord"""
+        with ExitStack() as stack:
+            yield [(layer, stack.enter_context(layer._transaction())) for layer in self.chain()]
+
+    def _hidden(self, layers: List[tuple]) -> Dict[tuple, Set[str]]:
+        """
+        DPE remplacés dans une couche plus récente : {(partition, fichier): DPE}
+
+        Les index des couches (deltas) sont lus en entier ; dans la
+        génération complète, seuls les DPE des couches sont cherchés.
+        """
+        hidden = {}
+        newer = set()
+        for position, (layer, conn) in enumerate(layers):
+            for key, location in layer._locate(conn, list(newer)).items():
+                hidden.setdefault(location, set()).add(key)
+            if position < len(layers) - 1:
+                newer.update(key for (key,) in conn.execute("SELECT numero_dpe FROM locations"))
+        return hidden
+
+    def _read_partition(self, layers: List[tuple], hidden: Dict[tuple, Set[str]], partition: str,
+                        columns: Optional[Set[str]] = None) -> List[Any]:
+        """Versions courantes d'une partition, fichier par fichier dans l'ordre d'écriture (tables Arrow ou DataFrames)"""
+        files = []
+        for layer, conn in layers:
+            names = layer._files(partition)
+            if not names:
+                continue
+            live = layer._live_files(conn, partition)
+            # Fichier absent de l'index : remplacé ou orphelin (écriture interrompue)
+            files.extend((name, layer, live[name]) for name in names if name in live)
+
+        parts = []
+        for name, layer, keys in sorted(files, key=lambda item: item[0]):
+            replaced = hidden.get((partition, name))
+            if replaced and keys is not None:
+                keys, replaced = keys - replaced, None
+                if not keys:
+                    continue
+            parts.append(layer._read_file(partition, name, columns, keys, replaced))
+        return parts
+
+    @staticmethod
+    def _to_frame(parts: List[Any], filters: Optional[Filters] = None) -> pd.DataFrame:
+        """
+        Un DataFrame à partir des fichiers lus : les tables Arrow sont
+        concaténées (dictionnaires unifiés) puis converties en une fois,
+        bien plus vite que partition par partition
+        """
+        frames = [part for part in parts if isinstance(part, pd.DataFrame)]
+        tables = [part for part in parts if not isinstance(part, pd.DataFrame)]
+        if tables:
+            try:
+                table = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+                frames[:0] = [table.to_pandas()]
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Types incompatibles entre fichiers (colonne hors schéma typée différemment)
+                frames[:0] = [table.to_pandas() for table in tables]
+        if filters:
+            frames = [frame[filter_mask(frame, filters)] for frame in frames]
+        return concat_frames(frames)
+
+    def read_partition(self, partition: str) -> pd.DataFrame:
+        """Versions courantes des DPE d'une partition"""
+        with self._open_chain() as layers:
+            return self._to_frame(self._read_partition(layers, self._hidden(layers), partition))
+
+    def compaction_candidates(self, max_deltas: int, max_stale: float) -> List[str]:
+        """Partitions ayant des deltas et plus de `max_deltas` deltas ou de `max_stale` lignes remplacées"""
+        written, live, deltas = Counter(), Counter(), Counter()
+        with self._open_chain() as layers:
+            for layer, conn in layers:
+                written.update(dict(conn.execute("SELECT partition, SUM(rows) FROM files GROUP BY partition").fetchall()))
+                live.update(dict(conn.execute("SELECT partition, COUNT(*) FROM locations GROUP BY partition").fetchall()))
+                for partition in layer._own_partitions():
+                    deltas[partition] += sum(name.startswith("delta-") for name in layer._files(partition))
+            hidden = self._hidden(layers)
+        for (partition, _), keys in hidden.items():
+            live[partition] -= len(keys)
+
+        candidates = []
+        for partition in sorted(deltas):
+            # Index antérieur à la table files : part inconnue, seul le nombre de deltas compte
+            rows = written.get(partition) or live.get(partition, 0)
+            stale = 1 - live.get(partition, 0) / rows if rows else 0.0
+            if deltas[partition] and (deltas[partition] > max_deltas or stale > max_stale):
+                candidates.append(partition)
+        return candidates
+
+    def compact_partition(self, partition: str) -> bool:
+        """
+        Réécrire une partition en une base unique (versions courantes), en
+        place : réservé à une génération complète non publiée (voir
+        DpeStore.compact). Sans effet (False) si la partition est déjà une
+        base unique au format courant.
+        """
+        files = self._files(partition)
+        if not files or (len(files) == 1 and files[0].endswith(FILE_EXTENSION)):
+            return False
+        # La base prend le numéro du dernier fichier replié
+        name = Generation._file_name("base", max(Generation._file_number(old) for old in files))
+        df = self.read_partition(partition)
+        self._write(partition, name, df)
+        with self._transaction() as conn:
+            conn.execute("UPDATE locations SET file = ? WHERE partition = ?", (name, partition))
+            conn.execute("DELETE FROM files WHERE partition = ?", (partition,))
+            conn.execute("INSERT INTO files (partition, file, rows) VALUES (?, ?, ?)", (partition, name, len(df)))
+
+        # Liens propres à cette génération : les précédentes gardent leurs fichiers
+        for old in files:
+            os.remove(os.path.join(self._partition_dir(partition), old))
+        return True
+
+    def load(self, columns: Optional[List[str]] = None, filters: Optional[Filters] = None) -> pd.DataFrame:
+        """
+        Jeu de données (dernière version de chaque DPE), partition par partition
+
+        Args:
+            columns: colonnes à lire (toutes si None)
+            filters: conditions (colonne, opérateur, valeur) toutes vérifiées,
+                opérateurs ==, !=, <, <=, >, >=, in, not in ; un filtre
+                == ou in sur code_postal_ban limite les partitions lues
+        """
+        needed = None
+        if columns is not None:
+            needed = {KEY, *columns, *(column for column, _, _ in filters or [])}
+
+        parts = []
+        with self._open_chain() as layers:
+            hidden = self._hidden(layers)
+            for partition in _filter_partitions(self.partitions(), filters):
+                parts.extend(self._read_partition(layers, hidden, partition, needed))
+
+        df = self._to_frame(parts, filters)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+
+
+class DpeStore:
+    """Générations du jeu de données, génération courante (CURRENT) et sauvegardes"""
+
+    CURRENT_FILE = "CURRENT"
+    LOCK_FILE = ".lock"
+    GENERATION_PREFIX = "gen-"
+    # Bases compactées en cours d'écriture, hors de toute génération
+    STAGING_PREFIX = "compact-"
+
+    MAX_DELTAS = COMPACT_MAX_DELTAS
+    MAX_STALE = COMPACT_MAX_STALE
+    MAX_LAYERS = COMPACT_MAX_LAYERS
+
+    # Écritures du processus (complète l'exclusion entre processus par fcntl)
+    _write_mutex = threading.Lock()
+
+    def __init__(self, directory: str, keep: Optional[int] = None, max_age_days: Optional[float] = None):
+        self.directory = directory
+        self.keep = BACKUP_KEEP if keep is None else keep
+        self.max_age_days = BACKUP_MAX_AGE_DAYS if max_age_days is None else max_age_days
+
+    def _current_name(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, self.CURRENT_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current(self) -> Optional[Generation]:
+        """Génération lue (None si le jeu de données n'existe pas)"""
+        name = self._current_name()
+        if name:
+            return Generation(os.path.join(self.directory, name))
+        # Disposition sans générations : partitions et index à la racine
+        legacy = Generation(self.directory)
+        return legacy if legacy.exists() else None
+
+    def exists(self) -> bool:
+        return self.current() is not None
+
+    def version(self) -> str:
+        generation = self.current()
+        return generation.version() if generation else ""
+
+    def count(self) -> int:
+        generation = self.current()
+        return generation.count() if generation else 0
+
+    def load(self, columns: Optional[List[str]] = None, filters: Optional[Filters] = None) -> pd.DataFrame:
+        """Jeu de données courant (voir Generation.load) ; relit CURRENT si sa génération disparaît pendant la lecture"""
+        for attempt in range(3):
+            generation = self.current()
+            if generation is None:
+                return pd.DataFrame()
+            try:
+                return generation.load(columns, filters)
+            except (FileNotFoundError, sqlite3.OperationalError):
+                if attempt == 2:
+                    raise
+        return pd.DataFrame()
+
+    def _number(self, name: str) -> int:
+        return int(name[len(self.GENERATION_PREFIX):])
+
+    def generations(self) -> List[Generation]:
+        """Générations présentes (publiées ou non), de la plus ancienne à la plus récente"""
+        paths = glob.glob(os.path.join(self.directory, f"{self.GENERATION_PREFIX}*"))
+        numbered = [
+            (self._number(os.path.basename(path)), path)
+            for path in paths if os.path.basename(path)[len(self.GENERATION_PREFIX):].isdigit()
+        ]
+        return [Generation(path) for _, path in sorted(numbered)]
+
+    def backups(self) -> List[Dict[str, Any]]:
+        """Sauvegardes (générations antérieures à la courante conservées comme telles), la plus récente d'abord"""
+        current = self._current_name()
+        generations = self.generations()
+        names = [g.name for g in generations]
+        if current not in names:
+            return []
+        older = generations[:names.index(current)]
+        return [{"name": g.name, **g.info()} for g in reversed(older) if g.info().get("backup", True)]
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Un seul écrivain à la fois (threads et processus)"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._write_mutex, open(os.path.join(self.directory, self.LOCK_FILE), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _next_directory(self) -> str:
+        """Répertoire de la prochaine génération (verrou d'écriture tenu)"""
+        existing = self.generations()
+        current = self._current_name()
+        for generation in existing:
+            if current is None or self._number(generation.name) > self._number(current):
+                # Écriture interrompue avant publication : jamais lue
+                print(f"🧹 Génération non publiée supprimée: {generation.name}")
+                shutil.rmtree(generation.directory, ignore_errors=True)
+
+        number = self._number(existing[-1].name) + 1 if existing else 1
+        return os.path.join(self.directory, f"{self.GENERATION_PREFIX}{number:06d}")
+
+    def _new_generation(self, source: Optional[Generation]) -> Generation:
+        """Génération non publiée, vide ou couche au-dessus de `source`"""
+        generation = Generation(self._next_directory())
+        os.makedirs(generation.directory)
+        if source is None:
+            return generation
+        if os.path.dirname(source.directory) != self.directory:
+            # Disposition sans générations (supprimée par la rétention) : état repris en entier
+            generation.fold(source)
+        else:
+            generation.layer_on(source)
+        return generation
+
+    def _publish(self, generation: Generation, kind: str, backup: bool):
+        """
+        Rendre `generation` courante (remplacement atomique de CURRENT)
+
+        Args:
+            kind: "full", "upsert" ou "restore"
+            backup: conserver la génération remplacée comme sauvegarde
+        """
+        generation.write_info({
+            "created_at": datetime.now().isoformat(),
+            "kind": kind,
+            "rows": generation.count(),
+            "backup": True,
+        })
+        generation.sync()
+
+        previous = self._current_name()
+        if previous and not backup:
+            replaced = Generation(os.path.join(self.directory, previous))
+            replaced.write_info({**replaced.info(), "backup": False})
+
+        _write_text_atomic(os.path.join(self.directory, self.CURRENT_FILE), generation.name)
+
+    def _commit(self, kind: str, backup: bool, write, from_current: bool = True) -> Dict[str, Any]:
+        """Écrire une nouvelle génération avec `write(generation)`, la publier puis appliquer la rétention"""
+        with self._write_lock():
+            generation = self._new_generation(self.current() if from_current else None)
+            try:
+                result = write(generation)
+                self._publish(generation, kind, backup)
+            except BaseException:
+                shutil.rmtree(generation.directory, ignore_errors=True)
+                raise
+            self._prune()
+        return result
+
+    def replace(self, frames: Union[pd.DataFrame, Iterable[pd.DataFrame]], backup: bool = True) -> Dict[str, int]:
+        """
+        Remplacer tout le jeu de données (rechargement complet) : une base par partition
+
+        frames : un DataFrame ou des DataFrames successifs (voir Generation.replace)
+        """
+        return self._commit("full", backup, lambda generation: generation.replace(frames), from_current=False)
+
+    def import_csv(self, path: str) -> Dict[str, int]:
+        """Construire le jeu partitionné à partir d'un CSV complet (migration)"""
+        return self.replace(pd.read_csv(path, dtype={KEY: str}, low_memory=False))
+
+    def upsert(self, df: pd.DataFrame, backup: bool = True) -> Dict[str, int]:
+        """
+        Ajouter ou remplacer des DPE (clé numero_dpe) dans une nouvelle génération
+
+        La nouvelle génération est une couche au-dessus de la courante :
+        seuls les deltas et les entrées d'index des DPE reçus sont écrits,
+        quel que soit le volume du jeu. Si la chaîne dépasse MAX_LAYERS
+        couches ou si des partitions dépassent les seuils de compactage,
+        compact() est lancé en arrière-plan (pendant l'upsert si
+        DPE_COMPACT_BACKGROUND=0).
+
+        Returns:
+            {"added", "updated", "partitions", "total"}
+        """
+        result = self._commit("upsert", backup, lambda generation: generation.upsert(df))
+        current = self.current()
+        if current.depth() > self.MAX_LAYERS or current.compaction_candidates(self.MAX_DELTAS, self.MAX_STALE):
+            if COMPACT_BACKGROUND:
+                self.start_compaction()
+            else:
+                self.compact()
+        return result
+
+    def compact(self, partitions: Optional[List[str]] = None) -> List[str]:
+        """
+        Replier les couches en une génération complète et réécrire des
+        partitions en une base unique (versions courantes), puis publier le résultat
+
+        Repli et bases sont écrits hors verrou, dans un répertoire de
+        travail (fichiers de la génération courante liés en dur, index
+        copié) : lecteurs et upserts ne sont pas bloqués pendant la
+        réécriture. Sous verrou, le répertoire devient une nouvelle
+        génération, à laquelle sont appliquées les couches écrites
+        entre-temps. Sans effet si la génération lue n'est plus dans la
+        chaîne courante (rechargement complet ou restauration entre-temps).
+
+        Args:
+            partitions: partitions à compacter (défaut : celles qui dépassent
+                les seuils) ; une base CSV seule est convertie en Parquet
+
+        Returns:
+            Partitions compactées
+        """
+        snapshot = self.current()
+        if snapshot is None:
+            return []
+        if partitions is None:
+            partitions = snapshot.compaction_candidates(self.MAX_DELTAS, self.MAX_STALE)
+        depth = snapshot.depth()
+        if not partitions and depth <= self.MAX_LAYERS:
+            return []
+
+        staging = Generation(os.path.join(self.directory, f"{self.STAGING_PREFIX}{uuid.uuid4().hex[:12]}"))
+        compacted = []
+        try:
+            # Liens vers la chaîne lue : la rétention peut la supprimer pendant le compactage
+            os.makedirs(staging.directory)
+            staging.fold(snapshot)
+            compacted = [partition for partition in partitions if staging.compact_partition(partition)]
+            if not compacted and depth == 0:
+                return []
+
+            with self._write_lock():
+                chain = self.current().chain()
+                names = [layer.name for layer in chain]
+                if snapshot.name not in names:
+                    return []
+                generation = Generation(self._next_directory())
+                os.rename(staging.directory, generation.directory)
+                try:
+                    for layer in reversed(chain[:names.index(snapshot.name)]):
+                        generation.merge(layer)
+                    # Mêmes données : la génération remplacée n'est pas une sauvegarde
+                    self._publish(generation, "compact", backup=False)
+                except BaseException:
+                    shutil.rmtree(generation.directory, ignore_errors=True)
+                    raise
+                self._prune()
+        finally:
+            shutil.rmtree(staging.directory, ignore_errors=True)
+
+        if compacted:
+            print(f"🗜️ Compactage: {len(compacted)} partitions ({', '.join(compacted[:5])}{'…' if len(compacted) > 5 else ''})")
+        if depth:
+            print(f"🗜️ {depth} couches repliées en une génération complète")
+        return compacted
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+        except Exception as e:
+            # Génération lue supprimée, disque plein... : nouvel essai au prochain upsert
+            print(f"⚠️ Compactage interrompu: {e}")
+
+    def start_compaction(self) -> bool:
+        """Lancer compact() dans un thread d'arrière-plan (un seul par jeu de données et par processus)"""
+        key = os.path.abspath(self.directory)
+        with _compactions_lock:
+            running = _compactions.get(key)
+            if running is not None and running.is_alive():
+                return False
+            thread = threading.Thread(target=self._compact_quietly, name="dpe-compaction", daemon=True)
+            _compactions[key] = thread
+            thread.start()
+        print("🗜️ Compactage lancé en arrière-plan")
+        return True
+
+    def wait_compaction(self, timeout: Optional[float] = None):
+        """Attendre la fin du compactage en arrière-plan éventuel"""
+        thread = _compactions.get(os.path.abspath(self.directory))
+        if thread is not None:
+            thread.join(timeout)
+
+    def restore(self, name: str) -> str:
+        """Republier une sauvegarde (nouvelle couche sans deltas au-dessus d'elle, la courante devient sauvegarde)"""
+        source = Generation(os.path.join(self.directory, name))
+        if not source.exists():
+            raise KeyError(f"Sauvegarde inconnue: {name}")
+
+        with self._write_lock():
+            generation = self._new_generation(source)
+            self._publish(generation, "restore", backup=True)
+            self._prune()
+        return generation.name
+
+    def prune(self) -> List[str]:
+        """Appliquer la rétention des sauvegardes ; renvoie les générations supprimées"""
+        with self._write_lock():
+            return self._prune()
+
+    def _prune(self) -> List[str]:
+        """
+        Rétention (verrou d'écriture tenu) : la précédente, puis les `keep`
+        sauvegardes les plus récentes non expirées, et les générations
+        dont l'une d'elles ou la courante reprend l'état (couches)
+        """
+        current = self._current_name()
+        generations = self.generations()
+        names = [g.name for g in generations]
+        if current not in names:
+            return []
+
+        older = generations[:names.index(current)]
+        kept = set(g.name for g in older[-1:])  # lectures en cours de la génération précédente
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+        backups = [g for g in reversed(older) if g.info().get("backup", True)]
+        kept.update(g.name for g in backups[:self.keep] if g.info().get("created_at", "") >= cutoff)
+
+        parents = set()
+        for name in kept | {current}:
+            parents.update(g.name for g in Generation(os.path.join(self.directory, name)).chain()[1:])
+        for generation in older:
+            if generation.name in parents - kept and generation.info().get("backup", True):
+                # Conservée pour les couches au-dessus d'elle, plus comme sauvegarde
+                generation.write_info({**generation.info(), "backup": False})
+        removed = [g for g in older if g.name not in kept | parents]
+
+        for generation in removed:
+            shutil.rmtree(generation.directory, ignore_errors=True)
+
+        # Disposition sans générations, reprise dans la première génération
+        for path in glob.glob(os.path.join(self.directory, "code_postal=*")):
+            shutil.rmtree(path, ignore_errors=True)
+        for path in glob.glob(os.path.join(self.directory, "index.db*")):
+            os.remove(path)
+
+        # Bases compactées abandonnées (processus arrêté pendant le compactage)
+        for path in glob.glob(os.path.join(self.directory, f"{self.STAGING_PREFIX}*")):
+            if os.path.getmtime(path) < (datetime.now() - timedelta(days=1)).timestamp():
+                shutil.rmtree(path, ignore_errors=True)
+
+        if removed:
+            print(f"🧹 Sauvegardes supprimées: {', '.join(g.name for g in removed)}")
+        return [g.name for g in removed]
+
+
+def dataset_exists(data_file: str) -> bool:
+    """Le jeu de données existe-t-il (partitionné, ou CSV historique) ?"""
+    return DpeStore(store_dir(data_file)).exists() or os.path.exists(data_file)
+
+
+def load_dataset(data_file: str, columns: Optional[List[str]] = None,
+                 filters: Optional[Filters] = None) -> pd.DataFrame:
+    """
+    Jeu de données courant, typé selon utils.dpe_schema : partitions
+    indexées si elles existent, sinon le CSV historique
+
+    Args:
+        columns: colonnes à lire (toutes si None)
+        filters: [(colonne, opérateur, valeur)], voir Generation.load ;
+            ex. [("code_postal_ban", "in", ["69001", "69002"]), ("etiquette_dpe", "==", "A")]
+    """
+    store = DpeStore(store_dir(data_file))
+    if store.exists():
+        return store.load(columns, filters)
+
+    usecols = None
+    if columns is not None:
+        needed = {KEY, *columns, *(column for column, _, _ in filters or [])}
+        usecols = lambda column: column in needed
+    df = apply_schema(pd.read_csv(data_file, dtype={KEY: str}, usecols=usecols, low_memory=False))
+    if filters:
+        df = df[filter_mask(df, filters)].reset_index(drop=True)
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]]
+    return df
+
+
+def dataset_version(data_file: str) -> Optional[str]:
+    """Identifiant de l'état courant du jeu partitionné (None sans partitions)"""
+    directory = store_dir(data_file)
+    store = DpeStore(directory)
+    if not store.exists():
+        return None
+    return hashlib.sha256(f"{os.path.abspath(directory)}:{store.version()}".encode("utf-8")).hexdigest()[:16]
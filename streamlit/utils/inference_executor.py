@@ -0,0 +1,116 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturated(Exception):
+    """Levée quand la file de l'exécuteur d'inférence est pleine"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"File d'inférence pleine, réessayer dans {retry_after} s")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Pool de threads dédié à l'inférence, avec file bornée
+
+    Les handlers async y soumettent le travail CPU (encodage, predict) au
+    lieu du threadpool par défaut de Starlette, partagé avec les autres
+    endpoints. Au plus max_workers tâches s'exécutent et max_queue attendent ;
+    au-delà, run() échoue immédiatement (ExecutorSaturated -> HTTP 429)
+    plutôt que de laisser la latence croître sans limite.
+
+    Des threads plutôt que des processus : les modèles restent partagés en
+    mémoire et scikit-learn / NumPy relâchent le GIL pendant le calcul.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._avg_duration = 0.0
+
+    def _timed(self, fn: Callable, args: tuple) -> Any:
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+                # Moyenne mobile exponentielle, pour estimer Retry-After
+                self._avg_duration += 0.1 * (duration - self._avg_duration)
+            self._slots.release()
+
+    def is_saturated(self) -> bool:
+        """Toutes les places (exécution + file) sont-elles occupées ?"""
+        with self._lock:
+            return self._pending >= self.max_workers + self.max_queue
+
+    def retry_after(self) -> int:
+        """Délai (s) estimé avant qu'une place se libère"""
+        with self._lock:
+            waves = self._pending / self.max_workers
+            return max(1, math.ceil(waves * self._avg_duration))
+
+    def _submit(self, fn: Callable, args: tuple) -> "asyncio.Future":
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(self._timed, fn, args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Exécuter fn(*args) dans le pool
+
+        Raises:
+            ExecutorSaturated: si max_workers + max_queue tâches sont déjà en cours
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(self.retry_after())
+
+        return await self._submit(fn, args)
+
+    async def run_when_free(self, fn: Callable, *args, poll_interval: float = 0.005) -> Any:
+        """
+        Exécuter fn(*args) en attendant une place si la file est pleine
+
+        Pour les flux déjà commencés (statut 200 envoyé), où un 429 n'est plus
+        possible : l'attente ralentit la lecture de l'envoi du client.
+        """
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(poll_interval)
+
+        return await self._submit(fn, args)
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupation du pool et compteurs"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_duration_ms": round(self._avg_duration * 1000.0, 3),
+            }
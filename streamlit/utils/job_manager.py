@@ -0,0 +1,341 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : exclusion limitée au processus courant
+    fcntl = None
+
+# Rétention des enregistrements de tâches terminées : nombre et âge maximal
+JOBS_KEEP = int(os.getenv("JOBS_KEEP", "100"))
+JOBS_MAX_AGE_DAYS = float(os.getenv("JOBS_MAX_AGE_DAYS", "30"))
+
+
+class JobCancelled(Exception):
+    """Levée dans une tâche dont l'annulation a été demandée"""
+
+
+class Job:
+    """
+    Contexte passé à une tâche en cours d'exécution
+
+    progress() met à jour l'étape et l'avancement, et sert de point
+    d'annulation : si l'annulation a été demandée, il lève JobCancelled.
+    """
+
+    # Relecture de l'enregistrement par check_cancelled (annulation depuis un autre worker)
+    CANCEL_POLL_INTERVAL = 1.0
+
+    def __init__(self, manager: 'JobManager', job_id: str, job_type: str):
+        self.manager = manager
+        self.id = job_id
+        self.type = job_type
+        self.cancel_event = threading.Event()
+        self._polled_at = 0.0
+
+    def progress(self, stage: str, current: Optional[float] = None, total: Optional[float] = None,
+                 cancellable: bool = True):
+        """
+        Signaler l'étape courante (et current/total pour le pourcentage)
+
+        cancellable=False pour une étape qui suit un effet irréversible
+        (ex: version de modèles déjà publiée).
+        """
+        if cancellable and self.cancel_event.is_set():
+            raise JobCancelled()
+
+        update = {'stage': stage}
+        if current is not None and total:
+            update['percent'] = round(100.0 * current / total, 1)
+        # L'enregistrement relu pour la mise à jour porte aussi la demande d'annulation
+        record = self.manager._update(self.id, **update)
+        self._polled_at = time.monotonic()
+        if record.get('cancel_requested'):
+            self.cancel_event.set()
+            if cancellable:
+                raise JobCancelled()
+
+    def check_cancelled(self):
+        """
+        Lever JobCancelled si l'annulation a été demandée (par ce worker ou un autre)
+
+        Une annulation depuis un autre worker n'est lue dans l'enregistrement
+        qu'au plus toutes les CANCEL_POLL_INTERVAL secondes.
+        """
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+        if time.monotonic() - self._polled_at < self.CANCEL_POLL_INTERVAL:
+            return
+
+        self._polled_at = time.monotonic()
+        record = self.manager.get(self.id)
+        if record and record.get('cancel_requested'):
+            self.cancel_event.set()
+            raise JobCancelled()
+
+
+class JobManager:
+    """
+    Gestionnaire des tâches longues de l'API (rafraîchissement, réentraînement)
+
+    Chaque tâche a un identifiant et un enregistrement JSON persistant
+    (jobs/<id>.json). Une seule tâche d'un type donné s'exécute à la fois :
+    une nouvelle demande renvoie la tâche déjà en cours (single-flight), y
+    compris si elle tourne dans un autre worker (verrou fichier par type).
+    L'annulation est coopérative : elle est enregistrée dans la tâche et
+    prend effet au prochain progress().
+
+    Chaque lecture-modification-écriture d'un enregistrement se fait sous
+    un verrou fichier du répertoire : une annulation depuis un autre worker
+    ne peut pas réécrire une tâche terminée entre-temps. Au-delà de
+    JOBS_KEEP tâches terminées ou de JOBS_MAX_AGE_DAYS jours, les
+    enregistrements sont supprimés.
+    """
+
+    JOBS_DIR = 'jobs'
+    RECORDS_LOCK_FILE = '.records.lock'
+
+    # États terminaux
+    FINISHED = ('succeeded', 'failed', 'cancelled', 'interrupted')
+
+    def __init__(self, jobs_dir: str = JOBS_DIR,
+                 on_finish: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 keep: Optional[int] = None, max_age_days: Optional[float] = None):
+        """
+        Args:
+            jobs_dir: Répertoire des enregistrements de tâches
+            on_finish: Appelée avec l'enregistrement final de chaque tâche terminée
+            keep: Tâches terminées conservées (défaut : JOBS_KEEP)
+            max_age_days: Âge maximal d'une tâche terminée (défaut : JOBS_MAX_AGE_DAYS)
+        """
+        self.jobs_dir = jobs_dir
+        self.on_finish = on_finish
+        self.keep = JOBS_KEEP if keep is None else keep
+        self.max_age_days = JOBS_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._records_mutex = threading.Lock()
+        self._running: Dict[str, Job] = {}
+        self._type_locks: Dict[str, Any] = {}
+
+        self._mark_interrupted()
+        self.prune()
+
+    def _record_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _write(self, record: Dict[str, Any]):
+        path = self._record_path(record['id'])
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    @contextmanager
+    def _records_lock(self) -> Iterator[None]:
+        """Exclusion des lectures-modifications-écritures d'enregistrements (threads et workers)"""
+        with self._records_mutex, open(os.path.join(self.jobs_dir, self.RECORDS_LOCK_FILE), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _update(self, job_id: str, **fields) -> Dict[str, Any]:
+        with self._records_lock():
+            record = self.get(job_id)
+            record.update(fields)
+            record['updated_at'] = datetime.now().isoformat()
+            self._write(record)
+        return record
+
+    def _acquire_type_lock(self, job_type: str) -> bool:
+        """Verrou exclusif (non bloquant) d'un type de tâche, partagé entre processus"""
+        if fcntl is None:
+            return all(job.type != job_type for job in self._running.values())
+
+        lock_file = open(os.path.join(self.jobs_dir, f"{job_type}.lock"), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._type_locks[job_type] = lock_file
+        return True
+
+    def _release_type_lock(self, job_type: str):
+        lock_file = self._type_locks.pop(job_type, None)
+        if lock_file is not None and fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _mark_interrupted(self):
+        """
+        Tâches laissées en cours par un processus arrêté
+
+        Seul le verrou du type indique qu'une tâche tourne encore : le pid
+        enregistré peut être réattribué (uvicorn redémarré en PID 1 dans
+        le conteneur) et ce gestionnaire, tout juste créé, n'en exécute aucune.
+        """
+        for record in self.list():
+            if record['status'] in self.FINISHED:
+                continue
+            if not self._acquire_type_lock(record['type']):
+                continue  # encore exécutée par un autre worker
+            try:
+                with self._records_lock():
+                    current = self.get(record['id'])
+                    if current is not None and current['status'] not in self.FINISHED:
+                        current.update(status='interrupted', finished_at=datetime.now().isoformat())
+                        self._write(current)
+            finally:
+                self._release_type_lock(record['type'])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Enregistrement d'une tâche (None si inconnue)"""
+        path = self._record_path(job_id)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None  # inconnue ou supprimée par la rétention
+
+    def list(self, job_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Tâches enregistrées (plus récente en premier)"""
+        records = []
+        if not os.path.isdir(self.jobs_dir):
+            return records
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith('.json'):
+                continue
+            record = self.get(name[:-len('.json')])
+            if record and (job_type is None or record['type'] == job_type):
+                records.append(record)
+
+        return sorted(records, key=lambda r: r['created_at'], reverse=True)
+
+    def active(self, job_type: str) -> Optional[Dict[str, Any]]:
+        """Tâche en cours d'un type donné (ce worker ou un autre)"""
+        for record in self.list(job_type):
+            if record['status'] not in self.FINISHED:
+                return record
+        return None
+
+    def submit(self, job_type: str, target: Callable[[Job], Any],
+               params: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Lancer une tâche en arrière-plan (thread), sauf si une tâche du même type tourne déjà
+
+        Args:
+            target: Fonction appelée avec le Job ; sa valeur de retour
+                (sérialisable en JSON) devient le résultat de la tâche
+
+        Returns:
+            (enregistrement de la tâche, True si elle vient d'être créée)
+        """
+        with self._lock:
+            if not self._acquire_type_lock(job_type):
+                return self.active(job_type), False
+
+            job_id = uuid.uuid4().hex[:12]
+            record = {
+                'id': job_id,
+                'type': job_type,
+                'status': 'pending',
+                'stage': None,
+                'percent': 0.0,
+                'params': params or {},
+                'result': None,
+                'error': None,
+                'pid': os.getpid(),
+                'created_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'updated_at': None,
+            }
+            self._write(record)
+
+            job = Job(self, job_id, job_type)
+            self._running[job_id] = job
+
+        threading.Thread(
+            target=self._execute, args=(job, job_type, target),
+            name=f"job-{job_type}", daemon=True
+        ).start()
+
+        return record, True
+
+    def _execute(self, job: Job, job_type: str, target: Callable[[Job], Any]):
+        """Exécuter la tâche et enregistrer son issue"""
+        started = datetime.now()
+        self._update(job.id, status='running', started_at=started.isoformat())
+
+        def finish(**fields) -> Dict[str, Any]:
+            finished = datetime.now()
+            return self._update(job.id, finished_at=finished.isoformat(),
+                                duration_seconds=(finished - started).total_seconds(), **fields)
+
+        record = None
+        try:
+            result = target(job)
+            record = finish(status='succeeded', percent=100.0, result=result)
+        except JobCancelled:
+            record = finish(status='cancelled')
+        except Exception as e:
+            print(f" Tâche {job_type} {job.id} en échec: {e}")
+            record = finish(status='failed', error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job.id, None)
+                self._release_type_lock(job_type)
+
+        if self.on_finish is not None:
+            self.on_finish(record)
+        self.prune()
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Demander l'annulation d'une tâche
+
+        Raises:
+            KeyError: tâche inconnue
+            ValueError: tâche déjà terminée
+        """
+        # Statut relu sous verrou : la tâche ne peut pas se terminer entre la
+        # vérification et l'écriture (sinon son issue serait écrasée)
+        with self._records_lock():
+            record = self.get(job_id)
+            if record is None:
+                raise KeyError(f"Tâche inconnue: {job_id}")
+            if record['status'] in self.FINISHED:
+                raise ValueError(f"Tâche déjà terminée ({record['status']})")
+
+            record.update(cancel_requested=True, updated_at=datetime.now().isoformat())
+            self._write(record)
+
+        job = self._running.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+
+        return record
+
+    def prune(self) -> List[str]:
+        """Supprimer les tâches terminées au-delà de `keep` ou plus anciennes que `max_age_days`"""
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+        finished = [record for record in self.list() if record['status'] in self.FINISHED]
+        removed = [
+            record['id'] for i, record in enumerate(finished)
+            if i >= self.keep or (record.get('finished_at') or record['created_at']) < cutoff
+        ]
+        for job_id in removed:
+            try:
+                os.remove(self._record_path(job_id))
+            except FileNotFoundError:
+                pass  # déjà supprimée par un autre worker
+        return removed
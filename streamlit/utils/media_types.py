@@ -0,0 +1,37 @@
+"""
+Types MIME des formats de prédiction par lot et en flux
+
+Sans dépendance : l'API déclare ses routes avec ces constantes sans
+importer pandas ni pyarrow (voir utils.arrow_io et utils.bulk_scoring,
+importés à la première requête).
+"""
+
+# Arrow IPC (stream) et Parquet : /predict/batch
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/vnd.apache.parquet'
+
+# Types MIME acceptés -> format
+TABLE_CONTENT_TYPES = {
+    ARROW_STREAM: 'arrow',
+    PARQUET: 'parquet',
+    'application/x-parquet': 'parquet',
+}
+
+TABLE_MEDIA_TYPES = {
+    'arrow': ARROW_STREAM,
+    'parquet': PARQUET,
+}
+
+# CSV et NDJSON : /predict/stream
+STREAM_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+STREAM_MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class ModelRegistry:
+    """
+    Registre versionné des modèles
+
+    Chaque version est un répertoire immuable models/registry/<version>/
+    contenant les deux modèles, leurs métriques, leurs éventuels artefacts
+    dérivés (modèles compilés) et un manifeste (date, identifiant du jeu de
+    données d'entraînement). Le fichier ACTIVE désigne
+    la version servie ; il est remplacé atomiquement à chaque activation.
+    """
+
+    REGISTRY_DIR = 'models/registry'
+    ACTIVE_FILE = 'ACTIVE'
+    HISTORY_FILE = 'history.json'
+
+    # Contenu d'un répertoire de version
+    CLASSIFIER_FILE = 'classification_model.pkl'
+    REGRESSOR_FILE = 'regression_model.pkl'
+    METRICS_FILE = 'metrics.json'
+    MANIFEST_FILE = 'manifest.json'
+
+    def __init__(self, registry_dir: str = REGISTRY_DIR):
+        """Initialiser le registre"""
+        self.registry_dir = registry_dir
+        os.makedirs(self.registry_dir, exist_ok=True)
+
+    def version_dir(self, version: str) -> str:
+        """Répertoire d'une version"""
+        return os.path.join(self.registry_dir, version)
+
+    def exists(self, version: str) -> bool:
+        """Vérifier qu'une version est enregistrée"""
+        return os.path.exists(os.path.join(self.version_dir(version), self.MANIFEST_FILE))
+
+    @staticmethod
+    def data_snapshot_id(data_path: Optional[str]) -> Optional[str]:
+        """Identifiant (sha256 tronqué) du fichier de données d'entraînement ou de l'état du jeu partitionné"""
+        if not data_path:
+            return None
+        from utils.dpe_store import dataset_version
+        snapshot = dataset_version(data_path)
+        if snapshot or not os.path.exists(data_path):
+            return snapshot
+
+        digest = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+        return digest.hexdigest()[:16]
+
+    def _new_version_id(self) -> str:
+        return f"v{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    def _write_json_atomic(self, path: str, content: Any):
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(content, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _commit_version(self, tmp_dir: str, version: str, manifest: Dict[str, Any]) -> str:
+        """Écrire le manifeste puis rendre la version visible en un seul rename"""
+        with open(os.path.join(tmp_dir, self.MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        os.rename(tmp_dir, self.version_dir(version))
+        return version
+
+    def _dump_artifacts(self, tmp_dir: str, artifacts: Optional[Dict[str, Any]]):
+        """Écrire les artefacts dérivés (nom de fichier -> objet joblib) avant la publication"""
+        import joblib
+        for name, artifact in (artifacts or {}).items():
+            joblib.dump(artifact, os.path.join(tmp_dir, name))
+
+    def register(self, classifier, regressor, metrics: Dict[str, Any],
+                 data_path: Optional[str] = None,
+                 artifacts: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Enregistrer une nouvelle version (sans l'activer)
+
+        Args:
+            artifacts: Fichiers dérivés des modèles (nom -> objet joblib),
+                écrits dans la version avant qu'elle ne devienne visible
+
+        Returns:
+            Identifiant de la version créée
+        """
+        import joblib
+        version = self._new_version_id()
+        tmp_dir = os.path.join(self.registry_dir, f".tmp-{version}")
+        os.makedirs(tmp_dir)
+
+        joblib.dump(classifier, os.path.join(tmp_dir, self.CLASSIFIER_FILE))
+        joblib.dump(regressor, os.path.join(tmp_dir, self.REGRESSOR_FILE))
+        self._dump_artifacts(tmp_dir, artifacts)
+        with open(os.path.join(tmp_dir, self.METRICS_FILE), 'w') as f:
+            json.dump(metrics, f, indent=2)
+
+        return self._commit_version(tmp_dir, version, {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'data_snapshot_id': self.data_snapshot_id(data_path),
+            'data_path': data_path,
+            'accuracy': metrics.get('classification', {}).get('accuracy'),
+            'r2_score': metrics.get('regression', {}).get('r2_score'),
+        })
+
+    def import_files(self, classifier_path: str, regressor_path: str,
+                     metrics_path: Optional[str] = None,
+                     artifacts: Optional[Dict[str, Any]] = None) -> str:
+        """Enregistrer des modèles déjà sauvegardés (ex: anciens models/*.pkl)"""
+        version = self._new_version_id()
+        tmp_dir = os.path.join(self.registry_dir, f".tmp-{version}")
+        os.makedirs(tmp_dir)
+
+        shutil.copy2(classifier_path, os.path.join(tmp_dir, self.CLASSIFIER_FILE))
+        shutil.copy2(regressor_path, os.path.join(tmp_dir, self.REGRESSOR_FILE))
+        self._dump_artifacts(tmp_dir, artifacts)
+
+        metrics = {}
+        if metrics_path and os.path.exists(metrics_path):
+            shutil.copy2(metrics_path, os.path.join(tmp_dir, self.METRICS_FILE))
+            with open(metrics_path, 'r') as f:
+                metrics = json.load(f)
+
+        return self._commit_version(tmp_dir, version, {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'data_snapshot_id': None,
+            'imported_from': os.path.dirname(classifier_path),
+            'accuracy': metrics.get('classification', {}).get('accuracy'),
+            'r2_score': metrics.get('regression', {}).get('r2_score'),
+        })
+
+    def list_versions(self) -> List[Dict[str, Any]]:
+        """Lister les versions enregistrées (plus récente en premier)"""
+        versions = []
+
+        for name in os.listdir(self.registry_dir):
+            manifest_path = os.path.join(self.registry_dir, name, self.MANIFEST_FILE)
+            if name.startswith('.') or not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path, 'r') as f:
+                versions.append(json.load(f))
+
+        return sorted(versions, key=lambda m: m['created_at'], reverse=True)
+
+    def get_active_version(self) -> Optional[str]:
+        """Version active, ou None si le registre n'en a pas"""
+        active_path = os.path.join(self.registry_dir, self.ACTIVE_FILE)
+        if not os.path.exists(active_path):
+            return None
+
+        with open(active_path, 'r') as f:
+            version = f.read().strip()
+
+        return version or None
+
+    def get_history(self) -> List[Dict[str, str]]:
+        """Historique des activations (plus ancienne en premier)"""
+        history_path = os.path.join(self.registry_dir, self.HISTORY_FILE)
+        if not os.path.exists(history_path):
+            return []
+
+        with open(history_path, 'r') as f:
+            return json.load(f)
+
+    def activate(self, version: str):
+        """Désigner la version servie (remplacement atomique du pointeur)"""
+        if not self.exists(version):
+            raise KeyError(f"Version inconnue: {version}")
+
+        active_path = os.path.join(self.registry_dir, self.ACTIVE_FILE)
+        tmp_path = f"{active_path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, active_path)
+
+        history = self.get_history()
+        history.append({'version': version, 'activated_at': datetime.now().isoformat()})
+        self._write_json_atomic(os.path.join(self.registry_dir, self.HISTORY_FILE), history)
+
+    def rollback(self) -> str:
+        """
+        Réactiver la version active précédente
+
+        Returns:
+            Version réactivée
+        """
+        active = self.get_active_version()
+        previous = [
+            entry['version'] for entry in self.get_history()
+            if entry['version'] != active and self.exists(entry['version'])
+        ]
+
+        if not previous:
+            raise ValueError("Aucune version précédente vers laquelle revenir")
+
+        self.activate(previous[-1])
+        return previous[-1]
+
+    def load_metrics(self, version: str) -> Dict[str, Any]:
+        """Charger les métriques d'une version"""
+        metrics_path = os.path.join(self.version_dir(version), self.METRICS_FILE)
+        if not os.path.exists(metrics_path):
+            return {}
+
+        with open(metrics_path, 'r') as f:
+            return json.load(f)
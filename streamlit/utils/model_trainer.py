@@ -4,18 +4,15 @@ import joblib
 import json
 import os
 from datetime import datetime
-from typing import Tuple, Dict, Any
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.metrics import (
-    classification_report, 
-    accuracy_score, 
-    f1_score, 
-    r2_score, 
-    mean_squared_error, 
-    mean_absolute_error
-)
+from typing import Tuple, Dict, Any, Optional, TYPE_CHECKING
+from utils.dpe_store import load_dataset
+from utils.model_registry import ModelRegistry
+
+# scikit-learn n'est importé qu'à l'entraînement (ou au dépickling des modèles) :
+# son import (~1 s) ne pèse pas sur le démarrage de l'API
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.tree import DecisionTreeRegressor
 
 class ModelTrainer:
     """Classe pour entraîner et réentraîner les modèles de ML"""
@@ -34,19 +31,47 @@ class ModelTrainer:
         'type_energie_recodee'
     ]
     
+    # Encodage des variables catégorielles
+    TYPE_BATIMENT_MAP = {
+        'maison': 0,
+        'appartement': 1,
+        'immeuble': 2
+    }
+    TYPE_BATIMENT_DEFAULT = 1
+    
+    ENERGIE_MAP = {
+        'Electricite': 0,
+        'Gaz_naturel': 1,
+        'Fioul domestique': 2,
+        'Reseau_de_chauffage_urbain': 3,
+        'Autres': 4
+    }
+    ENERGIE_DEFAULT = 0
+    
     # Targets
     TARGET_CLASSIFICATION = 'etiquette_dpe'
     TARGET_REGRESSION = 'cout_total_5_usages'
     
+    # Colonnes lues pour l'entraînement
+    TRAINING_COLUMNS = FEATURES + [TARGET_CLASSIFICATION, TARGET_REGRESSION]
+    
     # Chemins des fichiers
     DATA_FILE = 'data/donnees_ademe_finales_nettoyees_69_final_pret.csv'
     CLASSIFIER_PATH = 'models/classification_model.pkl'
     REGRESSOR_PATH = 'models/regression_model.pkl'
     METRICS_PATH = 'models/metrics.json'
     
+    # Modèles compilés (tableaux plats) partageables entre processus par mmap
+    COMPILED_CLASSIFIER_PATH = 'models/classification_model.compiled.joblib'
+    COMPILED_REGRESSOR_PATH = 'models/regression_model.compiled.joblib'
+    
+    # Moteurs d'inférence disponibles au chargement
+    INFERENCE_ENGINES = ('sklearn', 'compiled', 'mmap')
+    
     def __init__(self):
         """Initialiser le trainer"""
         os.makedirs('models', exist_ok=True)
+        self.registry = ModelRegistry()
     
     def prepare_data(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
@@ -65,42 +90,28 @@ class ModelTrainer:
         df_classif = df_clean[required_cols_classif].dropna()
         df_regress = df_clean[required_cols_regress].dropna()
         
-        # Encoder les variables catégorielles
-        df_classif = self._encode_features(df_classif)
-        df_regress = self._encode_features(df_regress)
+        # Encoder les variables catégorielles (colonnes category du jeu Parquet : valeurs texte)
+        df_classif = self.encode_features(df_classif)
+        df_regress = self.encode_features(df_regress)
         
         return df_classif, df_regress
     
-    def _encode_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Encoder les variables catégorielles"""
+    def encode_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Encoder les variables catégorielles (vectorisé)"""
         df = df.copy()
         
-        # Mapping type_batiment
-        type_batiment_map = {
-            'maison': 0,
-            'appartement': 1,
-            'immeuble': 2
-        }
-        
-        # Mapping type_energie
-        energie_map = {
-            'Electricite': 0,
-            'Gaz_naturel': 1,
-            'Fioul domestique': 2,
-            'Reseau_de_chauffage_urbain': 3,
-            'Autres': 4
-        }
-        
         # Appliquer les mappings si les colonnes existent
+        # Les valeurs non mappées ou manquantes prennent la valeur par défaut
         if 'type_batiment' in df.columns:
-            # Gérer les valeurs non mappées
-            df['type_batiment'] = df['type_batiment'].apply(
-                lambda x: type_batiment_map.get(x, 1) if pd.notna(x) else 1
+            df['type_batiment'] = (
+                df['type_batiment'].astype(object).map(self.TYPE_BATIMENT_MAP)
+                .fillna(self.TYPE_BATIMENT_DEFAULT).astype('int64')
             )
         
         if 'type_energie_recodee' in df.columns:
-            df['type_energie_recodee'] = df['type_energie_recodee'].apply(
-                lambda x: energie_map.get(x, 0) if pd.notna(x) else 0
+            df['type_energie_recodee'] = (
+                df['type_energie_recodee'].astype(object).map(self.ENERGIE_MAP)
+                .fillna(self.ENERGIE_DEFAULT).astype('int64')
             )
         
         return df
@@ -111,13 +122,17 @@ class ModelTrainer:
         test_size: float = 0.3,
         random_state: int = 42,
         **model_params
-    ) -> Tuple[RandomForestClassifier, Dict[str, Any]]:
+    ) -> Tuple['RandomForestClassifier', Dict[str, Any]]:
         """
         Entraîner le modèle de classification pour prédire l'étiquette DPE
         
         Returns:
             Tuple[model, metrics]: Modèle entraîné et métriques de performance
         """
+        from sklearn.model_selection import train_test_split
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import classification_report, accuracy_score, f1_score
+        
         # Séparer features et target
         X = df[self.FEATURES]
         y = df[self.TARGET_CLASSIFICATION]
@@ -167,13 +182,17 @@ class ModelTrainer:
         test_size: float = 0.3,
         random_state: int = 42,
         **model_params
-    ) -> Tuple[DecisionTreeRegressor, Dict[str, Any]]:
+    ) -> Tuple['DecisionTreeRegressor', Dict[str, Any]]:
         """
         Entraîner le modèle de régression pour prédire le coût total
         
         Returns:
             Tuple[model, metrics]: Modèle entraîné et métriques de performance
         """
+        from sklearn.model_selection import train_test_split
+        from sklearn.tree import DecisionTreeRegressor
+        from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
+        
         # Séparer features et target
         X = df[self.FEATURES]
         y = df[self.TARGET_REGRESSION]
@@ -235,7 +254,7 @@ class ModelTrainer:
         if progress_callback:
             progress_callback("Chargement des données...")
         
-        df = pd.read_csv(data_path)
+        df = load_dataset(data_path, columns=self.TRAINING_COLUMNS)
         
         # Préparer les données
         if progress_callback:
@@ -255,47 +274,153 @@ class ModelTrainer:
         
         regressor, regress_metrics = self.train_regression_model(df_regress)
         
-        # Sauvegarder les modèles
+        metrics = {
+            'classification': classif_metrics,
+            'regression': regress_metrics
+        }
+        
+        # Enregistrer une nouvelle version et l'activer
         if save_models:
             if progress_callback:
                 progress_callback("Sauvegarde des modèles...")
             
-            self.save_models(classifier, regressor)
-            self.save_metrics({
-                'classification': classif_metrics,
-                'regression': regress_metrics
-            })
+            metrics['version'] = self.publish_models(classifier, regressor, metrics, data_path)
         
         if progress_callback:
             progress_callback("Entraînement terminé !")
         
+        return metrics
+    
+    def publish_models(self, classifier, regressor, metrics: Dict[str, Any],
+                       data_path: Optional[str] = None) -> str:
+        """
+        Enregistrer les modèles comme nouvelle version du registre et l'activer
+        
+        Les modèles compilés du moteur "mmap" sont écrits dans la version
+        avant sa publication : une version est complète dès qu'elle est
+        visible et n'est plus jamais modifiée. Au premier enregistrement, les
+        anciens models/*.pkl sont importés comme version initiale pour
+        permettre un retour arrière.
+        
+        Returns:
+            Identifiant de la version activée
+        """
+        if (self.registry.get_active_version() is None
+                and os.path.exists(self.CLASSIFIER_PATH) and os.path.exists(self.REGRESSOR_PATH)):
+            try:
+                legacy_artifacts = self.compiled_artifacts(
+                    joblib.load(self.CLASSIFIER_PATH), joblib.load(self.REGRESSOR_PATH)
+                )
+            except (TypeError, ValueError) as e:
+                print(f"⚠️ Anciens modèles non compilables, moteur mmap indisponible pour cette version: {e}")
+                legacy_artifacts = None
+            
+            legacy_version = self.registry.import_files(
+                self.CLASSIFIER_PATH, self.REGRESSOR_PATH, self.METRICS_PATH,
+                artifacts=legacy_artifacts
+            )
+            self.registry.activate(legacy_version)
+        
+        version = self.registry.register(
+            classifier, regressor,
+            {k: v for k, v in metrics.items() if k != 'version'},
+            data_path=data_path,
+            artifacts=self.compiled_artifacts(classifier, regressor)
+        )
+        self.registry.activate(version)
+        
+        return version
+    
+    def compiled_artifacts(self, classifier, regressor) -> Dict[str, Any]:
+        """Modèles compilés (voir utils.compiled_models) à enregistrer avec une version"""
+        from utils.compiled_models import compile_model
         return {
-            'classification': classif_metrics,
-            'regression': regress_metrics
+            os.path.basename(self.COMPILED_CLASSIFIER_PATH): compile_model(classifier),
+            os.path.basename(self.COMPILED_REGRESSOR_PATH): compile_model(regressor),
         }
     
-    def save_models(self, classifier, regressor):
-        """Sauvegarder les modèles entraînés"""
-        joblib.dump(classifier, self.CLASSIFIER_PATH)
-        joblib.dump(regressor, self.REGRESSOR_PATH)
-    
-    def save_metrics(self, metrics: Dict[str, Any]):
-        """Sauvegarder les métriques d'entraînement"""
-        with open(self.METRICS_PATH, 'w') as f:
-            json.dump(metrics, f, indent=2)
+    def _model_paths(self, version: Optional[str] = None) -> Tuple[str, str, str, str]:
+        """
+        Chemins (classifieur, régresseur, classifieur compilé, régresseur compilé)
+        
+        Version explicite, sinon version active du registre, sinon anciens
+        fichiers models/*.pkl.
+        """
+        if version is None:
+            version = self.registry.get_active_version()
+        
+        if version is None:
+            return (self.CLASSIFIER_PATH, self.REGRESSOR_PATH,
+                    self.COMPILED_CLASSIFIER_PATH, self.COMPILED_REGRESSOR_PATH)
+        
+        version_dir = self.registry.version_dir(version)
+        return tuple(
+            os.path.join(version_dir, os.path.basename(path))
+            for path in (self.CLASSIFIER_PATH, self.REGRESSOR_PATH,
+                         self.COMPILED_CLASSIFIER_PATH, self.COMPILED_REGRESSOR_PATH)
+        )
     
-    def load_models(self) -> Tuple[RandomForestClassifier, DecisionTreeRegressor]:
-        """Charger les modèles sauvegardés"""
-        if not os.path.exists(self.CLASSIFIER_PATH) or not os.path.exists(self.REGRESSOR_PATH):
+    def load_models(self, engine: str = "sklearn", version: Optional[str] = None) -> Tuple[Any, Any]:
+        """
+        Charger les modèles sauvegardés (version active du registre par défaut)
+        
+        Args:
+            engine: "sklearn" pour les estimateurs tels quels, "compiled" pour
+                les convertir en moteur d'inférence à tableaux plats
+                (voir utils.compiled_models), "mmap" pour le moteur compilé
+                lu depuis disque en mémoire partagée (un seul exemplaire des
+                arbres en RAM pour tous les workers de l'API)
+            version: Version du registre à charger (par défaut : version active)
+        """
+        if engine not in self.INFERENCE_ENGINES:
+            raise ValueError(f"Moteur d'inférence inconnu: {engine} (attendu: {', '.join(self.INFERENCE_ENGINES)})")
+        
+        classifier_path, regressor_path, compiled_classifier_path, compiled_regressor_path = \
+            self._model_paths(version)
+        
+        if not os.path.exists(classifier_path) or not os.path.exists(regressor_path):
             raise FileNotFoundError("Les modèles n'existent pas. Veuillez les entraîner d'abord.")
         
-        classifier = joblib.load(self.CLASSIFIER_PATH)
-        regressor = joblib.load(self.REGRESSOR_PATH)
+        if engine == "mmap":
+            return (
+                self._load_compiled_mmap(classifier_path, compiled_classifier_path),
+                self._load_compiled_mmap(regressor_path, compiled_regressor_path)
+            )
+        
+        classifier = joblib.load(classifier_path)
+        regressor = joblib.load(regressor_path)
+        
+        if engine == "compiled":
+            from utils.compiled_models import compile_model
+            classifier = compile_model(classifier)
+            regressor = compile_model(regressor)
         
         return classifier, regressor
     
+    def _load_compiled_mmap(self, model_path: str, compiled_path: str):
+        """
+        Charger un modèle compilé en lecture seule par memory-mapping
+        
+        Le fichier compilé est écrit à la publication de la version (voir
+        publish_models). Les tableaux des arbres sont des np.memmap : tous
+        les processus qui lisent le même fichier partagent les mêmes pages
+        physiques. Sans fichier compilé (version publiée avant le moteur
+        mmap, anciens models/*.pkl), le modèle est compilé en mémoire, dans
+        ce worker seulement : rien n'est écrit au chargement.
+        """
+        if not os.path.exists(compiled_path):
+            from utils.compiled_models import compile_model
+            print(f"⚠️ {compiled_path} absent : modèle compilé en mémoire (non partagé entre workers)")
+            return compile_model(joblib.load(model_path))
+        
+        return joblib.load(compiled_path, mmap_mode='r')
+    
     def load_metrics(self) -> Dict[str, Any]:
-        """Charger les métriques sauvegardées"""
+        """Charger les métriques sauvegardées (version active du registre par défaut)"""
+        version = self.registry.get_active_version()
+        if version is not None:
+            return self.registry.load_metrics(version)
+        
         if not os.path.exists(self.METRICS_PATH):
             return {}
         
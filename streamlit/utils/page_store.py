@@ -0,0 +1,198 @@
+"""
+Pages récupérées auprès de l'API ADEME, en fichiers Parquet
+
+Chaque page (au plus PAGE_SIZE lignes JSON) est convertie en un lot Arrow
+typé et écrite aussitôt dans un dataset partitionné par dataset et code
+postal : <répertoire>/dataset=<source>/code_postal=<cp>/<unité>-<page>.parquet.
+La mémoire d'une récupération reste ainsi bornée à quelques pages ; les
+données sont relues ensuite colonne par colonne (pyarrow.dataset).
+
+Les types viennent du schéma de l'API (integer, number, boolean, string) ou,
+à défaut, de la première page reçue ; ils sont enregistrés (schemas.json)
+pour que toutes les pages d'un dataset, reprise comprise, aient le même schéma.
+"""
+
+import glob
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Types des champs data-fair -> types Arrow (chaîne par défaut, dates comprises)
+ARROW_TYPES = {
+    "integer": "int64",
+    "number": "float64",
+    "boolean": "bool",
+    "string": "string",
+}
+
+
+def infer_types(rows: List[dict], columns: List[str]) -> Dict[str, str]:
+    """Types (number, boolean ou string) déduits des valeurs non nulles d'une page"""
+    types = {}
+    for col in columns:
+        values = [row[col] for row in rows if row.get(col) is not None]
+        if values and all(isinstance(v, bool) for v in values):
+            types[col] = "boolean"
+        elif values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            types[col] = "number"
+        else:
+            types[col] = "string"
+    return types
+
+
+def _to_array(values: list, arrow_type: "pa.DataType") -> "pa.Array":
+    """Colonne Arrow du type voulu ; les valeurs non convertibles deviennent nulles (ou texte)"""
+    try:
+        return pa.array(values, type=arrow_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    if pa.types.is_string(arrow_type):
+        return pa.array([None if v is None else str(v) for v in values], type=arrow_type)
+    if pa.types.is_boolean(arrow_type):
+        return pa.array([v if isinstance(v, bool) else None for v in values], type=arrow_type)
+
+    numbers = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    return pa.array(numbers, type=pa.float64(), from_pandas=True).cast(arrow_type, safe=False)
+
+
+class PageStore:
+    """Dataset Parquet des pages récupérées, partitionné par dataset et code postal"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.schemas_path = os.path.join(directory, "schemas.json")
+        self._types: Optional[Dict[str, Dict[str, str]]] = None
+
+    @staticmethod
+    def is_available() -> bool:
+        """pyarrow est-il installé ?"""
+        return pa is not None
+
+    def _require(self):
+        if pa is None:
+            raise ImportError("pyarrow est nécessaire pour enregistrer les pages récupérées")
+
+    @property
+    def types(self) -> Dict[str, Dict[str, str]]:
+        """Types enregistrés par dataset : {source: {colonne: type}}"""
+        if self._types is None:
+            self._types = {}
+            if os.path.exists(self.schemas_path):
+                with open(self.schemas_path, "r") as f:
+                    self._types = json.load(f)
+        return self._types
+
+    def has_schema(self, source: str) -> bool:
+        return source in self.types
+
+    def set_schema(self, source: str, types: Dict[str, str]):
+        """Fixer les types des colonnes d'un dataset (une fois par récupération)"""
+        self.types[source] = types
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.schemas_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.types, f, indent=2)
+        os.replace(tmp_path, self.schemas_path)
+
+    def schema(self, source: str) -> "pa.Schema":
+        self._require()
+        return pa.schema([
+            (col, pa.type_for_alias(ARROW_TYPES.get(kind, "string")))
+            for col, kind in self.types.get(source, {}).items()
+        ])
+
+    def _unit_dir(self, source: str, code_postal: str) -> str:
+        return os.path.join(self.directory, f"dataset={source}", f"code_postal={code_postal}")
+
+    def write(self, source: str, code_postal: str, uid: str, page: int, rows: List[dict]):
+        """Écrire une page (lot Arrow typé) ; le fichier n'apparaît qu'une fois complet"""
+        self._require()
+        schema = self.schema(source)
+        batch = pa.RecordBatch.from_arrays(
+            [_to_array([row.get(field.name) for row in rows], field.type) for field in schema],
+            schema=schema
+        )
+
+        directory = self._unit_dir(source, code_postal)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uid}-{page:05d}.parquet")
+        pq.write_table(pa.Table.from_batches([batch]), f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    def discard(self, source: str, code_postal: str, uid: str, from_page: int = 0):
+        """Supprimer les pages d'une unité à partir de from_page (reprise d'une unité inachevée)"""
+        for path in glob.glob(os.path.join(self._unit_dir(source, code_postal), f"{uid}-*.parquet*")):
+            page = os.path.basename(path)[len(uid) + 1:].split(".", 1)[0]
+            if int(page) >= from_page:
+                os.remove(path)
+
+    def files(self, source: str, code_postal: Optional[str] = None) -> List[str]:
+        """Fichiers d'un dataset (d'un seul code postal si précisé), par code postal, unité puis page"""
+        partition = f"code_postal={code_postal}" if code_postal is not None else "*"
+        return sorted(glob.glob(os.path.join(self.directory, f"dataset={source}", partition, "*.parquet")))
+
+    def codes(self, source: str) -> List[str]:
+        """Codes postaux ayant des pages enregistrées pour un dataset"""
+        return sorted(
+            os.path.basename(path).split("=", 1)[1]
+            for path in glob.glob(os.path.join(self.directory, f"dataset={source}", "code_postal=*"))
+        )
+
+    def dataset(self, source: str, code_postal: Optional[str] = None) -> "ds.Dataset":
+        """Lecture paresseuse des pages d'un dataset (colonnes et lignes à la demande)"""
+        self._require()
+        return ds.dataset(self.files(source, code_postal), schema=self.schema(source), format="parquet")
+
+    def read(self, source: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Pages d'un dataset en DataFrame (colonnes `columns` seulement si précisées)"""
+        dataset = self.dataset(source)
+        if columns is not None:
+            columns = [col for col in columns if col in dataset.schema.names]
+        return dataset.to_table(columns=columns).to_pandas()
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        self._types = None
+
+
+class UnitWriter:
+    """
+    Destination des pages d'une unité de récupération (appelable : writer(rows))
+
+    pages et rows comptent ce qui est déjà écrit ; cursor est le lien de la
+    page suivante quand l'unité reprend un parcours par curseur interrompu.
+    Sans schéma enregistré pour le dataset, les types de `columns` sont
+    déduits de la première page.
+    """
+
+    def __init__(self, store: PageStore, source: str, code_postal: str, uid: str, columns: List[str],
+                 pages: int = 0, rows: int = 0, cursor: Optional[str] = None):
+        self.store = store
+        self.source = source
+        self.code_postal = code_postal
+        self.uid = uid
+        self.columns = columns
+        self.pages = pages
+        self.rows = rows
+        self.cursor = cursor
+
+    def __call__(self, rows: List[dict]):
+        if not rows:
+            return
+        if not self.store.has_schema(self.source):
+            self.store.set_schema(self.source, infer_types(rows, self.columns))
+        self.store.write(self.source, self.code_postal, self.uid, self.pages, rows)
+        self.pages += 1
+        self.rows += len(rows)
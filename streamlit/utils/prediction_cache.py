@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+# NumPy n'est importé qu'au premier calcul de clé : l'API l'importe sans
+# attendre pandas / NumPy (chargés en arrière-plan avec les modèles)
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class PredictionCache:
+    """
+    Cache des résultats de prédiction à deux niveaux
+
+    Niveau 1 : LRU en mémoire, propre au worker. Niveau 2 (optionnel) : base
+    SQLite partagée par tous les workers de la machine. La clé est un hash
+    du vecteur de features encodé et de la version des modèles : un
+    changement de version ne peut jamais servir un ancien résultat, et
+    invalidate() purge les entrées des autres versions.
+
+    Le niveau SQLite est borné à `disk_max_entries` lignes : toutes les
+    `disk_max_entries / 10` écritures (par worker), les lignes les plus
+    anciennes au-delà de la borne sont supprimées.
+    """
+
+    # Nombre maximal de paramètres par requête SQLite (limite par défaut : 999)
+    SQL_BATCH = 500
+    # Part de la borne écrite entre deux élagages du niveau SQLite
+    DISK_TRIM_FRACTION = 0.1
+
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None,
+                 disk_max_entries: int = 1000000):
+        """
+        Args:
+            max_entries: Taille du LRU en mémoire
+            db_path: Fichier SQLite du niveau partagé (None = mémoire seule)
+            disk_max_entries: Nombre maximal de lignes du niveau SQLite
+        """
+        self.max_entries = max(1, max_entries)
+        self.db_path = db_path
+        self.disk_max_entries = max(1, disk_max_entries)
+        self._disk_trim_every = max(1, int(self.disk_max_entries * self.DISK_TRIM_FRACTION))
+        self._disk_written = 0
+
+        self._lru: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+        self._disk_errors = 0
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS predictions ("
+                    "key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL)"
+                )
+
+    @staticmethod
+    def make_keys(version: str, X: 'np.ndarray') -> List[str]:
+        """
+        Clé canonique de chaque ligne d'une matrice de features encodée
+
+        Les valeurs sont converties en float64 (et -0.0 en 0.0) pour qu'un
+        même logement donne la même clé quel que soit le type d'entrée.
+        """
+        import numpy as np
+        X = np.ascontiguousarray(X, dtype=np.float64) + 0.0
+        prefix = version.encode('utf-8') + b'\0'
+        return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).hexdigest() for row in X]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion SQLite du thread courant"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: Any):
+        """Insérer dans le LRU (verrou tenu par l'appelant)"""
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self._evictions += 1
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Résultats en cache (None pour une clé absente), dans l'ordre des clés"""
+        results: List[Optional[Any]] = [None] * len(keys)
+        missing = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._lru.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._lru.move_to_end(key)
+                    results[i] = value
+            self._hits += len(keys) - len(missing)
+
+        if missing and self.db_path:
+            found = self._disk_get([keys[i] for i in missing])
+            if found:
+                with self._lock:
+                    for key, value in found.items():
+                        self._remember(key, value)
+                    self._disk_hits += len(found)
+                for i in missing:
+                    results[i] = found.get(keys[i])
+                missing = [i for i in missing if results[i] is None]
+
+        with self._lock:
+            self._misses += len(missing)
+
+        return results
+
+    def put_many(self, version: str, items: Dict[str, Any]):
+        """Enregistrer des résultats (valeurs sérialisables en JSON)"""
+        if not items:
+            return
+
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+
+        if self.db_path:
+            try:
+                with self._connection() as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO predictions (key, version, value) VALUES (?, ?, ?)",
+                        [(key, version, json.dumps(value)) for key, value in items.items()]
+                    )
+            except sqlite3.Error:
+                self._disk_errors += 1
+                return
+
+            with self._lock:
+                self._disk_written += len(items)
+                trim = self._disk_written >= self._disk_trim_every
+                if trim:
+                    self._disk_written = 0
+            if trim:
+                self.trim_disk()
+
+    def trim_disk(self) -> int:
+        """
+        Supprimer les lignes les plus anciennes au-delà de `disk_max_entries`
+
+        INSERT OR REPLACE attribue un nouveau rowid : l'ordre des rowid est
+        celui des écritures. Returns: nombre de lignes supprimées
+        """
+        if not self.db_path:
+            return 0
+
+        try:
+            with self._connection() as conn:
+                removed = conn.execute(
+                    "DELETE FROM predictions WHERE rowid <= "
+                    "(SELECT rowid FROM predictions ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+                    (self.disk_max_entries,)
+                ).rowcount
+        except sqlite3.Error:
+            with self._lock:
+                self._disk_errors += 1
+            return 0
+
+        with self._lock:
+            self._disk_evictions += removed
+        return removed
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, Any]:
+        """Lire un ensemble de clés dans le niveau SQLite"""
+        found = {}
+        try:
+            conn = self._connection()
+            for start in range(0, len(keys), self.SQL_BATCH):
+                batch = keys[start:start + self.SQL_BATCH]
+                rows = conn.execute(
+                    f"SELECT key, value FROM predictions WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for key, value in rows:
+                    found[key] = tuple(json.loads(value))
+        except sqlite3.Error:
+            self._disk_errors += 1
+
+        return found
+
+    def invalidate(self, version: str):
+        """Vider le LRU et purger le niveau partagé des autres versions que `version`"""
+        with self._lock:
+            self._lru.clear()
+
+        if self.db_path:
+            try:
+                with self._connection() as conn:
+                    conn.execute("DELETE FROM predictions WHERE version != ?", (version,))
+            except sqlite3.Error:
+                self._disk_errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs de succès / échecs / évictions"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "shared_db": self.db_path,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "disk_max_entries": self.disk_max_entries if self.db_path else None,
+                "disk_evictions": self._disk_evictions,
+                "disk_errors": self._disk_errors,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,159 @@
+"""
+Point de reprise d'un rafraîchissement ADEME
+
+Les pages récupérées sont écrites au fil de l'eau dans <répertoire>/pages
+(PageStore, Parquet) ; l'état note les unités (dataset, code postal,
+tranche) terminées et, pour une unité parcourue par curseur, le lien de la
+page suivante et le nombre de pages déjà écrites. Un rafraîchissement
+relancé avec la même clé reprend là où le précédent s'est arrêté.
+
+Fichiers : <répertoire>/state.json (état) et <répertoire>/pages/ (lignes).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from utils.page_store import PageStore
+
+
+def unit_id(*parts: Optional[str]) -> str:
+    """Identifiant stable d'une unité de récupération"""
+    return hashlib.sha1("|".join(part or "" for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+class RefreshCheckpoint:
+    """État persistant (unités terminées, curseurs en cours) d'un rafraîchissement"""
+
+    def __init__(self, directory: str = "data/refresh_checkpoint"):
+        self.directory = directory
+        self.state_path = os.path.join(directory, "state.json")
+        self.pages = PageStore(os.path.join(directory, "pages"))
+        self.state: Dict[str, Any] = self._read_state() or {}
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_state(self):
+        self.state["updated_at"] = datetime.now().isoformat()
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def begin(self, key: str, params: Dict[str, Any]) -> bool:
+        """
+        Démarrer un rafraîchissement, ou reprendre celui de même clé resté inachevé
+
+        Args:
+            key: Identifie le rafraîchissement (datasets, début de période)
+            params: Paramètres enregistrés au démarrage (ex: fin de période),
+                à réutiliser tels quels en cas de reprise
+
+        Returns:
+            True si un rafraîchissement interrompu est repris
+        """
+        self.state = self._read_state() or {}
+        if self.state.get("key") == key and self.state.get("status") in ("running", "fetched"):
+            self.state["status"] = "running"
+            self.state["resumed"] = self.state.get("resumed", 0) + 1
+            self._write_state()
+            return True
+
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        self.state = {
+            "key": key,
+            "params": params,
+            "status": "running",
+            "started_at": datetime.now().isoformat(),
+            "resumed": 0,
+            "plan": None,
+            "units": {},
+            "cursors": {},
+        }
+        self._write_state()
+        return False
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.state.get("params", {})
+
+    def set_plan(self, plan: Dict[str, Any]):
+        """Enregistrer le plan d'extraction (réutilisé à la reprise, pour des unités identiques)"""
+        self.state["plan"] = plan
+        self._write_state()
+
+    def plan(self) -> Optional[Dict[str, Any]]:
+        return self.state.get("plan")
+
+    def is_done(self, uid: str) -> bool:
+        return uid in self.state.get("units", {})
+
+    def rows(self, uid: str) -> int:
+        """Lignes d'une unité terminée"""
+        return self.state.get("units", {}).get(uid, {}).get("rows", 0)
+
+    def cursor(self, uid: str) -> Optional[Dict[str, Any]]:
+        """
+        Reprise d'une unité interrompue en cours de curseur
+
+        Returns:
+            {"next": lien de la page suivante, "pages": pages écrites,
+            "rows": lignes écrites}, ou None ; les pages écrites au-delà
+            (après le dernier point enregistré) sont à supprimer
+        """
+        return self.state.get("cursors", {}).get(uid)
+
+    def save_cursor(self, uid: str, next_url: str, pages: int, rows: int):
+        """Noter le lien de la page suivante d'un parcours par curseur, après l'écriture d'une page"""
+        self.state["cursors"][uid] = {"next": next_url, "pages": pages, "rows": rows}
+        self._write_state()
+
+    def complete(self, uid: str, label: str, rows: int):
+        """Marquer une unité terminée (toutes ses pages sont écrites)"""
+        self.state["cursors"].pop(uid, None)
+        self.state["units"][uid] = {"label": label, "rows": rows, "at": datetime.now().isoformat()}
+        self._write_state()
+
+    def finish(self):
+        """Toutes les unités sont récupérées (reste à enregistrer les données)"""
+        if self.state:
+            self.state["status"] = "fetched"
+            self._write_state()
+
+    def clear(self):
+        """Supprimer le point de reprise et ses pages (données enregistrées, ou nouveau rafraîchissement)"""
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        self.pages.clear()
+        self.state = {}
+
+    def status(self) -> Dict[str, Any]:
+        """Résumé de l'état : unités et lignes enregistrées, curseurs en cours"""
+        state = self._read_state()
+        if not state:
+            return {"status": "none"}
+
+        units = state.get("units", {})
+        return {
+            "status": state["status"],
+            "key": state["key"],
+            "params": state.get("params", {}),
+            "started_at": state.get("started_at"),
+            "updated_at": state.get("updated_at"),
+            "resumed": state.get("resumed", 0),
+            "units_done": len(units),
+            "units_planned": len(state["plan"]["units"]) if state.get("plan") else None,
+            "rows_saved": sum(unit["rows"] for unit in units.values()),
+            "cursors_in_progress": len(state.get("cursors", {})),
+        }
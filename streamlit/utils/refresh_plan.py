@@ -0,0 +1,147 @@
+"""
+Plan d'extraction d'un rafraîchissement ADEME
+
+Le plan découpe la récupération en unités (dataset, code postal, filtre)
+dont le volume attendu, connu par des requêtes d'agrégation, reste sous la
+limite d'une unité. Il est calculé avant toute récupération, peut être
+affiché (requêtes et lignes à prévoir) et réutilisé tant qu'il est récent.
+"""
+
+import json
+import math
+import os
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class FetchUnit(NamedTuple):
+    """Unité de récupération : une requête `qs` parcourue jusqu'au bout"""
+    source: str
+    code_postal: str
+    label: str
+    qs: str
+    expected_rows: int
+
+
+def month_end(month_start: str) -> str:
+    """Dernier jour du mois commençant à `month_start` (AAAA-MM-JJ)"""
+    start = date.fromisoformat(month_start[:10])
+    following = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (following - timedelta(days=1)).isoformat()
+
+
+def group_months(months: List[tuple], max_rows: int) -> List[tuple]:
+    """
+    Regrouper des mois consécutifs en périodes d'au plus max_rows lignes
+
+    Args:
+        months: [(début du mois, lignes)] triés par date
+
+    Returns:
+        [(date de début, date de fin, lignes)] ; un mois plus volumineux
+        que max_rows forme une période à lui seul
+    """
+    periods = []
+    current = None
+    for month_start, rows in months:
+        if current is not None and current[2] + rows <= max_rows:
+            current = (current[0], month_end(month_start), current[2] + rows)
+            continue
+        if current is not None:
+            periods.append(current)
+        current = (month_start[:10], month_end(month_start), rows)
+
+    if current is not None:
+        periods.append(current)
+    return periods
+
+
+class RefreshPlan:
+    """Unités d'un rafraîchissement, avec le coût attendu"""
+
+    def __init__(self, key: str, units: List[FetchUnit], planning_requests: int = 0,
+                 page_size: int = 1000, created_at: Optional[float] = None):
+        self.key = key
+        self.units = units
+        self.planning_requests = planning_requests
+        self.page_size = page_size
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def unit_requests(self, unit: FetchUnit) -> int:
+        return max(1, math.ceil(unit.expected_rows / self.page_size))
+
+    @property
+    def expected_rows(self) -> int:
+        return sum(unit.expected_rows for unit in self.units)
+
+    @property
+    def expected_requests(self) -> int:
+        return sum(self.unit_requests(unit) for unit in self.units)
+
+    def codes_postaux(self, source: str) -> List[str]:
+        """Codes postaux (dans l'ordre du plan) ayant au moins une unité pour `source`"""
+        return list(dict.fromkeys(unit.code_postal for unit in self.units if unit.source == source))
+
+    def by_size(self) -> List[FetchUnit]:
+        """Unités de la plus volumineuse à la plus petite (ordre d'exécution équilibré)"""
+        return sorted(self.units, key=lambda unit: unit.expected_rows, reverse=True)
+
+    def describe(self) -> str:
+        """Résumé lisible : unités, lignes et requêtes attendues par dataset"""
+        lines = [f"📋 Plan de rafraîchissement ({self.key})"]
+        for source in dict.fromkeys(unit.source for unit in self.units):
+            units = [unit for unit in self.units if unit.source == source]
+            rows = sum(unit.expected_rows for unit in units)
+            requests_count = sum(self.unit_requests(unit) for unit in units)
+            split = sum(1 for unit in units if unit.label)
+            lines.append(
+                f"  {source}: {len(self.codes_postaux(source))} codes postaux, {len(units)} unités "
+                f"(dont {split} découpées), {rows:,} lignes, {requests_count} requêtes"
+            )
+        lines.append(
+            f"  Total: {self.expected_rows:,} lignes, {self.expected_requests} requêtes "
+            f"(+ {self.planning_requests} requêtes d'agrégation)"
+        )
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.describe()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "created_at": self.created_at,
+            "planning_requests": self.planning_requests,
+            "page_size": self.page_size,
+            "units": [unit._asdict() for unit in self.units],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RefreshPlan":
+        return cls(
+            data["key"], [FetchUnit(**unit) for unit in data["units"]],
+            data.get("planning_requests", 0), data.get("page_size", 1000), data.get("created_at")
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, key: str, ttl: float) -> Optional["RefreshPlan"]:
+        """Plan enregistré pour `key`, s'il a moins de `ttl` secondes (None sinon)"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                plan = cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if plan.key != key or time.time() - plan.created_at > ttl:
+            return None
+        return plan
@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class RequestCoalescer:
+    """
+    Regrouper des requêtes concurrentes unitaires en un seul appel vectorisé
+
+    Les requêtes soumises sont mises en file. Un thread dédié attend au plus
+    max_wait_ms (ou jusqu'à max_batch éléments), appelle batch_fn une seule fois
+    sur le lot, puis redistribue chaque résultat à la requête qui l'attend.
+    Avec group_key, un lot mêlant plusieurs clés (ex: versions de modèles)
+    donne un appel de batch_fn par clé.
+    """
+
+    # Bornes supérieures des tranches de l'histogramme des tailles de lot
+    BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_wait_ms: float = 5.0, max_batch: int = 32,
+                 group_key: Optional[Callable[[Any], Any]] = None):
+        """
+        Args:
+            batch_fn: Fonction qui prend une liste d'éléments et renvoie
+                une liste de résultats de même longueur, dans le même ordre
+            max_wait_ms: Attente maximale (ms) pour compléter un lot
+            max_batch: Nombre maximal d'éléments par lot
+            group_key: Clé d'un élément ; batch_fn ne reçoit que des
+                éléments de même clé (un seul groupe si None)
+        """
+        self.batch_fn = batch_fn
+        self.group_key = group_key
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_batch_seen = 0
+        self._histogram = {bound: 0 for bound in self.BATCH_SIZE_BUCKETS}
+        self._histogram_overflow = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="request-coalescer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Soumettre un élément et attendre son résultat (bloquant)"""
+        return self.submit_future(item).result(timeout=timeout)
+
+    def submit_future(self, item: Any) -> Future:
+        """Soumettre un élément sans attendre (ex: asyncio.wrap_future dans un handler async)"""
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def queue_depth(self) -> int:
+        """Nombre d'éléments en attente de regroupement"""
+        return self._queue.qsize()
+
+    def _run(self):
+        """Boucle du thread de regroupement"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[tuple]):
+        """Découper le lot par clé (ordre d'arrivée conservé dans chaque groupe)"""
+        if self.group_key is None:
+            self._process(batch)
+            return
+
+        groups: Dict[Any, List[tuple]] = {}
+        for entry in batch:
+            try:
+                key = self.group_key(entry[0])
+            except Exception as e:
+                entry[1].set_exception(e)
+                continue
+            groups.setdefault(key, []).append(entry)
+        for entries in groups.values():
+            self._process(entries)
+
+    def _process(self, batch: List[tuple]):
+        """Exécuter batch_fn sur le lot (une seule clé) et redistribuer les résultats"""
+        items = [item for item, _ in batch]
+
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"batch_fn a renvoyé {len(results)} résultats pour {len(items)} éléments"
+                )
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+        self._record_batch(len(batch))
+
+    def _record_batch(self, size: int):
+        """Mettre à jour les statistiques de lot"""
+        with self._lock:
+            self._requests += size
+            self._batches += 1
+            self._max_batch_seen = max(self._max_batch_seen, size)
+
+            for bound in self.BATCH_SIZE_BUCKETS:
+                if size <= bound:
+                    self._histogram[bound] += 1
+                    break
+            else:
+                self._histogram_overflow += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de la file et des lots"""
+        with self._lock:
+            histogram = {f"<={bound}": count for bound, count in self._histogram.items()}
+            histogram[f">{self.BATCH_SIZE_BUCKETS[-1]}"] = self._histogram_overflow
+
+            return {
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_batch": self.max_batch,
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "errors": self._errors,
+                "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+                "batch_size_histogram": histogram,
+            }